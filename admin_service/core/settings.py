@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
 ]
 
@@ -152,6 +153,13 @@ CORS_ALLOWED_ORIGINS = [
 
 AUTH_USER_MODEL = 'movies.User'
 
+# Пересчитывать content.film_work_denormalized после изменений в админке.
+# При массовой загрузке данных удобнее выключить и вызвать
+# `manage.py refresh_film_work_view` один раз в конце.
+FILM_WORK_VIEW_REFRESH_ON_CHANGE = (
+    os.getenv('FILM_WORK_VIEW_REFRESH_ON_CHANGE', 'True') == 'True'
+)
+
 AUTHENTICATION_BACKENDS = [
     'movies.custom_backend.CustomBackend',
     # 'django.contrib.auth.backends.ModelBackend',
@@ -1,7 +1,24 @@
+import json
+import re
+import uuid
+
 from django.contrib import admin
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, UniqueConstraint
+from django.forms.models import BaseInlineFormSet
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
 
-from .models import FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork
+from .filters import CachedGenreListFilter
+from .models import FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork, Roles
+from .pagination import EstimatedCountPaginator
+from .signals import schedule_film_work_view_refresh
 
 
 @admin.register(Genre)
@@ -14,28 +31,288 @@ class PersonAdmin(admin.ModelAdmin):
     search_fields = ('full_name',)
 
 
-class GenreFilmWorkInline(admin.TabularInline):
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Формсет, который показывает связанные строки постранично.
+
+    У сериалов бывают тысячи PersonFilmWork, и рендерить их все в одной форме
+    слишком дорого. Сохраняются только строки текущей страницы.
+    """
+
+    per_page = 50
+    request = None
+
+    @property
+    def page_param(self):
+        return f'{self.prefix}-page'
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            page_number = self.request.GET.get(self.page_param) if self.request else 1
+            self.page = paginator.get_page(page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    @property
+    def page_links(self):
+        paginator = self.page.paginator
+        for number in paginator.get_elided_page_range(self.page.number):
+            if number == paginator.ELLIPSIS or number == self.page.number:
+                yield number, None
+                continue
+            params = self.request.GET.copy()
+            params[self.page_param] = number
+            yield number, params.urlencode()
+
+    def clean(self):
+        super().clean()
+        self.validate_unique_across_pages()
+
+    def validate_unique_across_pages(self):
+        """Проверяет уникальность изменённых строк по строкам других страниц.
+
+        validate_unique формсета сравнивает только формы текущей страницы,
+        а UniqueConstraint с внешним ключом инлайна модельная форма не
+        проверяет. Без этой проверки дубль строки с другой страницы доходил
+        бы до базы и падал с IntegrityError.
+        """
+        if self.instance._state.adding:
+            return
+        forms = [
+            form
+            for form in self.forms
+            if form.is_valid() and form.has_changed() and form not in self.deleted_forms
+        ]
+        if not forms:
+            return
+        # Строки текущей страницы могут меняться, их сверяет validate_unique.
+        page_pks = [form.instance.pk for form in self.initial_forms]
+        errors = []
+        for fields in self.unique_fields_with_fk():
+            attnames = [self.model._meta.get_field(name).attname for name in fields]
+            rows = {
+                form: tuple(getattr(form.instance, attname) for attname in attnames)
+                for form in forms
+            }
+            lookups = Q()
+            for row in rows.values():
+                lookups |= Q(**dict(zip(attnames, row)))
+            taken = set(
+                self.model._default_manager.filter(lookups)
+                .exclude(pk__in=page_pks)
+                .values_list(*attnames)
+            )
+            for form, row in rows.items():
+                if row in taken:
+                    form.add_error(None, self.get_form_error())
+                    errors.append(self.get_unique_error_message(fields))
+        if errors:
+            raise ValidationError(errors)
+
+    def unique_fields_with_fk(self):
+        for constraint in self.model._meta.constraints:
+            if (
+                isinstance(constraint, UniqueConstraint)
+                and constraint.fields
+                and constraint.condition is None
+                and self.fk.name in constraint.fields
+            ):
+                yield constraint.fields
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    formset = PaginatedInlineFormSet
+    template = 'admin/movies/edit_inline/paginated_tabular.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        return formset
+
+
+class GenreFilmWorkInline(PaginatedTabularInline):
     model = GenreFilmWork
     autocomplete_fields = ('genre',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('genre')
+
 
-class PersonFilmWorkInline(admin.TabularInline):
+class PersonFilmWorkInline(PaginatedTabularInline):
     model = PersonFilmWork
     autocomplete_fields = ('person',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('person')
+
 
 @admin.register(FilmWork)
 class FilmWorkAdmin(admin.ModelAdmin):
     inlines = (GenreFilmWorkInline, PersonFilmWorkInline)
     list_display = ('title', 'type', 'creation_date', 'rating', 'get_genres')
-    list_filter = ('type', 'genres')
+    list_filter = ('type', ('genres', CachedGenreListFilter))
     search_fields = ('title', 'description', 'id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_queryset(self, request):
-        queryset = super().get_queryset(request).prefetch_related('genres')
+        genre_names = (
+            GenreFilmWork.objects.filter(film_work=OuterRef('pk'))
+            .values('film_work')
+            .annotate(
+                names=StringAgg('genre__name', delimiter=',', ordering='genre__name')
+            )
+            .values('names')
+        )
+        queryset = (
+            super()
+            .get_queryset(request)
+            .annotate(genre_names=Subquery(genre_names))
+            .defer('search_vector')
+        )
         return queryset
 
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        try:
+            return queryset.filter(id=uuid.UUID(search_term)), False
+        except ValueError:
+            pass
+
+        # Каждое слово ищем как префикс слова через GIN-индекс. В отличие
+        # от прежнего icontains (ILIKE '%...%') фрагмент из середины слова
+        # не находится: "matrix" найдёт "Matrix Reloaded", а "atrix" - нет.
+        words = re.findall(r'\w+', search_term)
+        if not words:
+            return queryset.none(), False
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            config='simple',
+            search_type='raw',
+        )
+        return queryset.filter(search_vector=query), False
+
     def get_genres(self, obj):
-        return ','.join([genre.name for genre in obj.genres.all()])
+        return obj.genre_names or ''
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/cast/',
+                self.admin_site.admin_view(self.cast_view),
+                name='movies_filmwork_cast',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def cast_view(self, request, object_id):
+        """Состав фильма постранично (GET) и массовое редактирование (POST).
+
+        POST принимает JSON вида
+        {"add": [{"person_id": ..., "role": ...}], "remove": [...]}
+        и применяет изменения двумя запросами в одной транзакции.
+        """
+        film_work = get_object_or_404(FilmWork.objects.only('id'), pk=object_id)
+
+        if request.method == 'GET':
+            if not self.has_view_or_change_permission(request, film_work):
+                raise PermissionDenied
+            return self.cast_page_response(request, film_work)
+
+        if request.method != 'POST':
+            return JsonResponse({'error': 'Method not allowed'}, status=405)
+        if not self.has_change_permission(request, film_work):
+            raise PermissionDenied
+
+        try:
+            payload = json.loads(request.body)
+            to_add = self.parse_cast_items(payload.get('add', []))
+            to_remove = self.parse_cast_items(payload.get('remove', []))
+        except (ValueError, TypeError, AttributeError, KeyError, ValidationError):
+            return JsonResponse({'error': 'Bad request'}, status=400)
+
+        person_ids = {person_id for person_id, role in to_add}
+        existing = set(
+            Person.objects.filter(id__in=person_ids).values_list('id', flat=True)
+        )
+        missing = person_ids - existing
+        if missing:
+            return JsonResponse(
+                {'error': 'Unknown persons', 'person_ids': sorted(map(str, missing))},
+                status=400,
+            )
+
+        with transaction.atomic():
+            removed = 0
+            if to_remove:
+                condition = Q()
+                for person_id, role in to_remove:
+                    condition |= Q(person_id=person_id, role=role)
+                removed, _deleted = PersonFilmWork.objects.filter(
+                    condition, film_work=film_work
+                ).delete()
+
+            to_add -= set(
+                PersonFilmWork.objects.filter(
+                    film_work=film_work, person_id__in=person_ids
+                ).values_list('person_id', 'role')
+            )
+            added = PersonFilmWork.objects.bulk_create(
+                [
+                    PersonFilmWork(film_work=film_work, person_id=person_id, role=role)
+                    for person_id, role in to_add
+                ],
+                ignore_conflicts=True,
+            )
+            # bulk_create не шлёт post_save, поэтому обновление представления
+            # запрашиваем явно.
+            schedule_film_work_view_refresh()
+
+        return JsonResponse({'added': len(added), 'removed': removed})
+
+    @staticmethod
+    def parse_cast_items(items):
+        parsed = set()
+        for item in items:
+            role = item['role']
+            if role not in Roles.values:
+                raise ValidationError(role)
+            parsed.add((uuid.UUID(str(item['person_id'])), role))
+        return parsed
+
+    def cast_page_response(self, request, film_work):
+        queryset = (
+            PersonFilmWork.objects.filter(film_work=film_work)
+            .select_related('person')
+            .order_by('role', 'person__full_name', 'id')
+        )
+        role = request.GET.get('role')
+        if role:
+            queryset = queryset.filter(role=role)
+
+        page = Paginator(queryset, PaginatedInlineFormSet.per_page).get_page(
+            request.GET.get('page')
+        )
+        return JsonResponse(
+            {
+                'count': page.paginator.count,
+                'total_pages': page.paginator.num_pages,
+                'page': page.number,
+                'prev': page.previous_page_number() if page.has_previous() else None,
+                'next': page.next_page_number() if page.has_next() else None,
+                'results': [
+                    {
+                        'id': item.id,
+                        'person_id': item.person_id,
+                        'full_name': item.person.full_name,
+                        'role': item.role,
+                    }
+                    for item in page.object_list
+                ],
+            }
+        )
 
     get_genres.short_description = _('genres')
@@ -1,47 +1,31 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views import View
 from django.views.generic.list import BaseListView
 
-from movies.models import FilmWork, Roles
-from django.core.paginator import Paginator
-from django.contrib.postgres.aggregates import ArrayAgg
-from django.db.models import Q
+from movies.models import FilmWorkDenormalized
+from movies.pagination import CachedCountPaginator, InvalidCursor, keyset_page
 
 
 class MoviesApiMixin:
     http_method_names = ['get']
 
     def get_queryset(self):
-        return FilmWork.objects.values(
+        return FilmWorkDenormalized.objects.values(
             'id',
             'title',
             'description',
             'creation_date',
             'rating',
             'type',
-        ).annotate(
-            genres=ArrayAgg('genres__name', distinct=True),
-            actors=ArrayAgg(
-                'persons__full_name',
-                filter=Q(personfilmwork__role=Roles.ACTOR),
-                distinct=True,
-                default=[],
-            ),
-            directors=ArrayAgg(
-                'persons__full_name',
-                filter=Q(personfilmwork__role=Roles.DIRECTOR),
-                distinct=True,
-                default=[],
-            ),
-            writers=ArrayAgg(
-                'persons__full_name',
-                filter=Q(personfilmwork__role=Roles.WRITER),
-                distinct=True,
-                default=[],
-            ),
+            'genres',
+            'actors',
+            'directors',
+            'writers',
         )
 
     def render_to_response(self, context, **response_kwargs):
+        if isinstance(context, HttpResponse):
+            return context
         return JsonResponse(context)
 
 
@@ -51,8 +35,13 @@ class MoviesListApi(MoviesApiMixin, BaseListView):
     def get_context_data(self, *, object_list=None, **kwargs):
         queryset = self.get_queryset()
 
+        if 'cursor' in self.request.GET:
+            return self.get_cursor_context_data(queryset)
+
         page_number = self.request.GET.get('page', 1)
-        paginator = Paginator(queryset, self.page_size)
+        paginator = CachedCountPaginator(
+            queryset, self.page_size, FilmWorkDenormalized
+        )
 
         if page_number == "first":
             page_number = 1
@@ -77,6 +66,20 @@ class MoviesListApi(MoviesApiMixin, BaseListView):
         }
         return context
 
+    def get_cursor_context_data(self, queryset):
+        try:
+            results, next_cursor = keyset_page(
+                queryset, self.request.GET.get('cursor'), self.page_size
+            )
+        except InvalidCursor:
+            return JsonResponse({'error': 'Bad request'}, status=400)
+
+        return {
+            'page_size': self.page_size,
+            'next_cursor': next_cursor,
+            'results': results,
+        }
+
 
 class MoviesDetailApi(MoviesApiMixin, View):
 
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.core.cache import cache
+
+# Список жанров в боковой панели меняется редко, а строится на каждый
+# запрос changelist'а. Кеш сбрасывается в movies.signals при правке жанров.
+GENRE_CHOICES_CACHE_KEY = 'admin:filmwork:genre_choices'
+GENRE_CHOICES_CACHE_TIMEOUT = 60 * 60
+
+
+class CachedGenreListFilter(admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        choices = cache.get(GENRE_CHOICES_CACHE_KEY)
+        if choices is None:
+            choices = super().field_choices(field, request, model_admin)
+            cache.set(GENRE_CHOICES_CACHE_KEY, choices, GENRE_CHOICES_CACHE_TIMEOUT)
+        return choices
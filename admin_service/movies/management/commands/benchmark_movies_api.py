@@ -0,0 +1,177 @@
+import statistics
+import time
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from movies.models import FilmWork, FilmWorkDenormalized, Roles
+
+SEED_SQL = [
+    """
+    INSERT INTO content.genre (id, name, description, created, modified)
+    SELECT gen_random_uuid(), 'bench genre ' || i, '', now(), now()
+    FROM generate_series(1, 30) i
+    """,
+    """
+    INSERT INTO content.person (id, full_name, created, modified)
+    SELECT gen_random_uuid(), 'bench person ' || i, now(), now()
+    FROM generate_series(1, GREATEST(%(films)s / 10, 10)) i
+    """,
+    """
+    INSERT INTO content.film_work
+        (id, title, description, creation_date, rating, type, created, modified)
+    SELECT
+        gen_random_uuid(),
+        'bench film ' || i,
+        'bench description ' || i,
+        DATE '1950-01-01' + (i %% 27000),
+        1 + (i %% 90) / 10.0,
+        CASE WHEN i %% 5 = 0 THEN 'tv show' ELSE 'movie' END,
+        now(),
+        now()
+    FROM generate_series(1, %(films)s) i
+    """,
+    """
+    WITH g AS (
+        SELECT array_agg(id) AS ids FROM content.genre WHERE name LIKE 'bench genre %%'
+    )
+    INSERT INTO content.genre_film_work (id, created, film_work_id, genre_id)
+    SELECT
+        gen_random_uuid(), now(), fw.id,
+        g.ids[1 + (abs(hashtext(fw.id::text)) + k) %% array_length(g.ids, 1)]
+    FROM content.film_work fw, g, generate_series(0, 1) k
+    WHERE fw.title LIKE 'bench film %%'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    WITH p AS (
+        SELECT array_agg(id) AS ids FROM content.person WHERE full_name LIKE 'bench person %%'
+    )
+    INSERT INTO content.person_film_work (id, role, created, film_work_id, person_id)
+    SELECT
+        gen_random_uuid(),
+        (ARRAY['actor', 'actor', 'actor', 'director', 'writer'])[k + 1],
+        now(),
+        fw.id,
+        p.ids[1 + (abs(hashtext(fw.id::text)) + k * 7919) %% array_length(p.ids, 1)]
+    FROM content.film_work fw, p, generate_series(0, 4) k
+    WHERE fw.title LIKE 'bench film %%'
+    ON CONFLICT DO NOTHING
+    """,
+    'ANALYZE content.film_work',
+    'ANALYZE content.genre_film_work',
+    'ANALYZE content.person_film_work',
+]
+
+FIELDS = ('id', 'title', 'description', 'creation_date', 'rating', 'type')
+
+
+def aggregated_queryset():
+    """Запрос, которым API пользовался до появления film_work_denormalized."""
+    return FilmWork.objects.values(*FIELDS).annotate(
+        genres=ArrayAgg('genres__name', distinct=True),
+        actors=ArrayAgg(
+            'persons__full_name',
+            filter=Q(personfilmwork__role=Roles.ACTOR),
+            distinct=True,
+            default=[],
+        ),
+        directors=ArrayAgg(
+            'persons__full_name',
+            filter=Q(personfilmwork__role=Roles.DIRECTOR),
+            distinct=True,
+            default=[],
+        ),
+        writers=ArrayAgg(
+            'persons__full_name',
+            filter=Q(personfilmwork__role=Roles.WRITER),
+            distinct=True,
+            default=[],
+        ),
+    )
+
+
+def denormalized_queryset():
+    return FilmWorkDenormalized.objects.values(
+        *FIELDS, 'genres', 'actors', 'directors', 'writers'
+    )
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает выдачу /api/v1/movies через агрегирующий запрос '
+        'и через film_work_denormalized'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--films',
+            type=int,
+            default=0,
+            help='Сгенерировать столько фильмов перед замером (откатывается в конце)',
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['films']:
+                    self.seed(options['films'])
+                self.run(options['iterations'], options['page_size'])
+                if options['films']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('Generated data rolled back')
+
+    def seed(self, films):
+        self.stdout.write(f'Seeding {films} films...')
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for statement in SEED_SQL:
+                cursor.execute(statement, {'films': films})
+        self.stdout.write(f'  done in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        FilmWorkDenormalized.objects.refresh(concurrently=False)
+        self.stdout.write(
+            f'  film_work_denormalized refreshed in '
+            f'{time.perf_counter() - started:.1f}s'
+        )
+
+    def run(self, iterations, page_size):
+        film_id = FilmWork.objects.values_list('id', flat=True).first()
+        if film_id is None:
+            self.stderr.write('film_work is empty, use --films')
+            return
+
+        cases = {
+            'first page': lambda qs: list(qs[:page_size]),
+            'page 1000': lambda qs: list(qs[page_size * 999:page_size * 1000]),
+            'detail': lambda qs: qs.filter(id=film_id).first(),
+        }
+        paths = {
+            'aggregated': aggregated_queryset,
+            'denormalized': denormalized_queryset,
+        }
+
+        self.stdout.write(f'{"case":<12} {"path":<14} {"median ms":>10} {"p95 ms":>10}')
+        for case, fetch in cases.items():
+            for path, queryset in paths.items():
+                timings = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    fetch(queryset())
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f'{case:<12} {path:<14} '
+                    f'{statistics.median(timings):>10.2f} {p95:>10.2f}'
+                )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from movies.models import FilmWorkDenormalized
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает материализованное представление film_work_denormalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking',
+            action='store_true',
+            help='Обычный REFRESH без CONCURRENTLY (быстрее, но блокирует чтение)',
+        )
+
+    def handle(self, *args, **options):
+        FilmWorkDenormalized.objects.refresh(concurrently=not options['blocking'])
+        self.stdout.write(self.style.SUCCESS('film_work_denormalized refreshed'))
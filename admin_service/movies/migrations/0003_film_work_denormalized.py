@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:43
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+CREATE_VIEW_SQL = """
+CREATE MATERIALIZED VIEW content.film_work_denormalized AS
+SELECT
+    fw.id,
+    fw.title,
+    fw.description,
+    fw.creation_date,
+    fw.rating,
+    fw.type,
+    fw.modified,
+    COALESCE(g.genres, '{}') AS genres,
+    COALESCE(p.actors, '{}') AS actors,
+    COALESCE(p.directors, '{}') AS directors,
+    COALESCE(p.writers, '{}') AS writers
+FROM content.film_work fw
+LEFT JOIN LATERAL (
+    SELECT ARRAY_AGG(DISTINCT g.name) AS genres
+    FROM content.genre_film_work gfw
+    JOIN content.genre g ON g.id = gfw.genre_id
+    WHERE gfw.film_work_id = fw.id
+) g ON TRUE
+LEFT JOIN LATERAL (
+    SELECT
+        ARRAY_AGG(DISTINCT p.full_name) FILTER (WHERE pfw.role = 'actor') AS actors,
+        ARRAY_AGG(DISTINCT p.full_name) FILTER (WHERE pfw.role = 'director') AS directors,
+        ARRAY_AGG(DISTINCT p.full_name) FILTER (WHERE pfw.role = 'writer') AS writers
+    FROM content.person_film_work pfw
+    JOIN content.person p ON p.id = pfw.person_id
+    WHERE pfw.film_work_id = fw.id
+) p ON TRUE;
+
+-- Уникальный индекс обязателен для REFRESH MATERIALIZED VIEW CONCURRENTLY.
+CREATE UNIQUE INDEX film_work_denormalized_id_idx
+    ON content.film_work_denormalized (id);
+CREATE INDEX film_work_denormalized_creation_idx
+    ON content.film_work_denormalized (creation_date DESC NULLS LAST, id DESC);
+"""
+
+DROP_VIEW_SQL = 'DROP MATERIALIZED VIEW IF EXISTS content.film_work_denormalized;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_user_auth_user_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilmWorkDenormalized',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, verbose_name='title')),
+                ('description', models.TextField(blank=True, verbose_name='description')),
+                ('creation_date', models.DateField(blank=True, verbose_name='creation date')),
+                ('rating', models.FloatField(blank=True, verbose_name='rating')),
+                ('type', models.CharField(choices=[('movie', 'movie'), ('tv show', 'tv show')], max_length=7, verbose_name='type')),
+                ('modified', models.DateTimeField()),
+                ('genres', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), size=None)),
+                ('actors', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), size=None)),
+                ('directors', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), size=None)),
+                ('writers', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), size=None)),
+            ],
+            options={
+                'db_table': 'content"."film_work_denormalized',
+                'ordering': ['-creation_date'],
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW_SQL, DROP_VIEW_SQL),
+    ]
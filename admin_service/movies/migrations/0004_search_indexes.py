@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:45
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+# Генерируемую колонку создаём руками: конфигурация задана константой,
+# и выражение гарантированно IMMUTABLE, как того требует Postgres.
+# STORED-колонка переписывает film_work целиком под ACCESS EXCLUSIVE:
+# на большой таблице миграцию нужно катить в окно обслуживания.
+ADD_SEARCH_VECTOR_SQL = """
+ALTER TABLE content.film_work ADD COLUMN search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', COALESCE(title, '')), 'A')
+    || setweight(to_tsvector('simple', COALESCE(description, '')), 'B')
+) STORED;
+"""
+
+DROP_SEARCH_VECTOR_SQL = 'ALTER TABLE content.film_work DROP COLUMN search_vector;'
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, а это невозможно внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ('movies', '0003_film_work_denormalized'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='filmwork',
+                    name='search_vector',
+                    field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='filmwork',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='film_work_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='genre',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='genre_name_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='person',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_name'), name='gin_trgm_ops'), name='person_full_name_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+CREATE_STATE_SQL = """
+CREATE TABLE content.film_work_denormalized_refresh (
+    id boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    requested bigint NOT NULL DEFAULT 0,
+    refreshed bigint NOT NULL DEFAULT 0
+);
+INSERT INTO content.film_work_denormalized_refresh DEFAULT VALUES;
+"""
+
+DROP_STATE_SQL = 'DROP TABLE IF EXISTS content.film_work_denormalized_refresh;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_STATE_SQL, DROP_STATE_SQL),
+    ]
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import uuid
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from django.contrib.auth.base_user import BaseUserManager
@@ -70,6 +74,14 @@ class Genre(UUIDMixin, TimeStampedMixin):
         verbose_name = _('genre')
         verbose_name_plural = _('genres')
         ordering = ('name',)
+        indexes = [
+            # Django ищет через UPPER(name) LIKE UPPER('%...%'),
+            # поэтому триграммный индекс строится по тому же выражению.
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='genre_name_trgm_idx',
+            ),
+        ]
 
 
 class Person(UUIDMixin, TimeStampedMixin):
@@ -82,6 +94,12 @@ class Person(UUIDMixin, TimeStampedMixin):
         db_table = 'content"."person'
         verbose_name = _('person')
         verbose_name_plural = _('persons')
+        indexes = [
+            GinIndex(
+                OpClass(Upper('full_name'), name='gin_trgm_ops'),
+                name='person_full_name_trgm_idx',
+            ),
+        ]
 
 
 class FilmTypes(models.TextChoices):
@@ -113,6 +131,15 @@ class FilmWork(UUIDMixin, TimeStampedMixin):
         verbose_name=_('genres'),
     )
     persons = models.ManyToManyField(Person, through='PersonFilmWork')
+    # Колонка вычисляется самой базой, см. миграцию 0004_search_indexes.
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='simple')
+            + SearchVector('description', weight='B', config='simple')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     def __str__(self):
         return self.title
@@ -127,6 +154,7 @@ class FilmWork(UUIDMixin, TimeStampedMixin):
                 fields=['creation_date', 'rating'],
                 name='film_work_creation_rating_idx',
             ),
+            GinIndex(fields=['search_vector'], name='film_work_search_vector_idx'),
         ]
 
 
@@ -188,3 +216,85 @@ class PersonFilmWork(UUIDMixin):
                 name='film_work_person_role_idx',
             ),
         ]
+
+
+# Одна строка: сколько раз просили пересчитать представление и до какого
+# запроса оно уже пересчитано. Создаётся миграцией 0005.
+REFRESH_STATE_TABLE = 'content.film_work_denormalized_refresh'
+# Ключ advisory lock - oid представления, чтобы не пересекаться с чужими.
+REFRESH_LOCK_SQL = "'content.film_work_denormalized'::regclass::oid::bigint"
+
+
+class FilmWorkDenormalizedManager(models.Manager):
+    def refresh(self, concurrently=True):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        mode = 'CONCURRENTLY ' if concurrently else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW {mode}{table}')
+
+    def mark_stale(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {REFRESH_STATE_TABLE} SET requested = requested + 1')
+
+    def refresh_stale(self):
+        """Пересчитывает представление, пока есть необработанные запросы.
+
+        Пересчётом занимается один процесс на всю базу: остальные, не получив
+        advisory lock, сразу выходят, а их запросы подхватит держатель
+        блокировки. Он же перепроверяет счётчик после снятия блокировки,
+        чтобы не потерять запрос, пришедший в этот момент.
+        """
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(f'SELECT pg_try_advisory_lock({REFRESH_LOCK_SQL})')
+                if not cursor.fetchone()[0]:
+                    return
+                try:
+                    while True:
+                        cursor.execute(
+                            f'SELECT requested FROM {REFRESH_STATE_TABLE} '
+                            'WHERE requested > refreshed'
+                        )
+                        row = cursor.fetchone()
+                        if row is None:
+                            break
+                        self.refresh()
+                        cursor.execute(
+                            f'UPDATE {REFRESH_STATE_TABLE} SET refreshed = %s', [row[0]]
+                        )
+                finally:
+                    cursor.execute(f'SELECT pg_advisory_unlock({REFRESH_LOCK_SQL})')
+                cursor.execute(f'SELECT requested > refreshed FROM {REFRESH_STATE_TABLE}')
+                row = cursor.fetchone()
+                if row is None or not row[0]:
+                    return
+
+
+class FilmWorkDenormalized(models.Model):
+    """Фильм с жанрами и персонами одной строкой.
+
+    Материализованное представление в базе, создаётся миграцией
+    0003_film_work_denormalized и обновляется из movies.signals.
+    """
+
+    id = models.UUIDField(primary_key=True)
+    title = models.CharField(_('title'), max_length=255)
+    description = models.TextField(_('description'), blank=True)
+    creation_date = models.DateField(_('creation date'), blank=True)
+    rating = models.FloatField(_('rating'), blank=True)
+    type = models.CharField(_('type'), max_length=7, choices=FilmTypes.choices)
+    modified = models.DateTimeField()
+    genres = ArrayField(models.CharField(max_length=255))
+    actors = ArrayField(models.CharField(max_length=255))
+    directors = ArrayField(models.CharField(max_length=255))
+    writers = ArrayField(models.CharField(max_length=255))
+
+    objects = FilmWorkDenormalizedManager()
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        managed = False
+        db_table = 'content"."film_work_denormalized'
+        ordering = ['-creation_date']
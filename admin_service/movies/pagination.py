@@ -0,0 +1,177 @@
+import base64
+import binascii
+import json
+import threading
+import time
+import uuid
+from datetime import date
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F, Field, Func, UUIDField, Value
+from django.utils.functional import cached_property
+
+# Сколько секунд закешированное значение count считается свежим.
+COUNT_CACHE_TIMEOUT = 60
+# До этого порога дешевле посчитать COUNT(*) честно, чем верить статистике.
+EXACT_COUNT_THRESHOLD = 100_000
+
+
+def estimate_table_rows(model) -> int:
+    """Оценка числа строк таблицы по статистике планировщика (pg_class.reltuples)."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+            [table],
+        )
+        row = cursor.fetchone()
+    # reltuples = -1, пока по таблице ни разу не собиралась статистика.
+    return row[0] if row and row[0] is not None else -1
+
+
+def count_rows(model) -> int:
+    estimate = estimate_table_rows(model)
+    if estimate >= EXACT_COUNT_THRESHOLD:
+        return estimate
+    return model.objects.count()
+
+
+def _refresh_count(model, cache_key: str, lock_key: str) -> None:
+    try:
+        cache.set(cache_key, (count_rows(model), time.time()), None)
+    finally:
+        cache.delete(lock_key)
+        connection.close()
+
+
+def get_cached_count(model) -> int:
+    """Количество строк модели из кеша.
+
+    Устаревшее значение отдаётся сразу, а пересчёт запускается в фоновом потоке,
+    поэтому запрос платит за COUNT(*) только при самом первом обращении.
+    """
+    cache_key = f'count:{model._meta.label_lower}'
+    cached = cache.get(cache_key)
+    if cached is None:
+        count = count_rows(model)
+        cache.set(cache_key, (count, time.time()), None)
+        return count
+
+    count, refreshed_at = cached
+    lock_key = f'{cache_key}:refreshing'
+    if (
+        time.time() - refreshed_at > COUNT_CACHE_TIMEOUT
+        and cache.add(lock_key, True, COUNT_CACHE_TIMEOUT)
+    ):
+        threading.Thread(
+            target=_refresh_count,
+            args=(model, cache_key, lock_key),
+            daemon=True,
+        ).start()
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт общее количество из кеша вместо COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count_model, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_model = count_model
+
+    @cached_property
+    def count(self):
+        return get_cached_count(self.count_model)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(creation_date: date | None, pk: uuid.UUID) -> str:
+    raw = f'{creation_date.isoformat() if creation_date else ""}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[date | None, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        creation_date, pk = raw.split('|')
+        creation_date = date.fromisoformat(creation_date) if creation_date else None
+        return creation_date, uuid.UUID(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+class Row(Func):
+    """Конструктор строки ROW(a, b): сравнивается с другой строкой целиком."""
+
+    function = 'ROW'
+    output_field = Field()
+
+
+def keyset_page(queryset, cursor: str | None, page_size: int):
+    """Страница по ключу (creation_date, id) по убыванию без OFFSET.
+
+    Фильмы без даты идут в конце выдачи. Возвращает строки страницы
+    и курсор следующей страницы (или None).
+    """
+    # Один порядок для обоих сегментов, чтобы запросы шли по индексу
+    # (creation_date DESC NULLS LAST, id DESC).
+    queryset = queryset.order_by(F('creation_date').desc(nulls_last=True), '-id')
+    creation_date, pk = decode_cursor(cursor) if cursor else (None, None)
+
+    rows = []
+    if not cursor or creation_date is not None:
+        # Сравнение строк (creation_date, id) < (X, pk) планировщик
+        # превращает в одну границу диапазона по индексу. NULL-даты
+        # в него не попадают: для них сравнение даёт NULL.
+        dated = queryset.filter(creation_date__isnull=False)
+        if cursor:
+            dated = dated.alias(keyset=Row('creation_date', 'id')).filter(
+                keyset__lt=Row(Value(creation_date), Value(pk, output_field=UUIDField()))
+            )
+        rows = list(dated[: page_size + 1])
+
+    if len(rows) <= page_size:
+        undated = queryset.filter(creation_date__isnull=True)
+        if cursor and creation_date is None:
+            undated = undated.filter(id__lt=pk)
+        rows += list(undated[: page_size + 1 - len(rows)])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['creation_date'], last['id'])
+    return rows, next_cursor
+
+
+def estimate_queryset_rows(queryset) -> int:
+    """Оценка числа строк запроса по плану (EXPLAIN), без выполнения."""
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших changelist'ов админки.
+
+    Пока таблица меньше EXACT_COUNT_THRESHOLD, считает COUNT(*) как обычно.
+    Дальше берёт reltuples для запроса без фильтров и оценку планировщика
+    для отфильтрованного.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if estimate_table_rows(queryset.model) < EXACT_COUNT_THRESHOLD:
+            return super().count
+
+        if not queryset.query.where:
+            return estimate_table_rows(queryset.model)
+
+        estimate = estimate_queryset_rows(queryset)
+        if estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
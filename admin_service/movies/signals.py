@@ -0,0 +1,86 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .filters import GENRE_CHOICES_CACHE_KEY
+from .models import FilmWork, FilmWorkDenormalized, Genre, GenreFilmWork, Person, PersonFilmWork
+
+logger = logging.getLogger(__name__)
+
+
+class FilmWorkViewRefresher:
+    """Обновляет film_work_denormalized в фоне, склеивая подряд идущие запросы.
+
+    Сохранение фильма с инлайнами порождает десятки сигналов, а пересчёт
+    представления достаточно выполнить один раз после последнего изменения.
+    Между процессами uwsgi запросы склеиваются в базе, см.
+    FilmWorkDenormalizedManager.refresh_stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = False
+        self._running = False
+
+    def request(self):
+        try:
+            FilmWorkDenormalized.objects.mark_stale()
+        except Exception:
+            logger.exception('Failed to mark film_work_denormalized stale')
+            return
+        with self._lock:
+            self._pending = True
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._running = False
+                        return
+                    self._pending = False
+                try:
+                    FilmWorkDenormalized.objects.refresh_stale()
+                except Exception:
+                    logger.exception('Failed to refresh film_work_denormalized')
+        finally:
+            with self._lock:
+                self._running = False
+            connection.close()
+
+
+refresher = FilmWorkViewRefresher()
+
+
+def schedule_film_work_view_refresh(using=None):
+    if settings.FILM_WORK_VIEW_REFRESH_ON_CHANGE:
+        transaction.on_commit(refresher.request, using=using)
+
+
+@receiver(post_save, sender=FilmWork)
+@receiver(post_delete, sender=FilmWork)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+@receiver(post_save, sender=GenreFilmWork)
+@receiver(post_delete, sender=GenreFilmWork)
+@receiver(post_save, sender=PersonFilmWork)
+@receiver(post_delete, sender=PersonFilmWork)
+def film_work_changed(sender, using=None, **kwargs):
+    schedule_film_work_view_refresh(using)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def genre_changed(sender, **kwargs):
+    cache.delete(GENRE_CHOICES_CACHE_KEY)
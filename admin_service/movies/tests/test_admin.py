@@ -0,0 +1,182 @@
+import json
+import uuid
+from unittest import mock
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db.models import ForeignKey
+from django.forms import ModelChoiceField
+from django.forms.models import inlineformset_factory
+from django.test import RequestFactory, SimpleTestCase
+
+from movies.admin import FilmWorkAdmin, PaginatedInlineFormSet
+from movies.models import FilmWork, Person, PersonFilmWork
+
+
+class FilmWorkSearchTests(SimpleTestCase):
+    def setUp(self):
+        self.model_admin = FilmWorkAdmin(FilmWork, admin.site)
+        self.request = RequestFactory().get('/admin/movies/filmwork/')
+        self.queryset = FilmWork.objects.all()
+
+    def search(self, term):
+        return self.model_admin.get_search_results(self.request, self.queryset, term)
+
+    def test_empty_term_keeps_queryset(self):
+        for term in ('', '   '):
+            with self.subTest(term=term):
+                queryset, may_have_duplicates = self.search(term)
+
+                self.assertIs(queryset, self.queryset)
+                self.assertFalse(may_have_duplicates)
+
+    def test_uuid_term_looks_up_by_primary_key(self):
+        pk = uuid.uuid4()
+
+        queryset, _duplicates = self.search(f' {pk} ')
+
+        sql = str(queryset.query)
+        self.assertIn('"id" = ', sql)
+        self.assertNotIn('to_tsquery', sql)
+
+    def test_words_are_searched_as_prefixes(self):
+        queryset, _duplicates = self.search('Star  wa!')
+
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn('"search_vector" @@ (to_tsquery(', sql)
+        self.assertIn('Star:* & wa:*', params)
+        self.assertNotIn('ILIKE', sql.upper())
+
+    def test_term_without_words_finds_nothing(self):
+        queryset, _duplicates = self.search('!!!')
+
+        self.assertTrue(queryset.query.is_empty())
+
+
+def make_user(*perms):
+    return mock.Mock(is_active=True, has_perm=lambda perm, obj=None: perm in perms)
+
+
+@mock.patch('movies.admin.get_object_or_404', lambda queryset, pk: FilmWork(id=pk))
+class CastViewTests(SimpleTestCase):
+    def setUp(self):
+        self.model_admin = FilmWorkAdmin(FilmWork, admin.site)
+        self.factory = RequestFactory()
+        self.film_id = uuid.uuid4()
+
+    def post(self, payload, user=None):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        request = self.factory.post('/', body, content_type='application/json')
+        request.user = user or make_user('movies.change_filmwork')
+        return self.model_admin.cast_view(request, self.film_id)
+
+    def test_get_requires_view_permission(self):
+        request = self.factory.get('/')
+        request.user = make_user()
+
+        with self.assertRaises(PermissionDenied):
+            self.model_admin.cast_view(request, self.film_id)
+
+    def test_post_requires_change_permission(self):
+        with self.assertRaises(PermissionDenied):
+            self.post({'add': []}, user=make_user('movies.view_filmwork'))
+
+    def test_other_methods_are_not_allowed(self):
+        request = self.factory.put('/')
+        request.user = make_user('movies.change_filmwork')
+
+        response = self.model_admin.cast_view(request, self.film_id)
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_invalid_payload_is_rejected(self):
+        person_id = str(uuid.uuid4())
+        payloads = [
+            'not json',
+            [],
+            {'add': 5},
+            {'add': [{'person_id': person_id, 'role': 'producer'}]},
+            {'add': [{'person_id': 'not-a-uuid', 'role': 'actor'}]},
+            {'add': [{'role': 'actor'}]},
+            {'remove': [person_id]},
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                response = self.post(payload)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), {'error': 'Bad request'})
+
+    def test_unknown_persons_are_reported(self):
+        person_id = uuid.uuid4()
+        persons = mock.Mock()
+        persons.filter.return_value.values_list.return_value = []
+
+        with mock.patch.object(Person, 'objects', persons):
+            response = self.post({'add': [{'person_id': str(person_id), 'role': 'actor'}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.content),
+            {'error': 'Unknown persons', 'person_ids': [str(person_id)]},
+        )
+
+
+# Базы в тестах нет: персоны считаются существующими.
+@mock.patch.object(ModelChoiceField, 'to_python', lambda field, value: Person(id=value))
+@mock.patch.object(ForeignKey, 'validate', lambda field, value, instance: None)
+class PaginatedInlineUniqueTests(SimpleTestCase):
+    CastFormSet = inlineformset_factory(
+        FilmWork, PersonFilmWork, formset=PaginatedInlineFormSet, fields=('person', 'role')
+    )
+
+    def setUp(self):
+        self.film = FilmWork(id=uuid.uuid4())
+        self.film._state.adding = False
+        self.person_id = uuid.uuid4()
+
+    def make_formset(self, *rows):
+        prefix = self.CastFormSet.get_default_prefix()
+        data = {
+            f'{prefix}-TOTAL_FORMS': str(len(rows)),
+            f'{prefix}-INITIAL_FORMS': '0',
+        }
+        for number, (person_id, role) in enumerate(rows):
+            data[f'{prefix}-{number}-person'] = str(person_id)
+            data[f'{prefix}-{number}-role'] = role
+        return self.CastFormSet(data, instance=self.film)
+
+    def validate(self, formset, taken):
+        manager = mock.Mock()
+        manager.filter.return_value.exclude.return_value.values_list.return_value = taken
+        with mock.patch.object(PersonFilmWork._meta, 'default_manager', manager):
+            return formset.is_valid(), manager
+
+    def test_duplicate_of_row_on_another_page_is_rejected(self):
+        formset = self.make_formset((self.person_id, 'actor'))
+
+        is_valid, manager = self.validate(
+            formset, [(self.film.id, self.person_id, 'actor')]
+        )
+
+        self.assertFalse(is_valid)
+        self.assertTrue(formset.forms[0].non_field_errors())
+        self.assertTrue(formset.non_form_errors())
+        manager.filter.return_value.exclude.assert_called_once_with(pk__in=[])
+
+    def test_new_row_is_accepted(self):
+        formset = self.make_formset((self.person_id, 'director'))
+
+        is_valid, manager = self.validate(formset, [])
+
+        self.assertTrue(is_valid)
+        manager.filter.assert_called_once()
+
+    def test_new_film_skips_database_check(self):
+        self.film._state.adding = True
+        formset = self.make_formset((self.person_id, 'actor'))
+
+        is_valid, manager = self.validate(formset, [])
+
+        self.assertTrue(is_valid)
+        manager.filter.assert_not_called()
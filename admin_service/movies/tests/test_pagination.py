@@ -0,0 +1,128 @@
+import uuid
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from movies.pagination import (
+    InvalidCursor,
+    Row,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+
+
+class FakeQuerySet:
+    """Список строк с теми фильтрами, которые использует keyset_page.
+
+    Базы в тестах нет, поэтому фильтры разбираются здесь. Порядок всегда
+    (creation_date DESC NULLS LAST, id DESC), как в представлении.
+    """
+
+    def __init__(self, rows, filters=()):
+        self.rows = rows
+        self.filters = filters
+
+    def order_by(self, *fields):
+        return self
+
+    def alias(self, **aliases):
+        return self
+
+    def filter(self, **lookups):
+        return FakeQuerySet(self.rows, self.filters + tuple(lookups.items()))
+
+    def _matches(self, row):
+        for lookup, value in self.filters:
+            if lookup == 'creation_date__isnull':
+                if (row['creation_date'] is None) != value:
+                    return False
+            elif lookup == 'id__lt':
+                if not row['id'] < value:
+                    return False
+            elif lookup == 'keyset__lt':
+                assert isinstance(value, Row)
+                bound = tuple(v.value for v in value.get_source_expressions())
+                if not (row['creation_date'], row['id']) < bound:
+                    return False
+            else:
+                raise AssertionError(lookup)
+        return True
+
+    def __getitem__(self, item):
+        rows = sorted(
+            filter(self._matches, self.rows),
+            key=lambda row: (
+                row['creation_date'] is not None,
+                row['creation_date'] or date.min,
+                row['id'],
+            ),
+            reverse=True,
+        )
+        return rows[item]
+
+
+def make_rows():
+    dates = [date(2020, 1, 1)] * 3 + [date(2021, 5, 5), date(1999, 9, 9)] + [None] * 4
+    return [{'id': uuid.uuid4(), 'creation_date': d} for d in dates]
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        pk = uuid.uuid4()
+        day = date(2020, 1, 2)
+
+        self.assertEqual(decode_cursor(encode_cursor(day, pk)), (day, pk))
+        self.assertEqual(decode_cursor(encode_cursor(None, pk)), (None, pk))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', encode_cursor(None, uuid.uuid4())[:-4], 'fHh4'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+class KeysetPageTests(SimpleTestCase):
+    def walk(self, rows, page_size):
+        queryset = FakeQuerySet(rows)
+        pages, cursor = [], None
+        while True:
+            page, cursor = keyset_page(queryset, cursor, page_size)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_all_rows_in_order(self):
+        rows = make_rows()
+        expected = FakeQuerySet(rows)[:]
+
+        for page_size in (1, 2, 3, 4, 9, 20):
+            with self.subTest(page_size=page_size):
+                pages = self.walk(rows, page_size)
+                self.assertEqual([row for page in pages for row in page], expected)
+                self.assertTrue(all(len(page) <= page_size for page in pages))
+
+    def test_null_dates_go_last(self):
+        rows = make_rows()
+
+        pages = self.walk(rows, 3)
+
+        flat = [row['creation_date'] for page in pages for row in page]
+        self.assertEqual(flat[-4:], [None] * 4)
+        self.assertNotIn(None, flat[:-4])
+
+    def test_cursor_inside_null_segment(self):
+        rows = make_rows()
+        expected = FakeQuerySet(rows)[:]
+        last_dated, first_undated = expected[4], expected[5]
+
+        page, _cursor = keyset_page(
+            FakeQuerySet(rows), encode_cursor(None, first_undated['id']), 10
+        )
+        self.assertEqual(page, expected[6:])
+
+        page, _cursor = keyset_page(
+            FakeQuerySet(rows),
+            encode_cursor(last_dated['creation_date'], last_dated['id']),
+            10,
+        )
+        self.assertEqual(page, expected[5:])
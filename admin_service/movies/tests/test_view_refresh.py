@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from movies.models import FilmWorkDenormalized
+
+
+class FakeCursor:
+    """Отвечает на запросы refresh_stale по заранее заданному сценарию."""
+
+    def __init__(self, lock_results, requested=0, refreshed=0):
+        self.lock_results = list(lock_results)
+        self.requested = requested
+        self.refreshed = refreshed
+        self.statements = []
+        self._result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+        if 'pg_try_advisory_lock' in sql:
+            self._result = (self.lock_results.pop(0),)
+        elif sql.startswith('SELECT requested FROM'):
+            stale = self.requested > self.refreshed
+            self._result = (self.requested,) if stale else None
+        elif sql.startswith('SELECT requested > refreshed'):
+            self._result = (self.requested > self.refreshed,)
+        elif 'SET refreshed' in sql:
+            self.refreshed = params[0]
+
+    def fetchone(self):
+        return self._result
+
+
+class RefreshStaleTests(SimpleTestCase):
+    def run_refresh(self, cursor):
+        manager = FilmWorkDenormalized.objects
+        with mock.patch('movies.models.connection') as connection, mock.patch.object(
+            type(manager), 'refresh'
+        ) as refresh:
+            connection.cursor.return_value = cursor
+            manager.refresh_stale()
+        return refresh
+
+    def test_busy_lock_leaves_refresh_to_holder(self):
+        cursor = FakeCursor(lock_results=[False], requested=3, refreshed=1)
+
+        refresh = self.run_refresh(cursor)
+
+        refresh.assert_not_called()
+        self.assertEqual(cursor.refreshed, 1)
+
+    def test_pending_requests_coalesce_into_one_refresh(self):
+        cursor = FakeCursor(lock_results=[True], requested=5, refreshed=1)
+
+        refresh = self.run_refresh(cursor)
+
+        refresh.assert_called_once_with()
+        self.assertEqual(cursor.refreshed, 5)
+        self.assertTrue(any('pg_advisory_unlock' in sql for sql in cursor.statements))
+
+    def test_up_to_date_view_is_not_refreshed(self):
+        cursor = FakeCursor(lock_results=[True], requested=2, refreshed=2)
+
+        refresh = self.run_refresh(cursor)
+
+        refresh.assert_not_called()
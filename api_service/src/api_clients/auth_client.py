@@ -1,24 +1,68 @@
+from functools import lru_cache
+
 import httpx
 from pydantic import BaseModel
 from core.config import settings
 
 
 class AuthClient:
+    """Клиент сервиса авторизации с одним httpx.AsyncClient на процесс.
+
+    validate_role ходит в сервис на каждый запрос, поэтому соединения
+    переиспользуются, а не открываются заново. Клиент создаётся при первом
+    обращении и закрывается в lifespan.
+    """
+
     def __init__(self) -> None:
-        pass
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=settings.AUTH_SERVICE_API)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def check_role(self, access_token: str, user_id: str, role: str):
-        async with httpx.AsyncClient(base_url=settings.AUTH_SERVICE_API) as client:
+        response = await self.client.post(
+            "/roles/check",
+            headers={'Authorization': f'Bearer {access_token}'},
+            json={'user_id': user_id, "role_name": role},
+        )
 
-            response = await client.post(
-                "/roles/check",
-                headers={'Authorization': f'Bearer {access_token}'},
-                json={'user_id': user_id, "role_name": role},
+        if response.status_code != 200:
+            raise Exception(
+                f"Login failed: {response.status_code}, {response.text}"
             )
 
-            if response.status_code != 200:
-                raise Exception(
-                    f"Login failed: {response.status_code}, {response.text}"
-                )
+        return response
+
+    async def check_roles(
+        self, access_token: str, user_id: str, roles: list[str]
+    ) -> list[bool]:
+        """Проверяет все роли пользователя одним запросом."""
+        response = await self.client.post(
+            "/roles/check/bulk",
+            headers={'Authorization': f'Bearer {access_token}'},
+            json={
+                'items': [
+                    {'user_id': user_id, 'role_name': role} for role in roles
+                ]
+            },
+        )
+
+        if response.status_code != 200:
+            raise Exception(
+                f"Role check failed: {response.status_code}, {response.text}"
+            )
+
+        return response.json()
+
 
-            return response
+@lru_cache()
+def get_auth_client() -> AuthClient:
+    return AuthClient()
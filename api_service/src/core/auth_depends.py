@@ -2,10 +2,11 @@ from enum import Enum
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from api_clients.auth_client import AuthClient
+from api_clients.auth_client import get_auth_client
 from schemas.user import User
 from core.config import settings
 from core.logger import app_logger
+from core.revocation import get_revocation_list
 
 
 class RoleEnum(str, Enum):
@@ -40,19 +41,21 @@ async def validate_role(
         if user_id is None or login is None or payload_roles is None:
             raise credentials_exception
 
+        if await get_revocation_list().is_revoked(
+            payload.get("jti"), user_id=user_id, issued_at=payload.get("iat")
+        ):
+            raise credentials_exception
+
         app_logger.error(use_auth_service)
         if use_auth_service:
-            authClient = AuthClient()
             try:
-                for role in payload_roles.split(','):
-                    valid_role = await authClient.check_role(
-                        access_token=token,
-                        user_id=user_id,
-                        role=role,
-                    )
-                    app_logger.error("valid_role-" + str(valid_role.text))
-                    if not valid_role.text:
-                        raise credentials_exception
+                checked = await get_auth_client().check_roles(
+                    access_token=token,
+                    user_id=user_id,
+                    roles=payload_roles.split(','),
+                )
+                if not all(checked):
+                    raise credentials_exception
             except Exception as e:
                 app_logger.error("e-" + str(e))
                 if not use_graceful_degradation:
@@ -31,5 +31,10 @@ class Settings(BaseSettings):
     )
     ALGORITHM: str = Field("HS256", alias='ALGORITHM')
 
+    # Отозванные access-токены: снимок в фильтре Блума в каждом воркере
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_REBUILD_SECONDS: int = 10 * 60
+
 
 settings = Settings()
@@ -6,8 +6,10 @@ from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
 
 from api.v1 import films, genres, persons
+from api_clients.auth_client import get_auth_client
 from core.config import settings
 from core.logger import app_logger
+from core.revocation import get_revocation_list
 from db import elastic as elastic_db
 from db import redis as redis_db
 
@@ -32,8 +34,11 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         app_logger.error(f"Failed to connect to Elasticsearch: {e}", exc_info=True)
         # raise
+    get_revocation_list().start()
     yield
     # Shutdown
+    await get_revocation_list().stop()
+    await get_auth_client().close()
     if redis_db.redis:
         await redis_db.redis.close()
         app_logger.info("Redis connection closed.")
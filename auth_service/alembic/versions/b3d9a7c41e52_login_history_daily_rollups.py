@@ -0,0 +1,75 @@
+"""Daily login rollups
+
+Revision ID: b3d9a7c41e52
+Revises: e99641bd063d
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from collections import Counter
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.core.user_agent import user_agent_family
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9a7c41e52'
+down_revision: Union[str, Sequence[str], None] = 'e99641bd063d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_login_daily',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('logins', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'day'),
+    )
+    op.create_table(
+        'user_agent_login_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('agent_family', sa.String(length=50), nullable=False),
+        sa.Column('logins', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'agent_family'),
+    )
+
+    # Заполняем агрегаты по уже накопленной истории.
+    op.execute(
+        'INSERT INTO user_login_daily (user_id, day, logins) '
+        'SELECT user_id, auth_date::date, count(*) '
+        'FROM users_auth_history GROUP BY user_id, auth_date::date'
+    )
+    # Семейство клиента определяется в Python, поэтому из базы читаются
+    # уже сгруппированные по дню и User-Agent строки.
+    per_agent = Counter()
+    rows = op.get_bind().execute(sa.text(
+        'SELECT auth_date::date AS day, user_agent, count(*) AS logins '
+        'FROM users_auth_history GROUP BY 1, 2'
+    ))
+    for day, user_agent, logins in rows:
+        per_agent[day, user_agent_family(user_agent)] += logins
+    if per_agent:
+        op.bulk_insert(
+            sa.table(
+                'user_agent_login_daily',
+                sa.column('day', sa.Date()),
+                sa.column('agent_family', sa.String()),
+                sa.column('logins', sa.Integer()),
+            ),
+            [
+                {'day': day, 'agent_family': family, 'logins': logins}
+                for (day, family), logins in sorted(per_agent.items())
+            ],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_agent_login_daily')
+    op.drop_table('user_login_daily')
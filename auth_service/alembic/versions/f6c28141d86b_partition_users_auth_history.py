@@ -0,0 +1,117 @@
+"""Partition users_auth_history by month
+
+Revision ID: f6c28141d86b
+Revises: f448afc317c9
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.core.config import settings
+from src.db.partitions import (
+    add_months,
+    create_partition_sql,
+    month_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c28141d86b'
+down_revision: Union[str, Sequence[str], None] = 'f448afc317c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Init-миграция создала обычную таблицу, хотя модель объявлена
+    # партиционированной. Пересоздаём её и переносим данные.
+    op.execute('ALTER TABLE users_auth_history RENAME TO users_auth_history_old')
+    op.execute(
+        'ALTER TABLE users_auth_history_old '
+        'RENAME CONSTRAINT users_auth_history_pkey TO users_auth_history_old_pkey'
+    )
+    op.execute(
+        'ALTER TABLE users_auth_history_old '
+        'RENAME CONSTRAINT users_auth_history_user_id_fkey '
+        'TO users_auth_history_old_user_id_fkey'
+    )
+    op.execute(
+        """
+        CREATE TABLE users_auth_history (
+            id UUID NOT NULL,
+            user_agent TEXT NOT NULL,
+            auth_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id UUID NOT NULL,
+            CONSTRAINT users_auth_history_pkey PRIMARY KEY (id, auth_date),
+            CONSTRAINT users_auth_history_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (auth_date)
+        """
+    )
+    op.create_index(
+        'ix_users_auth_history_user_id_auth_date',
+        'users_auth_history',
+        ['user_id', sa.text('auth_date DESC')],
+    )
+
+    # Партиции нужны под все переносимые строки и на
+    # LOGIN_HISTORY_PARTITIONS_AHEAD месяцев вперёд. Месяцы за окном хранения
+    # потом отсоединит обычное обслуживание партиций.
+    current = month_start(datetime.utcnow().date())
+    oldest = op.get_bind().execute(
+        sa.text('SELECT min(auth_date) FROM users_auth_history_old')
+    ).scalar()
+    month = min(month_start(oldest.date()), current) if oldest else current
+    while month <= add_months(current, settings.LOGIN_HISTORY_PARTITIONS_AHEAD):
+        op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+
+    op.execute(
+        """
+        INSERT INTO users_auth_history (id, user_agent, auth_date, user_id)
+        SELECT id, user_agent, auth_date, user_id
+        FROM users_auth_history_old
+        """
+    )
+    op.drop_table('users_auth_history_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER TABLE users_auth_history RENAME TO users_auth_history_part')
+    op.execute(
+        'ALTER TABLE users_auth_history_part '
+        'RENAME CONSTRAINT users_auth_history_pkey TO users_auth_history_part_pkey'
+    )
+    op.execute(
+        'ALTER TABLE users_auth_history_part '
+        'RENAME CONSTRAINT users_auth_history_user_id_fkey '
+        'TO users_auth_history_part_user_id_fkey'
+    )
+    op.create_table(
+        'users_auth_history',
+        sa.Column('id', sa.UUID(), autoincrement=False, nullable=False),
+        sa.Column('user_agent', sa.TEXT(), autoincrement=False, nullable=False),
+        sa.Column('auth_date', sa.TIMESTAMP(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.UUID(), autoincrement=False, nullable=False),
+        sa.ForeignKeyConstraint(
+            ['user_id'],
+            ['users.id'],
+            name=op.f('users_auth_history_user_id_fkey'),
+            ondelete='CASCADE',
+        ),
+        sa.PrimaryKeyConstraint('id', name=op.f('users_auth_history_pkey')),
+    )
+    op.execute(
+        """
+        INSERT INTO users_auth_history (id, user_agent, auth_date, user_id)
+        SELECT id, user_agent, auth_date, user_id FROM users_auth_history_part
+        """
+    )
+    # Партиции удаляются вместе с родительской таблицей.
+    op.execute('DROP TABLE users_auth_history_part')
@@ -0,0 +1,98 @@
+"""Пропускная способность логина под конкурентной нагрузкой.
+
+Сравнивает проверку пароля прямо в event loop и через PasswordHasher.
+Параллельно с логинами крутится «лёгкий» запрос, который только отдаёт
+управление циклу: его задержка показывает, насколько логины мешают
+остальным эндпоинтам воркера.
+
+Запуск из каталога auth_service:
+    PYTHONPATH=.:src python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.services.password import PasswordHasher, PasswordHasherBusy
+
+
+async def inline_verify(password_hash: str, password: str) -> bool:
+    return check_password_hash(password_hash, password)
+
+
+async def run_case(verify, password_hash: str, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+    stop = asyncio.Event()
+    probe_latencies = []
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            try:
+                assert await verify(password_hash, "password")
+            except PasswordHasherBusy:
+                rejected += 1
+
+    async def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            probe_latencies.append((time.perf_counter() - started - 0.005) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    probe_latencies.sort()
+    p99 = probe_latencies[min(len(probe_latencies) - 1, int(len(probe_latencies) * 0.99))]
+    return {
+        "logins/s": (logins - rejected) / elapsed,
+        "rejected": rejected,
+        "probe p50 ms": statistics.median(probe_latencies),
+        "probe p99 ms": p99,
+    }
+
+
+async def main(args) -> None:
+    password_hash = generate_password_hash("password", args.method)
+    hashers = {
+        "threads": PasswordHasher(
+            method=args.method, workers=args.workers, max_pending=args.max_pending
+        ),
+        "processes": PasswordHasher(
+            method=args.method,
+            workers=args.workers,
+            max_pending=args.max_pending,
+            use_processes=True,
+        ),
+    }
+    cases = {"inline": inline_verify}
+    cases.update({name: hasher.verify for name, hasher in hashers.items()})
+
+    print(f"{'case':<10} {'logins/s':>10} {'rejected':>9} {'probe p50 ms':>13} {'probe p99 ms':>13}")
+    try:
+        for name, verify in cases.items():
+            result = await run_case(verify, password_hash, args.logins, args.concurrency)
+            print(
+                f"{name:<10} {result['logins/s']:>10.1f} {result['rejected']:>9} "
+                f"{result['probe p50 ms']:>13.2f} {result['probe p99 ms']:>13.2f}"
+            )
+    finally:
+        for hasher in hashers.values():
+            hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--method", default="scrypt:32768:8:1")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+"""Стоимость метрик на горячем пути.
+
+Замеряет inc() буферизованного и обычного счётчика и observe() гистограммы
+с заранее выбранными метками и с вызовом labels() на каждую операцию - в
+обычном режиме и в multiprocess-режиме, где значения пишутся в mmap-файлы.
+Каждый режим запускается в отдельном процессе: prometheus_client выбирает
+хранилище значений при импорте.
+
+Запуск из каталога auth_service:
+    PYTHONPATH=.:src python -m benchmarks.metrics_overhead --iterations 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CASES = (
+    ("buffered counter.inc()", "ACCESS_TOKENS_ISSUED.inc()"),
+    ("counter.inc()", "counter.inc()"),
+    ("counter.labels().inc()", 'TOKENS_ISSUED.labels(type="access").inc()'),
+    ("histogram.observe()", "PASSWORD_HASH.observe(0.05)"),
+    (
+        "histogram.labels().observe()",
+        'PASSWORD_HASH_DURATION.labels(operation="hash").observe(0.05)',
+    ),
+)
+
+
+def run_cases(iterations: int) -> None:
+    from src.core import metrics
+
+    namespace = {**vars(metrics), "counter": metrics.TOKENS_ISSUED.labels(type="access")}
+    for name, statement in CASES:
+        code = compile(statement, name, "exec")
+        started = time.perf_counter()
+        for _ in range(iterations):
+            exec(code, namespace)
+        elapsed = time.perf_counter() - started
+        # Цикл с exec пустого выражения - базовая линия, её вычитаем.
+        empty = compile("pass", "empty", "exec")
+        started = time.perf_counter()
+        for _ in range(iterations):
+            exec(empty, namespace)
+        baseline = time.perf_counter() - started
+        print(f"  {name:<32} {(elapsed - baseline) / iterations * 1e9:>8.0f} ns")
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as multiproc_dir:
+        for title, extra_env in (
+            ("single process", {}),
+            ("multiprocess", {"PROMETHEUS_MULTIPROC_DIR": multiproc_dir}),
+        ):
+            print(title)
+            env = {k: v for k, v in os.environ.items() if k != "PROMETHEUS_MULTIPROC_DIR"}
+            sys.stdout.flush()
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.metrics_overhead",
+                 "--iterations", str(args.iterations), "--child"],
+                env={**env, **extra_env},
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_cases(args.iterations)
+    else:
+        main(args)
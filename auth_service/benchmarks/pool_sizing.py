@@ -0,0 +1,134 @@
+"""Подбор размера пула соединений под число воркеров.
+
+Запускает --workers процессов, как gunicorn, и в каждом --concurrency
+конкурентных «запросов»: соединение из пула и запрос длительностью
+--query-ms. Для каждого размера пула печатает пропускную способность,
+задержки и ожидание соединения, а в конце - наименьший размер, который
+даёт не меньше 95% лучшей пропускной способности. Размеры, при которых
+воркеры вместе превысят max_connections базы, пропускаются.
+
+Нужна работающая база из настроек POSTGRES_*. Запуск из каталога auth_service:
+    PYTHONPATH=.:src python -m benchmarks.pool_sizing --workers 4 --sizes 2,5,10,20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.config import settings
+from src.db.pool import pool_options
+
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def worker_load(pool_size: int, args) -> dict:
+    options = {**pool_options(settings), "pool_size": pool_size, "max_overflow": 0}
+    engine = create_async_engine(str(settings.POSTGRES_DSN), **options)
+    latencies, waits, timeouts = [], [], 0
+    deadline = None
+
+    async def client():
+        nonlocal timeouts
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    waits.append(time.perf_counter() - started)
+                    await conn.execute(QUERY, {"seconds": args.query_ms / 1000})
+            except exc.TimeoutError:
+                timeouts += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    # Прогрев: соединения открываются до начала замера.
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    await engine.dispose()
+    return {"latencies": latencies, "waits": waits, "timeouts": timeouts}
+
+
+def run_worker(pool_size: int, args, results) -> None:
+    results.append(asyncio.run(worker_load(pool_size, args)))
+
+
+def run_case(pool_size: int, args) -> dict:
+    with multiprocessing.Manager() as manager:
+        results = manager.list()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(pool_size, args, results))
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        results = list(results)
+
+    latencies = [value for result in results for value in result["latencies"]]
+    waits = [value for result in results for value in result["waits"]]
+    return {
+        "rps": len(latencies) / args.duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "wait_p99_ms": percentile(waits, 99) * 1000,
+        "timeouts": sum(result["timeouts"] for result in results),
+    }
+
+
+async def max_connections() -> int:
+    engine = create_async_engine(str(settings.POSTGRES_DSN))
+    async with engine.connect() as conn:
+        value = (await conn.execute(text("SHOW max_connections"))).scalar()
+    await engine.dispose()
+    return int(value)
+
+
+def main(args) -> None:
+    limit = asyncio.run(max_connections())
+    # Запас на миграции, CLI и соединения администратора.
+    budget = limit - args.reserved
+    print(f"max_connections={limit}, workers={args.workers}, reserved={args.reserved}")
+    print(
+        f"{'pool':>5} {'conns':>6} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'wait p99':>9} {'timeouts':>9}"
+    )
+
+    results = {}
+    for size in args.sizes:
+        if size * args.workers > budget:
+            print(f"{size:>5} {size * args.workers:>6}  skipped: over max_connections")
+            continue
+        result = run_case(size, args)
+        results[size] = result
+        print(
+            f"{size:>5} {size * args.workers:>6} {result['rps']:>9.0f} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['wait_p99_ms']:>9.1f} {result['timeouts']:>9}"
+        )
+
+    if results:
+        best = max(result["rps"] for result in results.values())
+        size = min(size for size, result in results.items() if result["rps"] >= best * 0.95)
+        print(f"\nRecommended POSTGRES_POOL_SIZE={size} for {args.workers} workers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50, help="запросов на воркер")
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")],
+                        default=[2, 5, 10, 15, 20, 30])
+    parser.add_argument("--query-ms", type=float, default=5)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--reserved", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""Пропускная способность прежнего и нового middleware для X-Request-Id.
+
+Прежний вариант - @app.middleware('http') (BaseHTTPMiddleware), который
+сначала выполняет обработчик и только потом проверяет заголовок. Новый -
+RequestIdMiddleware на чистом ASGI. Обработчик имитирует работу запроса
+(--handler-ms), поэтому видно и цену самого middleware, и то, сколько
+стоят отклонённые запросы. Запросы идут через ASGITransport, без сети.
+
+Запуск из каталога auth_service:
+    PYTHONPATH=.:src python -m benchmarks.request_id_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from src.core.request_id import RequestIdMiddleware
+
+
+def make_app(handler_ms: float, legacy: bool) -> tuple[FastAPI, list]:
+    handled = []
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/ping")
+    async def ping():
+        handled.append(1)
+        if handler_ms:
+            await asyncio.sleep(handler_ms / 1000)
+        return {"status": "ok"}
+
+    if legacy:
+        @app.middleware("http")
+        async def before_request(request: Request, call_next):
+            response = await call_next(request)
+            request_id = request.headers.get("X-Request-Id")
+            if not request_id:
+                return ORJSONResponse(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    content={"detail": "X-Request-Id is required"},
+                )
+            return response
+    else:
+        app.add_middleware(RequestIdMiddleware)
+
+    return app, handled
+
+
+async def run_case(app: FastAPI, requests: int, concurrency: int, headers: dict):
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def call():
+            async with semaphore:
+                await client.get("/ping", headers=headers)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+
+async def main(args) -> None:
+    print(f"{'case':<34} {'req/s':>9} {'handled':>8}")
+    for legacy in (True, False):
+        name = "BaseHTTPMiddleware" if legacy else "RequestIdMiddleware"
+        for label, headers in (
+            ("with id", {"X-Request-Id": "bench"}),
+            ("without id", {}),
+        ):
+            app, handled = make_app(args.handler_ms, legacy)
+            rps = await run_case(app, args.requests, args.concurrency, headers)
+            print(f"{name + ', ' + label:<34} {rps:>9.0f} {len(handled):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--handler-ms", type=float, default=0)
+    asyncio.run(main(parser.parse_args()))
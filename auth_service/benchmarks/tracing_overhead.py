@@ -0,0 +1,120 @@
+"""Накладные расходы декоратора traced на один вызов.
+
+Сравнивает прежний декоратор (str(args) и str(kwargs) в каждом span) с
+текущим: при полной выборке, при head sampling 10% и с выключенной
+трассировкой. Span экспортируются в память, без сети.
+
+Запуск из каталога auth_service:
+    PYTHONPATH=.:src python -m benchmarks.tracing_overhead --calls 20000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from functools import wraps
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from src.core import tracing
+from src.core.config import settings
+from src.schemas.user import UserRegister
+
+
+class NullExporter(SpanExporter):
+    def export(self, spans):
+        return SpanExportResult.SUCCESS
+
+
+def legacy_traced(tracer, endpoint_name=None):
+    """Декоратор в том виде, в котором он был до выборки и allow-list."""
+
+    def decorator(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            span_name = endpoint_name or func.__name__
+            with tracer.start_as_current_span(span_name) as span:
+                span.set_attribute("function.name", func.__name__)
+                span.set_attribute("function.module", func.__module__)
+                span.set_attribute("function.args", str(args))
+                span.set_attribute("function.kwargs", str(kwargs))
+                try:
+                    result = await func(*args, **kwargs)
+                    span.set_status(trace.Status(trace.StatusCode.OK))
+                    return result
+                except Exception as e:
+                    span.record_exception(e)
+                    span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+                    raise
+
+        return async_wrapper
+
+    return decorator
+
+
+def make_tracer(ratio: float):
+    provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(ratio)))
+    provider.add_span_processor(SimpleSpanProcessor(NullExporter()))
+    return provider.get_tracer(__name__)
+
+
+async def service_call(self, user_id, user_data):
+    return user_id
+
+
+def build_cases():
+    full, sampled = make_tracer(1.0), make_tracer(0.1)
+    cases = {"no decorator": service_call}
+    cases["legacy, all spans"] = legacy_traced(full)(service_call)
+
+    settings.TRACING_ENABLED = True
+    decorated = tracing.traced("service_call", capture=("user_id",))(service_call)
+    cases["traced, all spans"] = (full, decorated)
+    cases["traced, 10% head sampling"] = (sampled, decorated)
+
+    settings.TRACING_ENABLED = False
+    cases["traced, disabled"] = tracing.traced(
+        "service_call", capture=("user_id",)
+    )(service_call)
+    return cases
+
+
+async def measure(func, calls: int, args) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await func(*args)
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+async def main(calls: int) -> None:
+    # Служебный объект и payload с паролем: именно их прежний декоратор
+    # превращал в строку на каждом вызове.
+    args = (
+        object(),
+        uuid.uuid4(),
+        UserRegister(
+            login="user",
+            email="user@example.com",
+            password="password",
+            first_name="User",
+            last_name="Benchmark",
+            avatar=None,
+            phone=None,
+            city=None,
+        ),
+    )
+    print(f"{'case':<28} {'us/call':>10}")
+    for name, case in build_cases().items():
+        if isinstance(case, tuple):
+            tracing.tracer, case = case
+        await measure(case, calls // 10, args)
+        print(f"{name:<28} {await measure(case, calls, args):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20_000)
+    asyncio.run(main(parser.parse_args().calls))
@@ -0,0 +1,21 @@
+# Настройки gunicorn для мультипроцессных метрик Prometheus.
+# PROMETHEUS_MULTIPROC_DIR задаётся в окружении контейнера до запуска
+# мастера, чтобы воркеры писали метрики в общий каталог.
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    # Файлы прошлого запуска дали бы завышенные счётчики.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # livesum-метрики (соединения пула) умершего воркера больше не учитываются.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,34 +1,51 @@
+from uuid import uuid4
+
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from src.core.dependencies import get_current_user, oauth2_scheme
 from src.core.tracing import traced
-from src.models.entity import User
-from src.schemas.auth import RefreshTokenSchema, TokenResponse
+from src.schemas.auth import Principal, RefreshTokenSchema, TokenResponse
 from src.schemas.user import UserLogin
 from src.services.auth import AuthService, get_auth_service
 from src.services.user import UserService, get_user_service
-from src.core.limiter import limiter
+from src.core.limiter import Rate, client_ip, limit_by_ip, limit_by_user, limiter
 
 router = APIRouter()
 
+# Неудачные попытки входа под одним логином с одного IP. Засчитываются
+# только ошибки и по паре (логин, IP), иначе любой мог бы заблокировать
+# вход чужому аккаунту.
+LOGIN_FAILURES_PER_USER = Rate.parse("5/minute")
+
 
 @traced("api_login_user")
-@router.post("/login", response_model=TokenResponse)
-@limiter.limit("10/minute")
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(limit_by_ip("10/minute"))],
+)
 async def login(
     request: Request,
     user_data: UserLogin,
     user_service: UserService = Depends(get_user_service),
     auth_service: AuthService = Depends(get_auth_service),
 ):
-    user = await user_service.get_user_by_login(user_data.login)
-    if not user or not user.check_password(user_data.password):
+    failures_key = f"login:user:{user_data.login}:{client_ip(request)}"
+    await limiter.check(
+        failures_key, LOGIN_FAILURES_PER_USER, "login:user", consume=False
+    )
+    user = await user_service.authenticate(user_data.login, user_data.password)
+    if not user:
+        await limiter.hit(failures_key, LOGIN_FAILURES_PER_USER)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect login or password",
         )
+    principal = await user_service.cache_principal(user)
 
-    access_token = await auth_service.create_access_token(user)
-    refresh_token = await auth_service.create_refresh_token(user)
+    # Каждый логин открывает отдельную сессию устройства.
+    session_id = str(uuid4())
+    access_token = await auth_service.create_access_token(principal, session_id)
+    refresh_token = await auth_service.create_refresh_token(principal, session_id)
 
     user_agent = request.headers.get("user-agent")
     await user_service.login(user_id=user.id, user_agent=user_agent)
@@ -37,28 +54,46 @@ async def login(
 
 
 @traced("api_logout_user")
-@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-@limiter.limit("10/minute")
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(limit_by_user("10/minute"))],
+)
 async def logout(
     request: Request,
     access_token: str = Depends(oauth2_scheme),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     auth_service: AuthService = Depends(get_auth_service),
 ):
     await auth_service.logout(user=current_user, access_token=access_token)
     return True
 
 
+@traced("api_logout_all_user")
+@router.post(
+    "/logout/all",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(limit_by_user("10/minute"))],
+)
+async def logout_all(
+    current_user: Principal = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    await auth_service.logout_all(user_id=current_user.id)
+    return True
+
+
 @traced("api_refresh_token")
 @router.post(
     "/refresh",
     response_model=TokenResponse,
+    dependencies=[Depends(limit_by_ip("10/minute"))],
 )
-@limiter.limit("10/minute")
 async def refresh_token(
     request: Request,
     data: RefreshTokenSchema,
     auth_service: AuthService = Depends(get_auth_service),
+    user_service: UserService = Depends(get_user_service),
 ):
-    token_response = await auth_service.refresh(data.refresh_token)
+    token_response = await auth_service.refresh(data.refresh_token, user_service)
     return token_response
@@ -5,8 +5,14 @@ from sqlalchemy.exc import IntegrityError
 
 from src.core.dependencies import get_current_user, require_superuser
 from src.core.tracing import traced
-from src.models.entity import User
-from src.schemas.role import RoleName, RoleSchema, RoleUserSchema
+from src.schemas.auth import Principal
+from src.schemas.role import (
+    RoleBulkResult,
+    RoleName,
+    RoleSchema,
+    RoleUserBulkSchema,
+    RoleUserSchema,
+)
 from src.services.role import RoleService, get_role_service
 from opentelemetry import trace
 
@@ -110,9 +116,41 @@ async def check_role(
     user_id: UUID = Body(),
     role_name: str = Body(),
     role_service: RoleService = Depends(get_role_service),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> bool:
     has_role = await role_service.check_role(
         RoleUserSchema(user_id=user_id, role_name=role_name)
     )
     return has_role
+
+
+@traced("api_check_roles_bulk")
+@router.post('/check/bulk')
+async def check_roles_bulk(
+    data: RoleUserBulkSchema,
+    role_service: RoleService = Depends(get_role_service),
+    current_user: Principal = Depends(get_current_user),
+) -> list[bool]:
+    """Проверка списка пар (пользователь, роль); ответы в порядке запроса."""
+    return await role_service.check_roles(data.items)
+
+
+@traced("api_set_roles_bulk")
+@router.post('/set/bulk', status_code=HTTPStatus.OK)
+async def set_roles_bulk(
+    data: RoleUserBulkSchema,
+    role_service: RoleService = Depends(get_role_service),
+    super_user=Depends(require_superuser),
+) -> RoleBulkResult:
+    """Назначает роли; уже назначенные и несуществующие пары пропускаются."""
+    return await role_service.set_roles(data.items)
+
+
+@traced("api_revoke_roles_bulk")
+@router.post('/revoke/bulk', status_code=HTTPStatus.OK)
+async def revoke_roles_bulk(
+    data: RoleUserBulkSchema,
+    role_service: RoleService = Depends(get_role_service),
+    super_user=Depends(require_superuser),
+) -> RoleBulkResult:
+    return await role_service.revoke_roles(data.items)
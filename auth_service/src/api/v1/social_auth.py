@@ -1,19 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
-from fastapi_sso.sso.yandex import YandexSSO
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import ORJSONResponse
 
-from src.models.entity import User
 from src.services.auth import AuthService, get_auth_service
+from src.services.oauth import STATE_COOKIE, get_yandex_oauth
 from src.services.user import UserService, get_user_service
-from src.core.config import settings
 
 
-yandex_sso = YandexSSO(
-    client_id=settings.YANDEX_CLIENT_ID,
-    client_secret=settings.YANDEX_CLIENT_SECRET,
-    redirect_uri=settings.YANDEX_REDIRECT_URI,
-    allow_insecure_http=True,  # Для локальной разработки по HTTP
-)
+# Один клиент на воркер: HTTP-соединения с Яндексом переиспользуются.
+yandex_sso = get_yandex_oauth()
 
 router = APIRouter(prefix="/oauth/yandex", tags=["social_auth"])
 
@@ -32,8 +28,8 @@ async def yandex_callback(
 ):
     """
     Обработка ответа от Яндекса после аутентификации пользователя.
-    Если пользователь с таким email уже есть, он будет аутентифицирован.
-    Если нет — будет создан новый пользователь и затем аутентифицирован.
+    Пользователь ищется по аккаунту Яндекса, затем по email; если его
+    нет, он будет создан и затем аутентифицирован.
     """
     try:
         user_info = await yandex_sso.verify_and_process(request)
@@ -43,18 +39,18 @@ async def yandex_callback(
             detail=f"Failed to verify Yandex user: {e}",
         )
 
-    user = await user_service.get_user_by_email(email=user_info.email)
-    if not user:
-        user = await user_service.create_social_user(
-            email=user_info.email,
-            first_name=user_info.first_name,
-            last_name=user_info.last_name,
-        )
+    principal = await user_service.resolve_social_user(user_info)
 
-    access_token = await auth_service.create_access_token(user)
-    refresh_token = await auth_service.create_refresh_token(user)
+    session_id = str(uuid4())
+    access_token = await auth_service.create_access_token(principal, session_id)
+    refresh_token = await auth_service.create_refresh_token(principal, session_id)
 
     user_agent = request.headers.get("user-agent")
-    await user_service.login(user_id=user.id, user_agent=user_agent)
-
-    return ORJSONResponse(content={"access_token": access_token, "refresh_token": refresh_token})
\ No newline at end of file
+    await user_service.login(user_id=principal.id, user_agent=user_agent)
+
+    response = ORJSONResponse(
+        content={"access_token": access_token, "refresh_token": refresh_token}
+    )
+    # state одноразовый.
+    response.delete_cookie(STATE_COOKIE)
+    return response
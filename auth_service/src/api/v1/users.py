@@ -1,9 +1,19 @@
+from datetime import date, datetime, timedelta
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from src.core.dependencies import get_current_user
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from src.core.config import settings
+from src.core.dependencies import get_current_user, require_superuser
 from src.core.tracing import traced
-from src.models.entity import User
-from src.schemas.user import UserRegister, UserUpdateCredentials
+from src.schemas.auth import Principal
+from src.repositories.user_repository import UserLoadProfile
+from src.schemas.user import (
+    DailyLogins,
+    UserAgentLogins,
+    UserRegister,
+    UserUpdateCredentials,
+)
+from src.services.auth import AuthService, get_auth_service
 from src.services.role import RoleService, get_role_service
 from src.services.user import UserService, get_user_service
 from opentelemetry import trace
@@ -18,7 +28,9 @@ async def register_user(
     user_service: UserService = Depends(get_user_service),
     role_service: RoleService = Depends(get_role_service),
 ) -> bool:
-    user = await user_service.get_user_by_login(login=user_data.login)
+    user = await user_service.get_user_by_login(
+        login=user_data.login, profile=UserLoadProfile.PRINCIPAL
+    )
     if user:
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
@@ -34,7 +46,7 @@ async def register_user(
 @router.post("/me/credentials", status_code=status.HTTP_200_OK)
 async def update_user_credentials(
     update_data: UserUpdateCredentials,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
 ):
     if not update_data.login and not update_data.password:
@@ -49,17 +61,121 @@ async def update_user_credentials(
     return {"user_id": updated_user.id, 'login': updated_user.login}
 
 
+@traced("api_deactivate_user")
+@router.post("/{user_id}/deactivate", status_code=status.HTTP_200_OK)
+async def deactivate_user(
+    user_id: UUID,
+    user_service: UserService = Depends(get_user_service),
+    auth_service: AuthService = Depends(get_auth_service),
+    super_user: Principal = Depends(require_superuser),
+) -> bool:
+    if not await user_service.set_active(user_id=user_id, is_active=False):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="User not found")
+    await auth_service.logout_all(user_id=user_id)
+    return True
+
+
+@traced("api_activate_user")
+@router.post("/{user_id}/activate", status_code=status.HTTP_200_OK)
+async def activate_user(
+    user_id: UUID,
+    user_service: UserService = Depends(get_user_service),
+    super_user: Principal = Depends(require_superuser),
+) -> bool:
+    if not await user_service.set_active(user_id=user_id, is_active=True):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="User not found")
+    return True
+
+
 @traced("api_me_login_history_user")
 @router.get("/me/login-history", status_code=status.HTTP_200_OK)
 async def get_user_login_history(
+    response: Response,
     page: int = Query(default=1, ge=1, description="Номер страницы"),
     size: int = Query(default=10, ge=1, le=100, description="Размер страницы"),
-    current_user: User = Depends(get_current_user),
+    cursor: str | None = Query(
+        default=None,
+        description=(
+            "Курсор из заголовка X-Next-Cursor. Пустое значение - первая "
+            "страница; при указании курсора page игнорируется"
+        ),
+    ),
+    current_user: Principal = Depends(get_current_user),
     user_service: UserService = Depends(get_user_service),
 ):
-    user_history_list = await user_service.get_login_history_paginated(
-        user_id=current_user.id, page=page, size=size
-    )
+    if cursor is not None:
+        user_history_list, next_cursor = (
+            await user_service.get_login_history_by_cursor(
+                user_id=current_user.id, cursor=cursor, size=size
+            )
+        )
+        # Тело остаётся списком, как и при постраничной выдаче.
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        user_history_list = await user_service.get_login_history_paginated(
+            user_id=current_user.id, page=page, size=size
+        )
     return [
         {"user_agent": h.user_agent, 'login_at': h.auth_date} for h in user_history_list
     ]
+
+
+def stats_period(
+    date_from: date | None = Query(
+        default=None, description="Первый день (UTC), по умолчанию - 30 дней назад"
+    ),
+    date_to: date | None = Query(
+        default=None, description="Последний день (UTC) включительно, по умолчанию - сегодня"
+    ),
+) -> tuple[date, date]:
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="date_from is after date_to"
+        )
+    if (date_to - date_from).days >= settings.LOGIN_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Period is longer than {settings.LOGIN_STATS_MAX_DAYS} days",
+        )
+    return date_from, date_to
+
+
+# Статистика читается из суточных агрегатов, а не из users_auth_history,
+# поэтому время ответа не зависит от объёма истории.
+@traced("api_login_stats")
+@router.get("/stats/logins", status_code=status.HTTP_200_OK)
+async def get_login_stats(
+    period: tuple[date, date] = Depends(stats_period),
+    user_service: UserService = Depends(get_user_service),
+    super_user: Principal = Depends(require_superuser),
+) -> list[DailyLogins]:
+    date_from, date_to = period
+    return await user_service.get_login_stats(date_from=date_from, date_to=date_to)
+
+
+@traced("api_user_agent_stats")
+@router.get("/stats/user-agents", status_code=status.HTTP_200_OK)
+async def get_user_agent_stats(
+    period: tuple[date, date] = Depends(stats_period),
+    user_service: UserService = Depends(get_user_service),
+    super_user: Principal = Depends(require_superuser),
+) -> list[UserAgentLogins]:
+    date_from, date_to = period
+    return await user_service.get_user_agent_stats(date_from=date_from, date_to=date_to)
+
+
+@traced("api_user_login_stats")
+@router.get("/{user_id}/stats/logins", status_code=status.HTTP_200_OK)
+async def get_user_login_stats(
+    user_id: UUID,
+    period: tuple[date, date] = Depends(stats_period),
+    user_service: UserService = Depends(get_user_service),
+    super_user: Principal = Depends(require_superuser),
+) -> list[DailyLogins]:
+    date_from, date_to = period
+    return await user_service.get_login_stats(
+        date_from=date_from, date_to=date_to, user_id=user_id
+    )
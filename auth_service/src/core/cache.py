@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+from redis.exceptions import RedisError
+
+from src.core.logger import app_logger
+
+_MISSING = object()
+
+# Записывает значение, только если поколение в KEYS[2] не сменилось с момента,
+# когда его прочитали перед загрузкой из базы.
+# ARGV: поколение, ttl, "set" (SADD значений) или "string" (SET), значения.
+GUARDED_STORE_SCRIPT = """
+local generation = redis.call('GET', KEYS[2]) or '0'
+if generation ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if ARGV[3] == 'set' then
+    redis.call('SADD', KEYS[1], unpack(ARGV, 4))
+else
+    redis.call('SET', KEYS[1], ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class LocalTTLCache:
+    """Небольшой LRU-кеш в памяти процесса с временем жизни записей.
+
+    Другие воркеры об инвалидации не узнают, поэтому ttl должен быть коротким:
+    он и есть максимальная задержка, с которой изменение видно везде.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class GenerationGuard:
+    """Счётчик поколений рядом с ключами Redis-кеша.
+
+    Запись идёт в базу, а кеш после коммита инвалидируется: поколение
+    увеличивается, значение удаляется. Загрузчик читает поколение до
+    запроса в базу, и store() пропускает запись, если оно успело смениться,
+    - иначе загрузка, начатая до инвалидации, вернула бы в кеш устаревшее.
+    """
+
+    def __init__(self, name: str, ttl: int) -> None:
+        self.name = name
+        self.ttl = ttl
+        self._script = None
+        self._script_redis = None
+
+    def _get_script(self, redis):
+        # register_script сам делает EVALSHA и перезагружает скрипт
+        # после NOSCRIPT; пересоздаём его только при смене клиента.
+        if self._script is None or self._script_redis is not redis:
+            self._script = redis.register_script(GUARDED_STORE_SCRIPT)
+            self._script_redis = redis
+        return self._script
+
+    async def store(
+        self,
+        redis,
+        key: str,
+        generation_key: str,
+        generation: str | None,
+        values: Iterable[str],
+        as_set: bool = False,
+    ) -> bool:
+        try:
+            stored = await self._get_script(redis)(
+                keys=[key, generation_key],
+                args=[generation or "0", self.ttl, "set" if as_set else "string", *values],
+            )
+        except RedisError as e:
+            app_logger.warning(f"{self.name} unavailable: {e}")
+            return False
+        return bool(stored)
+
+    async def invalidate(self, redis, keys: Iterable[tuple[str, str]]) -> None:
+        """keys - пары (ключ значения, ключ поколения)."""
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, generation_key in keys:
+                    pipe.incr(generation_key)
+                    pipe.expire(generation_key, self.ttl)
+                    pipe.delete(key)
+                await pipe.execute()
+        except RedisError as e:
+            app_logger.error(f"Failed to invalidate {self.name.lower()}: {e}")
@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = 'auth-db'
     POSTGRES_PORT: int = 5432
 
+    # Пул соединений на один воркер: при N воркерах в базу открывается до
+    # N * (POOL_SIZE + MAX_OVERFLOW) соединений. Подбирается benchmarks.pool_sizing.
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 10
+    POSTGRES_POOL_TIMEOUT: float = 5
+    POSTGRES_POOL_RECYCLE: int = 30 * 60
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 500
+
     @computed_field
     @property
     def POSTGRES_DSN(self) -> PostgresDsn:
@@ -34,6 +43,30 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Реплики для запросов только на чтение: "host:port" через запятую.
+    # Пусто - все запросы идут в основную базу.
+    POSTGRES_REPLICA_HOSTS: str = ''
+
+    @computed_field
+    @property
+    def POSTGRES_REPLICA_DSNS(self) -> list[str]:
+        dsns = []
+        for item in filter(None, map(str.strip, self.POSTGRES_REPLICA_HOSTS.split(','))):
+            host, _, port = item.partition(':')
+            dsns.append(str(PostgresDsn.build(
+                scheme="postgresql+asyncpg",
+                username=self.POSTGRES_USER,
+                password=self.POSTGRES_PASSWORD,
+                host=host,
+                port=int(port or self.POSTGRES_PORT),
+                path=self.POSTGRES_DB,
+            )))
+        return dsns
+
+    # Сколько секунд после своей записи пользователь читает только из основной
+    # базы: должно быть больше типичного лага реплик. 0 - не отслеживать.
+    POSTGRES_READ_YOUR_WRITES_SECONDS: int = 5
+
     # Настройки для JWT
     SECRET_KEY: str = 'your-super-secret-key-for-auth-service'
     ALGORITHM: str = 'HS256'
@@ -41,14 +74,86 @@ class Settings(BaseSettings):
     # Исправлена ошибка: alias был 'ACCESS_TOKEN_EXPIRE_MINUTES'
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Хеширование паролей. Метод указывается целиком, с параметрами стоимости,
+    # в том виде, в котором werkzeug пишет его в начало хеша: хеши с другим
+    # префиксом пересчитываются при следующем успешном входе.
+    PASSWORD_HASH_METHOD: str = 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS: int = 4
+    # Сколько проверок может ждать пула, прежде чем отвечать 503.
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # scrypt и pbkdf2 отпускают GIL, поэтому по умолчанию хватает потоков.
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+
+    # Отложенная запись истории входов через Redis Stream.
+    LOGIN_HISTORY_WRITE_BEHIND: bool = True
+    LOGIN_HISTORY_BATCH_SIZE: int = 500
+    LOGIN_HISTORY_BLOCK_MS: int = 1000
+    # Через сколько событие, не подтверждённое другим воркером, забирается себе.
+    LOGIN_HISTORY_CLAIM_IDLE_MS: int = 60_000
+    LOGIN_HISTORY_STREAM_MAXLEN: int = 1_000_000
+    # После стольких неудачных доставок событие уходит в dead-letter stream.
+    LOGIN_HISTORY_MAX_DELIVERIES: int = 10
+
+    # Помесячные партиции users_auth_history.
+    LOGIN_HISTORY_PARTITIONS_AHEAD: int = 3
+    LOGIN_HISTORY_RETENTION_MONTHS: int = 12
+    # По умолчанию старые партиции отсоединяются, а не удаляются.
+    LOGIN_HISTORY_DROP_EXPIRED: bool = False
+    # Обслуживание партиций из приложения; 0 - только через CLI.
+    LOGIN_HISTORY_PARTITION_INTERVAL_SECONDS: int = 6 * 60 * 60
+    # Наибольший период, за который отдаётся статистика входов.
+    LOGIN_STATS_MAX_DAYS: int = 366
+
+    # Кеш ролей пользователей: Redis и короткий кеш в памяти воркера.
+    ROLE_CACHE_TTL: int = 60 * 60
+    ROLE_CACHE_LOCAL_TTL: float = 5
+    ROLE_CACHE_LOCAL_SIZE: int = 10_000
+
+    # Кеш principal для проверки access-токенов.
+    PRINCIPAL_CACHE_TTL: int = 5 * 60
+    PRINCIPAL_CACHE_LOCAL_TTL: float = 5
+    PRINCIPAL_CACHE_LOCAL_SIZE: int = 10_000
+
+    # Отозванные access-токены: фильтр Блума в каждом воркере.
+    REVOCATION_BLOOM_CAPACITY: int = 100_000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_REBUILD_SECONDS: int = 10 * 60
+
+    # Запросы без X-Request-Id отклоняются; если False, id генерируется.
+    REQUEST_ID_REQUIRED: bool = True
+
+    # Как часто буферизованные счётчики переносятся в метрики Prometheus.
+    METRICS_FLUSH_SECONDS: float = 1
+
+    # Лимиты запросов хранятся в Redis и общие для всех воркеров.
+    RATE_LIMIT_ENABLED: bool = True
+    # Адреса и подсети прокси (nginx), которым доверяются X-Real-IP и
+    # X-Forwarded-For, через запятую. Иначе клиентом считался бы сам nginx,
+    # и все пользователи делили бы один лимит на IP.
+    RATE_LIMIT_TRUSTED_PROXIES: str = '127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16'
+
     JAEGER_ENDPOINT: str = 'http://jaeger:4317'
     JAEGER_SERVICE_NAME: str = ''
     TRACING_ENABLED: bool = True
+    # Доля трасс, которые записываются с самого начала (head sampling).
+    TRACING_SAMPLE_RATIO: float = 0.2
+    # Из записанных трасс экспортируются все с ошибкой или медленнее
+    # TRACING_SLOW_SPAN_MS и только эта доля остальных (tail sampling).
+    TRACING_TAIL_SAMPLING: bool = True
+    TRACING_SLOW_SPAN_MS: float = 500
+    TRACING_TAIL_KEEP_RATIO: float = 0.25
+    # Бюджет атрибутов span для аргументов функций.
+    TRACING_MAX_ATTRIBUTES: int = 8
+    TRACING_ATTRIBUTE_MAX_LENGTH: int = 128
+    TRACING_CONSOLE_EXPORT: bool = False
 
     # Настройки для Yandex OAuth
     YANDEX_CLIENT_ID: str = ''
     YANDEX_CLIENT_SECRET: str = ''
     YANDEX_REDIRECT_URI: str = ''
+    OAUTH_TIMEOUT: float = 5
+    # Соответствие (провайдер, id в соцсети) -> id пользователя.
+    SOCIAL_ACCOUNT_CACHE_TTL: int = 24 * 60 * 60
 
 
 settings = Settings()
@@ -3,7 +3,8 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
 from src.core.config import settings
-from src.models.entity import User
+from src.db.postgres import bind_actor
+from src.schemas.auth import Principal
 from src.services.auth import AuthService, get_auth_service
 from src.services.user import UserService, get_user_service
 
@@ -14,10 +15,12 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     auth_service: AuthService = Depends(get_auth_service),
     user_service: UserService = Depends(get_user_service),
-) -> User:
-    return await auth_service.get_user_from_token(token, user_service)
+) -> Principal:
+    principal = await auth_service.get_user_from_token(token, user_service)
+    await bind_actor(user_service.session, principal.id)
+    return principal
 
 
-async def require_superuser(current_user: User = Depends(get_current_user)):
+async def require_superuser(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Superuser privileges required")
\ No newline at end of file
@@ -1,4 +1,176 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+from fastapi import Depends, Request
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.dependencies import get_current_user
+from src.core.logger import app_logger
+from src.core.metrics import rate_limit_rejected
+from src.db import redis as redis_db
+from src.schemas.auth import Principal
+
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+# GCRA: в ключе хранится теоретическое время прихода следующего запроса (TAT).
+# Возвращает 0, если запрос пропущен, иначе сколько миллисекунд ждать.
+# Время берётся у Redis, чтобы часы воркеров не влияли на результат.
+# С ARGV[3] = 1 только проверяет, не засчитывая запрос.
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - interval * burst
+if allow_at > now then
+    return allow_at - now
+end
+if ARGV[3] ~= '1' then
+    redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+end
+return 0
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Rate:
+    count: int
+    period: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Разбирает лимит вида "10/minute"."""
+        count, period = value.split("/")
+        return cls(count=int(count), period=PERIODS[period.strip()])
+
+    @property
+    def interval_ms(self) -> int:
+        return max(1, self.period * 1000 // self.count)
+
+
+class RateLimiter:
+    """Распределённый лимитер на Redis: один EVALSHA на проверку.
+
+    Если Redis недоступен, запросы пропускаются: лучше временно остаться
+    без лимита, чем отказать в логине всем пользователям.
+    """
+
+    def __init__(self, prefix: str = "rate_limit") -> None:
+        self.prefix = prefix
+        self._script = None
+        self._script_redis = None
+
+    def _get_script(self, redis):
+        # register_script сам делает EVALSHA и перезагружает скрипт
+        # после NOSCRIPT; пересоздаём его только при смене клиента.
+        if self._script is None or self._script_redis is not redis:
+            self._script = redis.register_script(GCRA_SCRIPT)
+            self._script_redis = redis
+        return self._script
+
+    async def hit(self, key: str, rate: Rate, consume: bool = True) -> float:
+        """Засчитывает запрос; возвращает 0 или сколько секунд ждать.
+
+        consume=False только проверяет, пропустил бы лимит запрос.
+        """
+        redis = redis_db.redis
+        if not settings.RATE_LIMIT_ENABLED or redis is None:
+            return 0
+        args = [rate.interval_ms, rate.count]
+        if not consume:
+            args.append(1)
+        try:
+            wait_ms = await self._get_script(redis)(
+                keys=[f"{self.prefix}:{key}"], args=args
+            )
+        except RedisError as e:
+            app_logger.warning(f"Rate limiter unavailable: {e}")
+            return 0
+        return int(wait_ms) / 1000
+
+    async def check(
+        self, key: str, rate: Rate, limit: str = "other", consume: bool = True
+    ) -> None:
+        """limit - имя лимита для метрики, без IP и id пользователя."""
+        retry_after = await self.hit(key, rate, consume=consume)
+        if retry_after:
+            rate_limit_rejected(limit)
+            raise RateLimitExceeded(retry_after)
+
+
+limiter = RateLimiter()
+
+
+@lru_cache()
+def trusted_proxies() -> tuple:
+    items = settings.RATE_LIMIT_TRUSTED_PROXIES.split(",")
+    return tuple(ip_network(item.strip(), strict=False) for item in items if item.strip())
+
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies())
+
+
+def client_ip(request: Request) -> str:
+    """IP клиента; заголовкам прокси верим, только если пришли от него."""
+    if request.client is None:
+        return "unknown"
+    peer = request.client.host
+    if not is_trusted_proxy(peer):
+        return peer
+    real_ip = request.headers.get("x-real-ip", "").strip()
+    if real_ip:
+        return real_ip
+    # Справа налево: первый адрес, добавленный не нашим прокси.
+    for hop in reversed(request.headers.get("x-forwarded-for", "").split(",")):
+        hop = hop.strip()
+        if hop and not is_trusted_proxy(hop):
+            return hop
+    return peer
+
+
+def limit_by_ip(rate: str):
+    """Зависимость FastAPI: лимит на маршрут для одного IP."""
+    parsed = Rate.parse(rate)
+
+    async def dependency(request: Request) -> None:
+        route = request.scope["route"].path
+        await limiter.check(f"{route}:ip:{client_ip(request)}", parsed, f"{route}:ip")
+
+    return dependency
+
+
+def limit_by_user(rate: str):
+    """Зависимость FastAPI: лимит на маршрут для аутентифицированного пользователя."""
+    parsed = Rate.parse(rate)
+
+    async def dependency(
+        request: Request, current_user: Principal = Depends(get_current_user)
+    ) -> None:
+        route = request.scope["route"].path
+        await limiter.check(f"{route}:user:{current_user.id}", parsed, f"{route}:user")
+
+    return dependency
+
+
+def retry_after_header(exc: RateLimitExceeded) -> dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
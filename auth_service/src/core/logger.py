@@ -1,13 +1,16 @@
 from logging import config as logging_config
 import logging
 
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
 LOG_DEFAULT_HANDLERS = [
     'console',
 ]
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'src.core.request_id.RequestIdFilter'},
+    },
     'formatters': {
         'verbose': {'format': LOG_FORMAT},
         'default': {
@@ -25,6 +28,7 @@ LOGGING = {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['request_id'],
         },
         'default': {
             'formatter': 'default',
@@ -0,0 +1,269 @@
+"""Метрики Prometheus для /metrics.
+
+Под gunicorn каждый воркер - отдельный процесс, поэтому при заданной
+PROMETHEUS_MULTIPROC_DIR значения пишутся в mmap-файлы этого каталога, а
+/metrics собирает их со всех воркеров. Переменная читается prometheus_client
+при импорте, её нужно задать до запуска процессов (см. Dockerfile и
+gunicorn.conf.py).
+
+На горячем пути метки выбираются заранее: labels() ищет дочернюю метрику
+под блокировкой и стоит дороже самого inc(). Счётчики к тому же
+буферизуются: inc() в multiprocess-режиме - запись в mmap под блокировкой,
+около микросекунды, а BufferedCounter.inc() - сложение целых чисел.
+В Prometheus накопленное переносит MetricsFlusher раз в
+METRICS_FLUSH_SECONDS и сам /metrics перед ответом.
+"""
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from src.core.logger import app_logger
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "auth_http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "auth_password_hash_duration_seconds",
+    "Время хеширования и проверки пароля, включая ожидание пула",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASHER_REJECTIONS = Counter(
+    "auth_password_hasher_rejections_total",
+    "Запросы, отклонённые из-за переполненной очереди хеширования",
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "auth_redis_command_duration_seconds",
+    "Время выполнения команды или pipeline в Redis",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "auth_rate_limit_rejections_total",
+    "Запросы, отклонённые лимитером",
+    ["limit"],
+)
+TOKENS_ISSUED = Counter(
+    "auth_tokens_issued_total", "Выданные токены", ["type"]
+)
+TOKEN_REFRESHES = Counter(
+    "auth_token_refreshes_total", "Обмены refresh-токена", ["result"]
+)
+
+
+
+class BufferedCounter:
+    """Счётчик для горячего пути, накапливающий значение в процессе.
+
+    Вызывается только из потока event loop, поэтому без блокировок.
+    """
+
+    __slots__ = ("_child", "_pending")
+
+    def __init__(self, child) -> None:
+        self._child = child
+        self._pending = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self._pending += amount
+
+    def flush(self) -> None:
+        pending, self._pending = self._pending, 0
+        if pending:
+            self._child.inc(pending)
+
+
+_buffered: list[BufferedCounter] = []
+
+
+def buffered(child) -> BufferedCounter:
+    counter = BufferedCounter(child)
+    _buffered.append(counter)
+    return counter
+
+
+def flush_counters() -> None:
+    for counter in _buffered:
+        counter.flush()
+
+
+ACCESS_TOKENS_ISSUED = buffered(TOKENS_ISSUED.labels(type="access"))
+REFRESH_TOKENS_ISSUED = buffered(TOKENS_ISSUED.labels(type="refresh"))
+REFRESHES_OK = buffered(TOKEN_REFRESHES.labels(result="ok"))
+REFRESHES_REJECTED = buffered(TOKEN_REFRESHES.labels(result="rejected"))
+PASSWORD_HASHER_BUSY = buffered(PASSWORD_HASHER_REJECTIONS)
+PASSWORD_HASH = PASSWORD_HASH_DURATION.labels(operation="hash")
+PASSWORD_VERIFY = PASSWORD_HASH_DURATION.labels(operation="verify")
+
+# Запросы, не дошедшие до маршрута (404, отказ middleware), сводятся
+# в одну метку, чтобы произвольные пути не раздували число рядов.
+UNMATCHED_ROUTE = "unmatched"
+
+_rate_limits: dict[str, BufferedCounter] = {}
+
+
+def rate_limit_rejected(limit: str) -> None:
+    counter = _rate_limits.get(limit)
+    if counter is None:
+        counter = buffered(RATE_LIMIT_REJECTIONS.labels(limit=limit))
+        _rate_limits[limit] = counter
+    counter.inc()
+
+
+def metrics_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> tuple[bytes, str]:
+    flush_counters()
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+class MetricsFlusher:
+    """Фоновая задача воркера, переносящая буферизованные счётчики."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            flush_counters()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+            app_logger.info("Metrics flusher started.")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        flush_counters()
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: гистограмма времени ответа по шаблону маршрута.
+
+    Шаблон ("/api/v1/users/{user_id}/activate") известен только после
+    маршрутизации, поэтому строится из scope уже после вызова приложения.
+    """
+
+    @staticmethod
+    def route_template(scope) -> str:
+        # scope["route"].path у маршрута из include_router - без префикса
+        # роутера, поэтому шаблон восстанавливается из пути запроса:
+        # значения path-параметров заменяются их именами.
+        if scope.get("route") is None:
+            return UNMATCHED_ROUTE
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+        if not names:
+            return path
+        return "/".join(
+            f"{{{names[segment]}}}" if segment in names else segment
+            for segment in path.split("/")
+        )
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._children = {}
+
+    def _observer(self, method: str, route: str, status: int):
+        key = (method, route, status)
+        child = self._children.get(key)
+        if child is None:
+            child = HTTP_REQUEST_DURATION.labels(
+                method=method, route=route, status=str(status)
+            )
+            self._children[key] = child
+        return child
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self._observer(scope["method"], self.route_template(scope), status).observe(
+                time.perf_counter() - started
+            )
+
+
+_redis_commands = {}
+
+
+def _redis_observer(command: str):
+    child = _redis_commands.get(command)
+    if child is None:
+        child = REDIS_COMMAND_DURATION.labels(command=command)
+        _redis_commands[command] = child
+    return child
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _redis_observer("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis, который замеряет время каждой команды и pipeline."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _redis_observer(str(args[0]).upper()).observe(
+                time.perf_counter() - started
+            )
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None):
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
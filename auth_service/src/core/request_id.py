@@ -0,0 +1,89 @@
+import logging
+import re
+import uuid
+from contextvars import ContextVar
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from opentelemetry import trace
+
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в записи лога request_id текущего запроса."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class RequestIdMiddleware:
+    """ASGI-middleware для X-Request-Id.
+
+    Запрос без заголовка или с некорректным значением отклоняется до того,
+    как дойдёт до обработчика. Если заголовок не обязателен, id генерируется.
+    Id доступен через request_id_var, пишется в логи и span и
+    возвращается в ответе.
+    """
+
+    def __init__(
+        self, app, required: bool = True, exempt_paths: tuple[str, ...] = ("/metrics",)
+    ) -> None:
+        self.app = app
+        self.required = required
+        self.exempt_paths = frozenset(exempt_paths)
+
+    @staticmethod
+    def _route_path(scope) -> str:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            return path[len(root_path):]
+        return path
+
+    @staticmethod
+    async def _reject(scope, receive, send, detail: str) -> None:
+        response = ORJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST, content={"detail": detail}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+
+        if request_id is None:
+            if self.required and self._route_path(scope) not in self.exempt_paths:
+                await self._reject(scope, receive, send, "X-Request-Id is required")
+                return
+            request_id = uuid.uuid4().hex
+        elif not REQUEST_ID_PATTERN.fullmatch(request_id):
+            await self._reject(scope, receive, send, "X-Request-Id is invalid")
+            return
+
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute("http.request_id", request_id)
+
+        header = (REQUEST_ID_HEADER, request_id.encode("latin-1"))
+
+        async def send_with_request_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,29 +1,90 @@
-from opentelemetry import trace
-from functools import wraps
+import inspect
 import logging
+import random
+import threading
+from collections import OrderedDict
+from enum import Enum
+from functools import wraps
+from uuid import UUID
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+
+from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+tracer = trace.get_tracer(__name__)
+
+# Имена аргументов, которые не попадают в атрибуты даже по явному запросу.
+SENSITIVE_ARGS = ("password", "token", "secret")
+
+# Значения этих типов безопасно и дёшево превращаются в строку;
+# для остальных (сессии, сервисы, pydantic-схемы) пишется только имя типа.
+SCALAR_TYPES = (str, int, float, bool, UUID, Enum)
+
+
+def format_attribute(value) -> str:
+    if value is None or isinstance(value, SCALAR_TYPES):
+        text = str(value.value if isinstance(value, Enum) else value)
+    else:
+        text = f"<{type(value).__name__}>"
+    limit = settings.TRACING_ATTRIBUTE_MAX_LENGTH
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _capture_plan(func, capture) -> list[tuple[str, int]]:
+    """Для каждого разрешённого аргумента - его позиция в *args."""
+    for name in capture:
+        if any(word in name.lower() for word in SENSITIVE_ARGS):
+            raise ValueError(f"Argument {name!r} must not be captured in traces")
+    params = list(inspect.signature(func).parameters)
+    plan = []
+    for name in capture[: settings.TRACING_MAX_ATTRIBUTES]:
+        if name not in params:
+            raise ValueError(f"{func.__qualname__} has no argument {name!r}")
+        plan.append((name, params.index(name)))
+    return plan
+
+
+def _set_attributes(span, func, plan, args, kwargs) -> None:
+    span.set_attribute("function.name", func.__name__)
+    span.set_attribute("function.module", func.__module__)
+    for name, position in plan:
+        if name in kwargs:
+            value = kwargs[name]
+        elif position < len(args):
+            value = args[position]
+        else:
+            continue
+        span.set_attribute(f"function.arg.{name}", format_attribute(value))
+
 
-def traced(endpoint_name=None):
-    """Декоратор для трассировки функций."""
+def traced(endpoint_name=None, capture: tuple[str, ...] = ()):
+    """Декоратор для трассировки функций.
+
+    В атрибуты span попадают только аргументы из capture, в усечённом виде.
+    Если трассировка выключена, функция возвращается без обёртки.
+    """
 
     def decorator(func):
+        plan = _capture_plan(func, capture)
+        if not settings.TRACING_ENABLED:
+            return func
+        span_name = endpoint_name or func.__name__
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            tracer = trace.get_tracer(__name__)
-            span_name = endpoint_name or func.__name__
-
-            with tracer.start_as_current_span(span_name) as span:
-                span.set_attribute("function.name", func.__name__)
-                span.set_attribute("function.module", func.__module__)
-                span.set_attribute("function.args", str(args))
-                span.set_attribute("function.kwargs", str(kwargs))
+            # Исключение записываем сами, иначе SDK добавит второе событие.
+            with tracer.start_as_current_span(
+                span_name, record_exception=False, set_status_on_exception=False
+            ) as span:
+                # Span вне выборки не записывается: атрибуты не считаем.
+                if span.is_recording():
+                    _set_attributes(span, func, plan, args, kwargs)
 
                 try:
-                    result = await func(*args, **kwargs)
-                    span.set_status(trace.Status(trace.StatusCode.OK))
-                    return result
+                    return await func(*args, **kwargs)
                 except Exception as e:
                     span.record_exception(e)
                     span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
@@ -35,25 +96,26 @@ def traced(endpoint_name=None):
     return decorator
 
 
-def traced_sync(endpoint_name=None):
+def traced_sync(endpoint_name=None, capture: tuple[str, ...] = ()):
     """Декоратор для синхронных функций."""
 
     def decorator(func):
+        plan = _capture_plan(func, capture)
+        if not settings.TRACING_ENABLED:
+            return func
+        span_name = endpoint_name or func.__name__
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            tracer = trace.get_tracer(__name__)
-            span_name = endpoint_name or func.__name__
-
-            with tracer.start_as_current_span(span_name) as span:
-                span.set_attribute("function.name", func.__name__)
-                span.set_attribute("function.module", func.__module__)
-                span.set_attribute("function.args", str(args))
-                span.set_attribute("function.kwargs", str(kwargs))
+            # Исключение записываем сами, иначе SDK добавит второе событие.
+            with tracer.start_as_current_span(
+                span_name, record_exception=False, set_status_on_exception=False
+            ) as span:
+                if span.is_recording():
+                    _set_attributes(span, func, plan, args, kwargs)
 
                 try:
-                    result = func(*args, **kwargs)
-                    span.set_status(trace.Status(trace.StatusCode.OK))
-                    return result
+                    return func(*args, **kwargs)
                 except Exception as e:
                     span.record_exception(e)
                     span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
@@ -63,3 +125,67 @@ def traced_sync(endpoint_name=None):
         return wrapper
 
     return decorator
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """Отбирает трассы целиком после завершения корневого span процесса.
+
+    Span копятся по trace_id; когда завершается локальный корень, трасса
+    уходит в delegate, если в ней была ошибка, корень дольше slow_ms или
+    она попала в долю keep_ratio. Остальные отбрасываются.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        slow_ms: float,
+        keep_ratio: float,
+        max_traces: int = 10_000,
+        max_spans: int = 256,
+    ) -> None:
+        self.delegate = delegate
+        self.slow_ns = slow_ms * 1_000_000
+        self.keep_ratio = keep_ratio
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._traces: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    @staticmethod
+    def _is_error(span: ReadableSpan) -> bool:
+        return span.status.status_code is trace.StatusCode.ERROR
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._traces.pop(trace_id, [])
+            if not is_root:
+                if len(spans) < self.max_spans:
+                    spans.append(span)
+                self._traces[trace_id] = spans
+                # Корень, который так и не завершился, не должен держать память.
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+                return
+        spans.append(span)
+        if not self._keep(span, spans):
+            return
+        for item in spans:
+            self.delegate.on_end(item)
+
+    def _keep(self, root: ReadableSpan, spans: list[ReadableSpan]) -> bool:
+        if any(self._is_error(item) for item in spans):
+            return True
+        if root.end_time - root.start_time >= self.slow_ns:
+            return True
+        return random.random() < self.keep_ratio
+
+    def shutdown(self) -> None:
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
@@ -0,0 +1,34 @@
+# User-Agent приходит от клиента и ничем не ограничен, а входит в покрывающий
+# индекс истории входов: строка btree-индекса не может превышать ~2.7 КБ.
+USER_AGENT_MAX_LENGTH = 512
+
+# Порядок важен: Chrome пишет в User-Agent и "Safari", Edge и Opera - и "Chrome".
+USER_AGENT_FAMILIES = (
+    ("Edg/", "Edge"),
+    ("OPR/", "Opera"),
+    ("YaBrowser/", "Yandex"),
+    ("Firefox/", "Firefox"),
+    ("Chrome/", "Chrome"),
+    ("CriOS/", "Chrome"),
+    ("Safari/", "Safari"),
+    ("okhttp/", "Android app"),
+    ("CFNetwork/", "iOS app"),
+    ("curl/", "curl"),
+    ("python-", "Python"),
+)
+UNKNOWN_FAMILY = "Unknown"
+OTHER_FAMILY = "Other"
+
+
+def user_agent_family(user_agent: str | None) -> str:
+    """Семейство клиента для агрегатов истории входов."""
+    if not user_agent:
+        return UNKNOWN_FAMILY
+    for marker, family in USER_AGENT_FAMILIES:
+        if marker in user_agent:
+            return family
+    return OTHER_FAMILY
+
+
+def clip_user_agent(user_agent: str | None) -> str:
+    return (user_agent or "")[:USER_AGENT_MAX_LENGTH]
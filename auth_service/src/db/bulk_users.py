@@ -0,0 +1,319 @@
+"""Массовый импорт и экспорт пользователей.
+
+Импорт: записи из CSV или NDJSON пачками копируются через COPY во временную
+таблицу, а из неё одним INSERT ... SELECT на таблицу переносятся в users,
+user_profiles и users_roles. Каждая пачка - отдельная транзакция, повторный
+импорт того же файла ничего не дублирует: пользователи сопоставляются по
+логину и обновляются.
+
+Пароли принимаются только уже захешированными (формат werkzeug
+"method$salt$hash"): открытый пароль в таблицу не попадёт.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Iterable, Iterator
+from uuid import UUID
+
+STAGING_TABLE = "import_users"
+
+# Порядок колонок staging-таблицы и записей для copy_records_to_table.
+COLUMNS = (
+    "id",
+    "login",
+    "email",
+    "password",
+    "is_active",
+    "is_superuser",
+    "created_at",
+    "first_name",
+    "last_name",
+    "avatar",
+    "phone",
+    "city",
+    "roles",
+)
+PROFILE_COLUMNS = ("first_name", "last_name", "avatar", "phone", "city")
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+    id uuid,
+    login text NOT NULL,
+    email text NOT NULL,
+    password text NOT NULL,
+    is_active boolean,
+    is_superuser boolean,
+    created_at timestamp,
+    first_name text,
+    last_name text,
+    avatar text,
+    phone text,
+    city text,
+    roles text[]
+) ON COMMIT DELETE ROWS
+"""
+
+# Логин в файле может повторяться: берётся последняя запись. Строки, чей
+# email уже принадлежит другому пользователю, пропускаются, а не роняют пачку.
+# Существующие пользователи обновляются отдельным UPDATE, а не через
+# ON CONFLICT: в EXCLUDED пустые is_active/is_superuser уже заменены
+# значениями по умолчанию, и повторный импорт включал бы заблокированных
+# и снимал права суперпользователя. Пустое поле оставляет текущее значение.
+UPSERT_USERS_SQL = f"""
+WITH source AS (
+    SELECT DISTINCT ON (login) *
+    FROM (SELECT *, row_number() OVER () AS position FROM {STAGING_TABLE}) numbered
+    ORDER BY login, position DESC
+),
+updated AS (
+    UPDATE users u SET
+        email = s.email,
+        password = s.password,
+        is_active = coalesce(s.is_active, u.is_active),
+        is_superuser = coalesce(s.is_superuser, u.is_superuser)
+    FROM source s
+    WHERE u.login = s.login
+      AND NOT EXISTS (
+        SELECT 1 FROM users o WHERE o.email = s.email AND o.login <> s.login
+      )
+    RETURNING u.id
+),
+inserted AS (
+    INSERT INTO users (id, login, email, password, is_active, is_superuser, created_at)
+    SELECT
+        coalesce(s.id, gen_random_uuid()),
+        s.login,
+        s.email,
+        s.password,
+        coalesce(s.is_active, true),
+        coalesce(s.is_superuser, false),
+        coalesce(s.created_at, now() AT TIME ZONE 'utc')
+    FROM source s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM users u WHERE u.login = s.login OR u.email = s.email
+    )
+    ON CONFLICT (login) DO NOTHING
+    RETURNING id
+)
+SELECT id, false AS inserted FROM updated
+UNION ALL
+SELECT id, true AS inserted FROM inserted
+"""
+
+# Дальше staging ссылается на настоящие id пользователей.
+RESOLVE_IDS_SQL = f"""
+UPDATE {STAGING_TABLE} s SET id = u.id FROM users u WHERE u.login = s.login
+"""
+
+UPSERT_PROFILES_SQL = f"""
+INSERT INTO user_profiles (id, user_id, {", ".join(PROFILE_COLUMNS)})
+SELECT DISTINCT ON (s.id) gen_random_uuid(), s.id, {", ".join(f"s.{c}" for c in PROFILE_COLUMNS)}
+FROM {STAGING_TABLE} s
+JOIN users u ON u.id = s.id AND u.email = s.email
+WHERE {" OR ".join(f"s.{c} IS NOT NULL" for c in PROFILE_COLUMNS)}
+ON CONFLICT (user_id) DO UPDATE SET
+    {", ".join(f"{c} = EXCLUDED.{c}" for c in PROFILE_COLUMNS)}
+"""
+
+CREATE_ROLES_SQL = f"""
+INSERT INTO roles (id, name, created_at)
+SELECT gen_random_uuid(), name, now() AT TIME ZONE 'utc'
+FROM (SELECT DISTINCT unnest(roles) AS name FROM {STAGING_TABLE}) names
+ON CONFLICT (name) DO NOTHING
+"""
+
+ASSIGN_ROLES_SQL = f"""
+INSERT INTO users_roles (id, user_id, role_id, created_at)
+SELECT gen_random_uuid(), s.id, r.id, now() AT TIME ZONE 'utc'
+FROM {STAGING_TABLE} s
+JOIN users u ON u.id = s.id AND u.email = s.email
+CROSS JOIN LATERAL unnest(s.roles) AS role_name
+JOIN roles r ON r.name = role_name
+ON CONFLICT (user_id, role_id) DO NOTHING
+"""
+
+UNKNOWN_ROLES_SQL = f"""
+SELECT DISTINCT role_name
+FROM {STAGING_TABLE}, unnest(roles) AS role_name
+WHERE NOT EXISTS (SELECT 1 FROM roles r WHERE r.name = role_name)
+"""
+
+# Роли - одной строкой через запятую, как их ждёт импорт из CSV.
+EXPORT_SQL = """
+SELECT
+    u.id, u.login, u.email, u.password, u.is_active, u.is_superuser, u.created_at,
+    p.first_name, p.last_name, p.avatar, p.phone, p.city,
+    array_to_string(ARRAY(
+        SELECT r.name FROM users_roles ur JOIN roles r ON r.id = ur.role_id
+        WHERE ur.user_id = u.id ORDER BY r.name
+    ), ',') AS roles
+FROM users u
+LEFT JOIN user_profiles p ON p.user_id = u.id
+ORDER BY u.login
+"""
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+FALSE_VALUES = {"0", "false", "f", "no", "n"}
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def _text(value) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _bool(value) -> bool | None:
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise InvalidRecord(f"not a boolean: {value!r}")
+
+
+def _roles(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return sorted({name.strip() for name in value if name and name.strip()})
+
+
+def parse_record(data: dict) -> tuple:
+    """Приводит запись из файла к кортежу колонок COLUMNS."""
+    login, email, password = (_text(data.get(key)) for key in ("login", "email", "password"))
+    if not login or not email or not password:
+        raise InvalidRecord("login, email and password are required")
+    if password.count("$") < 2:
+        raise InvalidRecord("password must be a werkzeug hash, not plain text")
+    try:
+        user_id = _text(data.get("id"))
+        created_at = _text(data.get("created_at"))
+        return (
+            UUID(user_id) if user_id else None,
+            login,
+            email,
+            password,
+            _bool(data.get("is_active")),
+            _bool(data.get("is_superuser")),
+            datetime.fromisoformat(created_at).replace(tzinfo=None) if created_at else None,
+            *(_text(data.get(key)) for key in PROFILE_COLUMNS),
+            _roles(data.get("roles")),
+        )
+    except ValueError as e:
+        raise InvalidRecord(str(e)) from e
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[dict]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+
+
+def detect_format(path: str) -> str:
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    unknown_roles: set[str] = field(default_factory=set)
+    errors: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+
+def batches(
+    records: Iterable[dict], size: int, stats: ImportStats, max_errors: int = 20
+) -> Iterator[list[tuple]]:
+    batch = []
+    for number, data in enumerate(records, start=1):
+        stats.read += 1
+        try:
+            batch.append(parse_record(data))
+        except (InvalidRecord, AttributeError) as e:
+            stats.invalid += 1
+            if len(stats.errors) < max_errors:
+                stats.errors.append(f"record {number}: {e}")
+            continue
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def import_batch(conn, batch: list[tuple], create_roles: bool, stats: ImportStats):
+    """Импортирует пачку в одной транзакции; возвращает id обновлённых пользователей.
+
+    conn - соединение asyncpg.
+    """
+    async with conn.transaction():
+        await conn.execute(CREATE_STAGING_SQL)
+        await conn.copy_records_to_table(STAGING_TABLE, records=batch, columns=COLUMNS)
+        users = await conn.fetch(UPSERT_USERS_SQL)
+        await conn.execute(RESOLVE_IDS_SQL)
+        await conn.execute(UPSERT_PROFILES_SQL)
+        if create_roles:
+            await conn.execute(CREATE_ROLES_SQL)
+        else:
+            stats.unknown_roles.update(row[0] for row in await conn.fetch(UNKNOWN_ROLES_SQL))
+        await conn.execute(ASSIGN_ROLES_SQL)
+
+    inserted = sum(1 for row in users if row["inserted"])
+    stats.inserted += inserted
+    stats.updated += len(users) - inserted
+    stats.skipped += len(batch) - len(users)
+    return [row["id"] for row in users if not row["inserted"]]
+
+
+def _export_value(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def export_ndjson(conn, output: IO[str], fetch_size: int) -> int:
+    """Выгружает пользователей курсором, не держа их всех в памяти."""
+    rows = 0
+    async with conn.transaction():
+        async for record in conn.cursor(EXPORT_SQL, prefetch=fetch_size):
+            data = {key: _export_value(value) for key, value in record.items()}
+            data["roles"] = data["roles"].split(",") if data["roles"] else []
+            output.write(json.dumps(data, ensure_ascii=False))
+            output.write("\n")
+            rows += 1
+    return rows
+
+
+async def export_csv(conn, output: IO[bytes]) -> int:
+    """Выгружает пользователей через COPY TO STDOUT."""
+    status = await conn.copy_from_query(
+        EXPORT_SQL, output=output, format="csv", header=True
+    )
+    return int(status.split()[-1])
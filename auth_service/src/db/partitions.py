@@ -0,0 +1,154 @@
+"""Помесячные партиции users_auth_history.
+
+Партиции создаются заранее на несколько месяцев вперёд, а вышедшие за
+окно хранения отсоединяются или удаляются. DEFAULT-партиции нет: запись
+за пределами созданных месяцев упадёт, поэтому обслуживание должно
+запускаться чаще, чем заканчивается запас партиций.
+"""
+import asyncio
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.core.config import settings
+from src.core.logger import app_logger
+
+TABLE = "users_auth_history"
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+# Ключ advisory lock, чтобы несколько воркеров не обслуживали партиции разом.
+MAINTENANCE_LOCK_ID = 0x61757468
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def create_partition_sql(month: date) -> str:
+    month = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') "
+        f"TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def retention_start(today: date | None = None) -> date:
+    """Первый месяц, который ещё хранится в таблице."""
+    today = today or datetime.utcnow().date()
+    return add_months(month_start(today), -(settings.LOGIN_HISTORY_RETENTION_MONTHS - 1))
+
+
+async def list_partitions(conn: AsyncConnection) -> dict[str, date]:
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            """
+        ),
+        {"table": TABLE},
+    )
+    partitions = {}
+    for (name,) in result:
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions[name] = date(int(match[1]), int(match[2]), 1)
+    return partitions
+
+
+async def create_partitions(
+    conn: AsyncConnection, ahead: int, today: date | None = None
+) -> list[str]:
+    """Создаёт партиции с текущего месяца на ahead месяцев вперёд."""
+    current = month_start(today or datetime.utcnow().date())
+    existing = await list_partitions(conn)
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name not in existing:
+            await conn.execute(text(create_partition_sql(month)))
+            created.append(name)
+    return created
+
+
+async def retire_partitions(
+    conn: AsyncConnection, drop: bool, today: date | None = None
+) -> list[str]:
+    """Отсоединяет (или удаляет) партиции старше окна хранения."""
+    keep_from = retention_start(today)
+    retired = []
+    for name, month in sorted((await list_partitions(conn)).items()):
+        if month >= keep_from:
+            continue
+        if drop:
+            await conn.execute(text(f"DROP TABLE {name}"))
+        else:
+            await conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        retired.append(name)
+    return retired
+
+
+async def maintain_partitions(engine: AsyncEngine) -> tuple[list[str], list[str]]:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}
+        )
+        created = await create_partitions(
+            conn, ahead=settings.LOGIN_HISTORY_PARTITIONS_AHEAD
+        )
+        retired = await retire_partitions(
+            conn, drop=settings.LOGIN_HISTORY_DROP_EXPIRED
+        )
+    if created or retired:
+        app_logger.info(
+            f"{TABLE} partitions created: {created}, retired: {retired}"
+        )
+    return created, retired
+
+
+class PartitionMaintainer:
+    """Периодическое обслуживание партиций внутри приложения."""
+
+    def __init__(self, engine: AsyncEngine, interval: float) -> None:
+        self.engine = engine
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await maintain_partitions(self.engine)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Partition maintenance failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
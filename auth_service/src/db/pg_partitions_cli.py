@@ -0,0 +1,63 @@
+import asyncio
+
+import typer
+
+from src.core.config import settings
+from src.db import partitions
+from src.db.postgres import engine
+
+app = typer.Typer()
+
+
+@app.command()
+def maintain():
+    """Создаёт партиции наперёд и убирает вышедшие за окно хранения."""
+    created, retired = asyncio.run(_run(partitions.maintain_partitions(engine)))
+    typer.echo(f"Созданы: {', '.join(created) or '-'}")
+    typer.echo(f"Убраны: {', '.join(retired) or '-'}")
+
+
+@app.command()
+def create(
+    ahead: int = typer.Option(
+        settings.LOGIN_HISTORY_PARTITIONS_AHEAD, help="На сколько месяцев вперёд"
+    ),
+):
+    created = asyncio.run(_run(_in_transaction(partitions.create_partitions, ahead=ahead)))
+    typer.echo(f"Созданы: {', '.join(created) or '-'}")
+
+
+@app.command()
+def retire(
+    drop: bool = typer.Option(
+        settings.LOGIN_HISTORY_DROP_EXPIRED,
+        help="Удалять партиции вместо отсоединения",
+    ),
+):
+    retired = asyncio.run(_run(_in_transaction(partitions.retire_partitions, drop=drop)))
+    typer.echo(f"Убраны: {', '.join(retired) or '-'}")
+
+
+@app.command("list")
+def list_partitions():
+    result = asyncio.run(_run(_in_transaction(partitions.list_partitions)))
+    for name, month in sorted(result.items(), key=lambda item: item[1]):
+        typer.echo(f"{name}\t{month:%Y-%m}")
+
+
+async def _in_transaction(func, **kwargs):
+    async with engine.begin() as conn:
+        return await func(conn, **kwargs)
+
+
+async def _run(coro):
+    try:
+        return await coro
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    app()
+# Вызвать в ручную
+# docker-compose exec auth-service python -m src.db.pg_partitions_cli maintain
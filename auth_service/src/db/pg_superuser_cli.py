@@ -3,6 +3,7 @@ import asyncio
 from sqlalchemy import select
 from src.models.entity import Role, User
 from src.db.postgres import create_database, get_session
+from src.services.password import get_password_hasher
 
 app = typer.Typer()
 
@@ -47,7 +48,7 @@ async def async_create_superuser(login: str, password: str, email: str):
             user = User(
                 login=login,
                 email=email,
-                password=password,
+                password=await get_password_hasher().hash(password),
             )
             user.is_superuser = True
 
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+import time
+from contextlib import contextmanager
+
+import typer
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.db import bulk_users
+from src.db import redis as redis_db
+from src.db.postgres import engine
+from src.services.principal_cache import get_principal_cache
+from src.services.role_cache import get_role_cache
+
+app = typer.Typer()
+
+
+@app.command("import")
+def import_users(
+    path: str = typer.Argument(..., help="CSV или NDJSON, '-' - stdin"),
+    fmt: str = typer.Option(None, "--format", help="csv или ndjson; по умолчанию по расширению"),
+    batch_size: int = typer.Option(50_000, help="Записей в одной транзакции"),
+    create_roles: bool = typer.Option(False, help="Создавать отсутствующие роли"),
+):
+    """Загружает пользователей с готовыми хешами паролей, профилями и ролями."""
+    fmt = fmt or bulk_users.detect_format(path)
+    with _open(path, "r") as stream:
+        stats = asyncio.run(_run(_import(stream, fmt, batch_size, create_roles)))
+
+    typer.echo(
+        f"Прочитано {stats.read}: добавлено {stats.inserted}, обновлено {stats.updated}, "
+        f"пропущено {stats.skipped}, с ошибками {stats.invalid}"
+    )
+    typer.echo(f"{stats.rows_per_second:.0f} строк/с")
+    if stats.unknown_roles:
+        typer.echo(f"Неизвестные роли: {', '.join(sorted(stats.unknown_roles))}")
+    for error in stats.errors:
+        typer.echo(error, err=True)
+
+
+@app.command("export")
+def export_users(
+    path: str = typer.Argument(..., help="Куда писать, '-' - stdout"),
+    fmt: str = typer.Option(None, "--format", help="csv или ndjson; по умолчанию по расширению"),
+    fetch_size: int = typer.Option(10_000, help="Строк за одно обращение курсора"),
+):
+    """Выгружает пользователей в том же формате, что принимает import."""
+    fmt = fmt or bulk_users.detect_format(path)
+    started = time.perf_counter()
+    with _open(path, "wb" if fmt == "csv" else "w") as output:
+        rows = asyncio.run(_run(_export(output, fmt, fetch_size)))
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    typer.echo(f"Выгружено {rows} строк, {rows / elapsed:.0f} строк/с", err=True)
+
+
+async def _import(stream, fmt: str, batch_size: int, create_roles: bool):
+    stats = bulk_users.ImportStats()
+    records = bulk_users.read_records(stream, fmt)
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        for batch in bulk_users.batches(records, batch_size, stats):
+            updated = await bulk_users.import_batch(
+                raw.driver_connection, batch, create_roles, stats
+            )
+            await _invalidate_caches(updated)
+            typer.echo(f"... {stats.read} строк, {stats.rows_per_second:.0f} строк/с", err=True)
+    return stats
+
+
+async def _export(output, fmt: str, fetch_size: int) -> int:
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        if fmt == "csv":
+            return await bulk_users.export_csv(raw.driver_connection, output)
+        return await bulk_users.export_ndjson(raw.driver_connection, output, fetch_size)
+
+
+async def _invalidate_caches(user_ids) -> None:
+    # Новым пользователям сбрасывать нечего, а у обновлённых могли
+    # измениться роли, активность и логин.
+    for start in range(0, len(user_ids), 1000):
+        chunk = user_ids[start:start + 1000]
+        await get_role_cache().invalidate(*chunk)
+        await get_principal_cache().invalidate(*chunk)
+
+
+@contextmanager
+def _open(path: str, mode: str):
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        yield stream.buffer if "b" in mode else stream
+        return
+    with open(path, mode, **({} if "b" in mode else {"encoding": "utf-8", "newline": ""})) as f:
+        yield f
+
+
+async def _run(coro):
+    redis_db.redis = Redis(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True
+    )
+    try:
+        return await coro
+    finally:
+        await redis_db.redis.close()
+        redis_db.redis = None
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    app()
+# Вызвать в ручную
+# docker-compose exec auth-service python -m src.db.pg_users_cli import /data/users.csv
+# docker-compose exec auth-service python -m src.db.pg_users_cli export - --format ndjson > users.ndjson
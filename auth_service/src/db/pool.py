@@ -0,0 +1,98 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "auth_db_pool_checkout_wait_seconds",
+    "Время ожидания соединения из пула",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POOL_TIMEOUTS = Counter(
+    "auth_db_pool_checkout_timeouts_total",
+    "Запросы, не дождавшиеся соединения за pool_timeout",
+    ["pool"],
+)
+# В multiprocess-режиме значения живых воркеров суммируются.
+POOL_IN_USE = Gauge(
+    "auth_db_pool_connections_in_use",
+    "Выданные из пула соединения",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_IDLE = Gauge(
+    "auth_db_pool_connections_idle",
+    "Свободные соединения в пуле",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "auth_db_pool_overflow",
+    "Соединения сверх pool_size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул asyncpg, который замеряет, сколько запрос ждал соединения.
+
+    pool_name попадает в метку pool всех метрик; подкласс с нужным именем
+    создаёт instrumented_pool, чтобы его пережил и dispose() движка.
+    Gauge обновляются при выдаче и возврате соединения, а не функцией
+    при сборе: в multiprocess-режиме /metrics читает значения из файлов.
+    """
+
+    pool_name = "primary"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._checkout_wait = POOL_CHECKOUT_WAIT.labels(pool=self.pool_name)
+        self._timeouts = POOL_TIMEOUTS.labels(pool=self.pool_name)
+        self._in_use = POOL_IN_USE.labels(pool=self.pool_name)
+        self._idle = POOL_IDLE.labels(pool=self.pool_name)
+        self._overflow = POOL_OVERFLOW.labels(pool=self.pool_name)
+
+    def _update_gauges(self) -> None:
+        self._in_use.set(self.checkedout())
+        self._idle.set(self.checkedin())
+        self._overflow.set(max(0, self.overflow()))
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self._timeouts.inc()
+            raise
+        finally:
+            self._checkout_wait.observe(time.perf_counter() - started)
+        self._update_gauges()
+        return connection
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+
+def instrumented_pool(pool_name: str) -> type[InstrumentedPool]:
+    return type(
+        f"InstrumentedPool[{pool_name}]", (InstrumentedPool,), {"pool_name": pool_name}
+    )
+
+
+def pool_options(settings) -> dict:
+    """Параметры create_async_engine для пула и кеша prepared statements."""
+    return {
+        "pool_size": settings.POSTGRES_POOL_SIZE,
+        "max_overflow": settings.POSTGRES_MAX_OVERFLOW,
+        "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+        "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+        "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+        "connect_args": {
+            # Кеш prepared statements на каждом соединении asyncpg.
+            "prepared_statement_cache_size": settings.POSTGRES_STATEMENT_CACHE_SIZE,
+        },
+    }
@@ -1,17 +1,183 @@
+import random
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 
 from core.config import settings
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+from src.db.pool import instrumented_pool, pool_options
 
 
 dsn = str(settings.POSTGRES_DSN)
 
-engine = create_async_engine(dsn, echo=False)
+engine = create_async_engine(
+    dsn,
+    echo=False,
+    poolclass=instrumented_pool("primary"),
+    **pool_options(settings),
+)
+
+replica_engines = [
+    create_async_engine(
+        replica_dsn,
+        echo=False,
+        poolclass=instrumented_pool(f"replica{number}"),
+        **pool_options(settings),
+    )
+    for number, replica_dsn in enumerate(settings.POSTGRES_REPLICA_DSNS, start=1)
+]
+
+# Пользователь недавно что-то записал: его запросы читают из основной базы.
+RECENT_WRITE_KEY = "db:recent_write:{}"
+
+# Выставляется на время вызова методов репозиториев, помеченных read_only.
+_read_only: ContextVar[bool] = ContextVar("db_read_only", default=False)
+
+
+def read_only(func):
+    """Разрешает направить SELECT внутри метода репозитория на реплику.
+
+    Вызов с primary=True читает из основной базы: так делают загрузчики
+    кешей, иначе после инвалидации в кеш на весь TTL попало бы
+    отстающее состояние реплики.
+    """
+
+    @wraps(func)
+    async def wrapper(*args, primary: bool = False, **kwargs):
+        token = _read_only.set(not primary)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Сессия, которая читает с реплик, а пишет в основную базу.
+
+    На реплику уходят только SELECT из read_only-методов. Свои изменения
+    видны так:
+
+    - после первой записи сессия (а она живёт один запрос) до конца читает
+      из основной базы;
+    - если запрос привязан к пользователю через bind_actor, то его следующие
+      запросы в течение POSTGRES_READ_YOUR_WRITES_SECONDS после коммита
+      тоже читают из основной базы, на каком бы воркере они ни выполнялись.
+
+    Остальные запросы без пользователя и чтения чужих изменений могут
+    отставать от основной базы на лаг реплики (вход при промахе на реплике
+    сам перечитывает пользователя из основной базы).
+    """
+
+    primary = engine.sync_engine
+    replicas = [replica.sync_engine for replica in replica_engines]
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            self.info["wrote"] = True
+            return self.primary
+        if (
+            self.replicas
+            and isinstance(clause, Select)
+            and _read_only.get()
+            and not self.info.get("wrote")
+            and not self.info.get("primary")
+        ):
+            return random.choice(self.replicas)
+        return self.primary
+
 
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+async_session = async_sessionmaker(
+    engine, sync_session_class=RoutingSession, expire_on_commit=False
+)
 
 Base = declarative_base()
 
-async def get_session():
+
+def _tracks_recent_writes() -> bool:
+    return bool(
+        replica_engines
+        and settings.POSTGRES_READ_YOUR_WRITES_SECONDS > 0
+        and redis_db.redis is not None
+    )
+
+
+async def bind_actor(session, user_id) -> None:
+    """Привязать единицу работы к пользователю, от имени которого идёт запрос.
+
+    Если пользователь недавно писал в базу, реплика может ещё не видеть
+    этих изменений, поэтому весь запрос читает из основной базы.
+    """
+    session.info["actor"] = str(user_id)
+    if not _tracks_recent_writes():
+        return
+    try:
+        if await redis_db.redis.exists(RECENT_WRITE_KEY.format(user_id)):
+            session.info["primary"] = True
+    except RedisError as e:
+        # Не знаем, писал ли пользователь: безопаснее читать из основной базы.
+        app_logger.warning(f"Recent writes unavailable: {e}")
+        session.info["primary"] = True
+
+
+async def _remember_write(session) -> None:
+    actor = session.info.get("actor")
+    if not (actor and session.info.get("wrote") and _tracks_recent_writes()):
+        return
+    try:
+        await redis_db.redis.set(
+            RECENT_WRITE_KEY.format(actor),
+            1,
+            ex=settings.POSTGRES_READ_YOUR_WRITES_SECONDS,
+        )
+    except RedisError as e:
+        app_logger.warning(f"Failed to remember recent write: {e}")
+
+def after_commit(session, callback: Callable[[], Awaitable[None]]) -> None:
+    """Выполнить callback после фиксации транзакции единицы работы.
+
+    Так сбрасываются кеши: до коммита загрузчик кеша мог бы прочитать
+    из базы ещё старое состояние и положить его под новым поколением.
+    При откате callback'и отбрасываются.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """Сессия, транзакцию которой фиксирует только этот контекст.
+
+    Сервисы и репозитории сами не делают commit: если что-то упало,
+    откатываются все изменения единицы работы, иначе они фиксируются
+    одним коммитом, после которого выполняются callback'и after_commit.
+    """
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        try:
+            yield session
+        except BaseException:
+            session.info.pop("after_commit", None)
+            await session.rollback()
+            raise
+        await session.commit()
+        await _remember_write(session)
+        for callback in session.info.pop("after_commit", []):
+            await callback()
+
+
+async def get_session():
+    """Единица работы на запрос.
+
+    Сессия одна на запрос и держит не больше одного соединения на движок.
+    Если обработчик упал, транзакция откатывается, иначе фиксируется целиком.
+    После этого соединение сразу возвращается в пул.
+    """
+    async with unit_of_work() as session:
+        yield session
@@ -1,9 +1,8 @@
 from contextlib import asynccontextmanager
 
 
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import ORJSONResponse
-from redis.asyncio import Redis
 from sqlalchemy import text
 
 
@@ -12,15 +11,27 @@ from src.core.logger import app_logger
 from src.core.config import settings
 from src.db import redis as redis_db
 from src.db import postgres as postgres_db
+from src.db.partitions import PartitionMaintainer
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
 from opentelemetry.sdk.resources import Resource, SERVICE_NAME
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from src.core.limiter import limiter
+from src.core.limiter import RateLimitExceeded, retry_after_header
+from src.core.metrics import (
+    InstrumentedRedis,
+    MetricsFlusher,
+    MetricsMiddleware,
+    render_metrics,
+)
+from src.core.request_id import RequestIdMiddleware
+from src.core.tracing import TailSamplingProcessor
+from src.services.login_history import get_login_history_writer
+from src.services.oauth import get_yandex_oauth
+from src.services.revocation import get_revocation_list
+from src.services.password import PasswordHasherBusy, get_password_hasher
 
 
 @asynccontextmanager
@@ -28,7 +39,7 @@ async def lifespan(app: FastAPI):
     # Startup
     try:
         app_logger.info("Attempting to connect to Redis...")
-        redis_db.redis = Redis(
+        redis_db.redis = InstrumentedRedis(
             host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True
         )
         if await redis_db.redis.ping():
@@ -45,15 +56,39 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         app_logger.error(f"Database connection failed: {e}")
 
+    if settings.LOGIN_HISTORY_WRITE_BEHIND:
+        get_login_history_writer().start()
+    get_revocation_list().start()
+    metrics_flusher = MetricsFlusher(settings.METRICS_FLUSH_SECONDS)
+    metrics_flusher.start()
+
+    partition_maintainer = None
+    if settings.LOGIN_HISTORY_PARTITION_INTERVAL_SECONDS:
+        partition_maintainer = PartitionMaintainer(
+            postgres_db.engine, settings.LOGIN_HISTORY_PARTITION_INTERVAL_SECONDS
+        )
+        partition_maintainer.start()
+
     yield
     # Shutdown
+    if partition_maintainer:
+        await partition_maintainer.stop()
+    await get_login_history_writer().stop()
+    await get_revocation_list().stop()
+    await get_yandex_oauth().close()
+    await metrics_flusher.stop()
+
     if redis_db.redis:
         await redis_db.redis.close()
         app_logger.info("Redis connection closed.")
 
     await postgres_db.engine.dispose()
+    for replica in postgres_db.replica_engines:
+        await replica.dispose()
     app_logger.info("Postgres connection closed.")
 
+    get_password_hasher().shutdown()
+
 
 def configure_tracer() -> None:
     resource = Resource(
@@ -62,10 +97,20 @@ def configure_tracer() -> None:
         }
     )
 
-    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
     processor = BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.JAEGER_ENDPOINT))
+    if settings.TRACING_TAIL_SAMPLING:
+        processor = TailSamplingProcessor(
+            processor,
+            slow_ms=settings.TRACING_SLOW_SPAN_MS,
+            keep_ratio=settings.TRACING_TAIL_KEEP_RATIO,
+        )
     tracer_provider.add_span_processor(processor)
-    tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    if settings.TRACING_CONSOLE_EXPORT:
+        tracer_provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
     trace.set_tracer_provider(tracer_provider)
 
 
@@ -83,8 +128,24 @@ app = FastAPI(
     root_path="/auth",
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return ORJSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={'detail': 'Too many requests'},
+        headers=retry_after_header(exc),
+    )
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': 'Too many authentication requests, retry later'},
+        headers={'Retry-After': '1'},
+    )
+
 
 if settings.TRACING_ENABLED:
     FastAPIInstrumentor.instrument_app(
@@ -94,16 +155,16 @@ if settings.TRACING_ENABLED:
     )
 
 
-@app.middleware('http')
-async def before_request(request: Request, call_next):
-    response = await call_next(request)
-    request_id = request.headers.get('X-Request-Id')
-    if not request_id:
-        return ORJSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={'detail': 'X-Request-Id is required'},
-        )
-    return response
+@app.get('/metrics', include_in_schema=False)
+async def metrics() -> Response:
+    content, media_type = render_metrics()
+    return Response(content, media_type=media_type)
+
+
+app.add_middleware(RequestIdMiddleware, required=settings.REQUEST_ID_REQUIRED)
+# Последним добавленный middleware - внешний: время считается с учётом
+# остальных middleware, а отказы RequestIdMiddleware тоже попадают в метрики.
+app.add_middleware(MetricsMiddleware)
 
 
 # Подключение роутеров к приложению.
@@ -1,14 +1,14 @@
 from typing import List, Optional, TYPE_CHECKING
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import ForeignKey, String, Text, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
-from werkzeug.security import check_password_hash, generate_password_hash
  
+from src.core.user_agent import USER_AGENT_MAX_LENGTH
 from src.db.postgres import Base
 
 if TYPE_CHECKING:
@@ -34,8 +34,13 @@ class User(Base):
     roles: Mapped[List["Role"]] = relationship(
         secondary="users_roles", back_populates="users", lazy="selectin"
     )
+    # История входов растёт без ограничений, поэтому неявно не грузится:
+    # читать её нужно явным запросом или через UserLoadProfile.FULL.
     auth_histories: Mapped[List["UserAuthHistory"]] = relationship(
-        back_populates="user", cascade="all, delete-orphan", lazy="selectin"
+        back_populates="user",
+        cascade="all, delete-orphan",
+        lazy="raise",
+        passive_deletes=True,
     )
     user_profile: Mapped[Optional["UserProfile"]] = relationship(
         back_populates="user", cascade="all, delete-orphan", uselist=False
@@ -44,17 +49,15 @@ class User(Base):
         back_populates="user", cascade="all, delete-orphan"
     )
 
-    def __init__(self, login: str, password: str, email: str, id: uuid.UUID = None, **kwargs) -> None:
+    def __init__(self, login: str, password: str | None, email: str, id: uuid.UUID = None, **kwargs) -> None:
+        # password - уже готовый хеш: KDF считается в PasswordHasher вне
+        # event loop, модель его не трогает.
         if id:
             self.id = id
         self.login = login
         self.email = email
-        # Хешируем пароль, только если он не пустой (для тестовых объектов)
         if password:
-            self.password = generate_password_hash(password)
-
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password, password)
+            self.password = password
 
     def __repr__(self) -> str:
         return f'<User {self.login}>'
@@ -102,7 +105,7 @@ class UserAuthHistory(Base):
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4,
     )
-    user_agent: Mapped[str] = mapped_column(Text, nullable=False)
+    user_agent: Mapped[str] = mapped_column(String(USER_AGENT_MAX_LENGTH), nullable=False)
     auth_date: Mapped[datetime] = mapped_column(default=datetime.utcnow, primary_key=True)
 
     user_id: Mapped[uuid.UUID] = mapped_column(
@@ -111,6 +114,16 @@ class UserAuthHistory(Base):
     user: Mapped["User"] = relationship(back_populates="auth_histories")
 
     __table_args__ = (
+        # Индекс на партиционированной таблице создаётся и в каждой партиции.
+        # Он покрывающий: постраничная выдача истории по ключу (auth_date, id)
+        # читает только его, без обращения к таблице.
+        Index(
+            'ix_users_auth_history_user_id_auth_date_id',
+            'user_id',
+            auth_date.desc(),
+            id.desc(),
+            postgresql_include=['user_agent'],
+        ),
         {'postgresql_partition_by': 'RANGE (auth_date)'},
     )
 
@@ -122,6 +135,38 @@ class UserAuthHistory(Base):
         return f'<UserAuthHistory {self.auth_date}>'
 
 
+class UserLoginDaily(Base):
+    """Число входов пользователя за сутки (UTC).
+
+    Пополняется вместе с записью users_auth_history и, в отличие от неё,
+    не удаляется по сроку хранения партиций.
+    """
+
+    __tablename__ = 'user_login_daily'
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    logins: Mapped[int] = mapped_column(nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f'<UserLoginDaily {self.user_id} {self.day}: {self.logins}>'
+
+
+class UserAgentLoginDaily(Base):
+    """Число входов за сутки (UTC) по семейству клиента."""
+
+    __tablename__ = 'user_agent_login_daily'
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    agent_family: Mapped[str] = mapped_column(String(50), primary_key=True)
+    logins: Mapped[int] = mapped_column(nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f'<UserAgentLoginDaily {self.day} {self.agent_family}: {self.logins}>'
+
+
 class Role(Base):
     __tablename__ = 'roles'
     __table_args__ = {'extend_existing': True}
@@ -1,44 +1,137 @@
+import json
 from typing import Protocol
+from uuid import UUID
+
 from redis.asyncio import Redis
-from src.core.config import settings
 
+# Обмен refresh-токена. KEYS[1] - hash сессий пользователя, KEYS[2] - его
+# закешированный principal; ARGV: sid, предъявленный jti, новый jti, ttl и
+# необязательный principal из базы на случай промаха кеша.
+# Если jti не совпадает, токен уже обменивали: сессия считается
+# скомпрометированной и удаляется. Без principal активность пользователя не
+# проверить, поэтому при промахе скрипт ничего не меняет и отвечает
+# 'uncached': вызывающий читает principal из базы и повторяет обмен.
+ROTATE_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return {'missing'}
+end
+local session = cjson.decode(raw)
+local now = tonumber(redis.call('TIME')[1])
+if session.jti ~= ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return {'reused'}
+end
+if session.exp < now then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return {'expired'}
+end
+
+local principal = redis.call('GET', KEYS[2])
+if not principal then
+    principal = ARGV[5]
+end
+if not principal or principal == '' then
+    return {'uncached'}
+end
+principal = cjson.decode(principal)
+if not principal.is_active then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return {'inactive'}
+end
+session.login = principal.login
+session.roles = table.concat(principal.roles, ',')
+
+local ttl = tonumber(ARGV[4])
+session.jti = ARGV[3]
+session.exp = now + ttl
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(session))
+-- Без EXPIRE ... GT (он есть только с Redis 7): срок hash только растёт.
+if redis.call('TTL', KEYS[1]) < ttl then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return {'ok', session.login, session.roles}
+"""
+
+# Создание сессии: hash живёт столько, сколько самая свежая сессия в нём.
+CREATE_SCRIPT = """
+local ttl = tonumber(ARGV[3])
+local session = cjson.decode(ARGV[2])
+session.exp = tonumber(redis.call('TIME')[1]) + ttl
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(session))
+if redis.call('TTL', KEYS[1]) < ttl then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return 1
+"""
 
-class AuthRepository(Protocol):
 
-    async def save_refresh_token(self, user_id, refresh_token) -> None: ...
-    async def get_refresh_token(self, user_id) -> str | None: ...
-    async def delete_refresh_token(self, user_id) -> str | None: ...
+class AuthRepository(Protocol):
 
-    async def save_novalid_access_token(self, user_id, acceess_token) -> None: ...
-    async def get_novalid_access_token(self, user_id) -> str | None: ...
+    async def create_session(
+        self, user_id: UUID, session_id: str, jti: str, login: str, roles: str
+    ) -> None: ...
+    async def rotate_session(
+        self,
+        user_id: UUID,
+        session_id: str,
+        jti: str,
+        new_jti: str,
+        principal_key: str,
+        principal: str = "",
+    ) -> tuple[str, str | None, str | None]: ...
+    async def delete_session(self, user_id: UUID, session_id: str) -> bool: ...
+    async def delete_all_sessions(self, user_id: UUID) -> int: ...
 
 
 class RedisAuthRepository:
+    """Refresh-сессии пользователя: один Redis hash, поле на устройство (sid)."""
 
-    def __init__(self, redis: Redis) -> None:
+    def __init__(self, redis: Redis, ttl: int) -> None:
         self.redis = redis
+        self.ttl = ttl
+        # register_script только считает sha1: сами скрипты вызываются через
+        # EVALSHA и загружаются в Redis один раз, после NOSCRIPT.
+        self._create = redis.register_script(CREATE_SCRIPT)
+        self._rotate = redis.register_script(ROTATE_SCRIPT)
 
-    async def save_refresh_token(self, user_id, refresh_token) -> None:
-        res = await self.redis.setex(
-            user_id,
-            settings.REFRESH_TOKEN_EXPIRE_DAYS * 60 * 60 * 24,
-            refresh_token,
-        )
+    @staticmethod
+    def key(user_id: UUID) -> str:
+        return f"refresh_sessions:{user_id}"
 
-    async def get_refresh_token(self, user_id) -> str | None:
-        return await self.redis.get(user_id)
+    async def create_session(
+        self, user_id: UUID, session_id: str, jti: str, login: str, roles: str
+    ) -> None:
+        session = json.dumps({"jti": jti, "login": login, "roles": roles})
+        await self._create(
+            keys=[self.key(user_id)], args=[session_id, session, self.ttl]
+        )
 
-    async def delete_refresh_token(self, user_id) -> str | None:
-        return await self.redis.delete(user_id)
+    async def rotate_session(
+        self,
+        user_id: UUID,
+        session_id: str,
+        jti: str,
+        new_jti: str,
+        principal_key: str,
+        principal: str = "",
+    ) -> tuple[str, str | None, str | None]:
+        """Меняет jti сессии атомарно; возвращает (статус, login, роли).
 
-    async def save_novalid_access_token(self, user_id, acceess_token) -> None:
-        await self.redis.setex(
-            f"novalid_{user_id}",
-            settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            acceess_token,
+        principal - JSON из базы, используется, только если кеш пуст.
+        """
+        result = await self._rotate(
+            keys=[self.key(user_id), principal_key],
+            args=[session_id, jti, new_jti, self.ttl, principal],
         )
+        status, *claims = result
+        if status != "ok":
+            return status, None, None
+        login, roles = claims
+        return status, login, roles
 
-    async def get_novalid_access_token(self, user_id) -> str | None:
-        return await self.redis.get(
-            f"novalid_{user_id}",
-        )
+    async def delete_session(self, user_id: UUID, session_id: str) -> bool:
+        return bool(await self.redis.hdel(self.key(user_id), session_id))
+
+    async def delete_all_sessions(self, user_id: UUID) -> int:
+        return await self.redis.delete(self.key(user_id))
@@ -2,8 +2,10 @@ from typing import Protocol
 from uuid import UUID
 
 import backoff
-from sqlalchemy import delete, select, update
-from src.models.entity import Role
+from sqlalchemy import String, column, delete, func, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import UUID as PgUUID, insert
+from src.db.postgres import read_only
+from src.models.entity import Role, User, UsersRoles
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -22,6 +24,12 @@ class RoleRepository(Protocol):
 
     async def delete(self, role_id: UUID) -> bool: ...
 
+    async def get_user_ids(self, role_id: UUID) -> list[UUID]: ...
+
+    async def assign(self, pairs: list[tuple[UUID, str]]) -> list[UUID]: ...
+
+    async def unassign(self, pairs: list[tuple[UUID, str]]) -> list[UUID]: ...
+
 
 class PgRoleRepository:
 
@@ -29,14 +37,17 @@ class PgRoleRepository:
         self.session = session
 
     @backoff.on_exception(backoff.expo, (SQLAlchemyError), max_time=30)
+    @read_only
     async def get_all(self) -> list[Role]:
         result = await self.session.execute(select(Role))
         return result.scalars().all()
 
+    @read_only
     async def get(self, role_id: UUID) -> Role | None:
         result = await self.session.execute(select(Role).where(Role.id == role_id))
         return result.scalar_one_or_none()
 
+    @read_only
     async def get_by_name(self, role_name: str) -> Role | None:
         result = await self.session.execute(select(Role).where(Role.name == role_name))
         return result.scalar_one_or_none()
@@ -62,3 +73,51 @@ class PgRoleRepository:
         await self.session.delete(role)
         await self.session.flush()
         return True
+
+    @read_only
+    async def get_user_ids(self, role_id: UUID) -> list[UUID]:
+        result = await self.session.execute(
+            select(UsersRoles.user_id).where(UsersRoles.role_id == role_id)
+        )
+        return result.scalars().all()
+
+    async def assign(self, pairs: list[tuple[UUID, str]]) -> list[UUID]:
+        """Назначает роли одним INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+
+        Пары с несуществующим пользователем или ролью пропускаются.
+        Возвращает пользователей, у которых что-то изменилось.
+        """
+        requested = values(
+            column("user_id", PgUUID(as_uuid=True)),
+            column("role_name", String),
+            name="requested",
+        ).data(pairs)
+        result = await self.session.execute(
+            insert(UsersRoles)
+            .from_select(
+                ["id", "user_id", "role_id", "created_at"],
+                select(
+                    func.gen_random_uuid(),
+                    requested.c.user_id,
+                    Role.id,
+                    func.now(),
+                )
+                .join(Role, Role.name == requested.c.role_name)
+                .join(User, User.id == requested.c.user_id),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "role_id"])
+            .returning(UsersRoles.user_id)
+        )
+        return result.scalars().all()
+
+    async def unassign(self, pairs: list[tuple[UUID, str]]) -> list[UUID]:
+        """Снимает роли одним DELETE ... USING roles."""
+        result = await self.session.execute(
+            delete(UsersRoles)
+            .where(
+                UsersRoles.role_id == Role.id,
+                tuple_(UsersRoles.user_id, Role.name).in_(pairs),
+            )
+            .returning(UsersRoles.user_id)
+        )
+        return result.scalars().all()
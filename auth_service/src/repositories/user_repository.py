@@ -1,21 +1,206 @@
-from uuid import UUID
-from sqlalchemy import select, update
+import base64
+import binascii
+from collections import Counter
+from datetime import date, datetime, time
+from enum import Enum
+from functools import cache
+from uuid import UUID, uuid4
+from sqlalchemy import func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.models.entity import User, UserAuthHistory
+from sqlalchemy.orm import load_only, raiseload, selectinload
+from src.core.user_agent import user_agent_family
+from src.db.partitions import retention_start
+from src.db.postgres import read_only
+from src.models.social_account import SocialAccount
+from src.models.entity import (
+    Role,
+    User,
+    UserAgentLoginDaily,
+    UserAuthHistory,
+    UserLoginDaily,
+    UsersRoles,
+)
 from typing import List, Protocol, Tuple
 
-from werkzeug.security import generate_password_hash
+
+class UserLoadProfile(str, Enum):
+    """Какие данные пользователя загружать вместе с ним."""
+
+    # Колонки, нужные для проверки токена и прав, без связей.
+    PRINCIPAL = 'principal'
+    # PRINCIPAL + хеш пароля, для логина.
+    CREDENTIALS = 'credentials'
+    # Все колонки и роли.
+    WITH_ROLES = 'with_roles'
+    # Пользователь со всеми связями, включая историю входов.
+    FULL = 'full'
+
+
+@cache
+def load_options() -> dict[UserLoadProfile, tuple]:
+    # Собирается при первом запросе, а не при импорте: обращение к атрибутам
+    # User конфигурирует мапперы, а SocialAccount к этому моменту может быть
+    # ещё не импортирован.
+    principal_columns = (
+        User.id,
+        User.login,
+        User.email,
+        User.is_active,
+        User.is_superuser,
+    )
+    return {
+        UserLoadProfile.PRINCIPAL: (
+            load_only(*principal_columns),
+            raiseload('*'),
+        ),
+        UserLoadProfile.CREDENTIALS: (
+            load_only(*principal_columns, User.password),
+            raiseload('*'),
+        ),
+        UserLoadProfile.WITH_ROLES: (
+            selectinload(User.roles),
+            raiseload('*'),
+        ),
+        UserLoadProfile.FULL: (
+            selectinload(User.roles),
+            selectinload(User.auth_histories),
+            selectinload(User.user_profile),
+            selectinload(User.social_accounts),
+        ),
+    }
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_history_cursor(auth_date: datetime, history_id: UUID) -> str:
+    raw = f"{auth_date.isoformat()}|{history_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        auth_date, history_id = raw.split("|")
+        return datetime.fromisoformat(auth_date), UUID(history_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+# Вход через соцсеть одним запросом: пользователь с таким email либо
+# находится, либо создаётся вместе с профилем и ролью, и к нему
+# привязывается аккаунт соцсети. Вставки внутри CTE не видны остальной
+# части запроса, поэтому роли нового пользователя берутся из roles.
+CREATE_SOCIAL_USER_SQL = text("""
+WITH existing AS (
+    SELECT id, login, is_active, is_superuser, false AS created
+    FROM users WHERE email = :email
+),
+new_user AS (
+    INSERT INTO users (id, login, email, password, is_active, is_superuser, created_at)
+    SELECT CAST(:user_id AS uuid), CAST(:email AS varchar), CAST(:email AS varchar),
+        CAST(:password AS varchar), true, false, CAST(:now AS timestamp)
+    WHERE NOT EXISTS (SELECT 1 FROM existing)
+    RETURNING id, login, is_active, is_superuser, true AS created
+),
+target AS (
+    SELECT * FROM existing UNION ALL SELECT * FROM new_user
+),
+profile AS (
+    INSERT INTO user_profiles (id, user_id, first_name, last_name)
+    SELECT CAST(:profile_id AS uuid), id,
+        CAST(:first_name AS varchar), CAST(:last_name AS varchar)
+    FROM new_user
+),
+user_role AS (
+    INSERT INTO users_roles (id, user_id, role_id, created_at)
+    SELECT CAST(:user_role_id AS uuid), new_user.id, roles.id, CAST(:now AS timestamp)
+    FROM new_user JOIN roles ON roles.name = :role_name
+),
+account AS (
+    INSERT INTO social_accounts (user_id, social_id, provider)
+    SELECT id, CAST(:social_id AS varchar), CAST(:provider AS varchar) FROM target
+    ON CONFLICT (social_id, provider) DO NOTHING
+)
+SELECT
+    t.id, t.login, t.is_active, t.is_superuser, t.created,
+    CASE WHEN t.created
+        THEN ARRAY(SELECT name FROM roles WHERE name = :role_name)
+        ELSE ARRAY(
+            SELECT r.name FROM users_roles ur JOIN roles r ON r.id = ur.role_id
+            WHERE ur.user_id = t.id
+        )
+    END AS roles
+FROM target t
+""")
+
+
+def login_rollups(rows) -> Tuple[List[dict], List[dict]]:
+    """Суточные счётчики для user_login_daily и user_agent_login_daily.
+
+    rows - записанные события истории (user_id, auth_date, user_agent).
+    Строки отсортированы по ключу, чтобы параллельные пачки блокировали
+    их в одном порядке и не ловили взаимоблокировку.
+    """
+    per_user = Counter((row.user_id, row.auth_date.date()) for row in rows)
+    per_agent = Counter(
+        (row.auth_date.date(), user_agent_family(row.user_agent)) for row in rows
+    )
+    return (
+        [
+            {"user_id": user_id, "day": day, "logins": logins}
+            for (user_id, day), logins in sorted(per_user.items())
+        ],
+        [
+            {"day": day, "agent_family": family, "logins": logins}
+            for (day, family), logins in sorted(per_agent.items())
+        ],
+    )
 
 
 class UserRepository(Protocol):
 
-    async def get(self, user_id: UUID) -> User | None: ...
-    async def get_user_by_login(self, login: str) -> User | None: ...
+    async def get(
+        self,
+        user_id: UUID,
+        profile: UserLoadProfile = UserLoadProfile.PRINCIPAL,
+        primary: bool = False,
+    ) -> User | None: ...
+    async def get_user_by_login(
+        self, login: str, profile: UserLoadProfile = UserLoadProfile.CREDENTIALS
+    ) -> User | None: ...
     async def create(self, user: User) -> User: ...
-    async def update_credentials(self, user_id, login: str, password: str): ...
+    async def get_role_names(self, user_id: UUID) -> List[str]: ...
+    async def get_role_names_many(self, user_ids: List[UUID]) -> dict[UUID, List[str]]: ...
+    async def set_active(self, user_id: UUID, is_active: bool) -> bool: ...
+    async def update_credentials(
+        self, user_id, login: str | None, password_hash: str | None
+    ): ...
+    async def update_password_hash(self, user_id: UUID, password_hash: str) -> None: ...
     async def get_login_history_paginated(
         self, user_id: UUID, page: int, size: int
     ) -> List[UserAuthHistory]: ...
+    async def get_login_history_by_cursor(
+        self, user_id: UUID, cursor: str | None, size: int
+    ) -> Tuple[list, str | None]: ...
+    async def add_login_history(self, events: List[dict]) -> None: ...
+    async def get_daily_logins(
+        self, date_from: date, date_to: date, user_id: UUID | None = None
+    ) -> list: ...
+    async def get_user_id_by_social(self, provider: str, social_id: str) -> UUID | None: ...
+    async def create_social_user(
+        self,
+        provider: str,
+        social_id: str,
+        email: str,
+        password_hash: str,
+        first_name: str | None,
+        last_name: str | None,
+        role_name: str,
+    ): ...
+    async def get_user_agent_logins(self, date_from: date, date_to: date) -> list: ...
 
 
 class PgUserRepository:
@@ -23,12 +208,22 @@ class PgUserRepository:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def get(self, user_id: UUID) -> User | None:
-        result = await self.session.execute(select(User).where(User.id == user_id))
+    @read_only
+    async def get(
+        self, user_id: UUID, profile: UserLoadProfile = UserLoadProfile.PRINCIPAL
+    ) -> User | None:
+        result = await self.session.execute(
+            select(User).where(User.id == user_id).options(*load_options()[profile])
+        )
         return result.scalar_one_or_none()
 
-    async def get_user_by_login(self, login: str) -> User | None:
-        result = await self.session.execute(select(User).where(User.login == login))
+    @read_only
+    async def get_user_by_login(
+        self, login: str, profile: UserLoadProfile = UserLoadProfile.CREDENTIALS
+    ) -> User | None:
+        result = await self.session.execute(
+            select(User).where(User.login == login).options(*load_options()[profile])
+        )
         return result.scalar_one_or_none()
 
     async def create(self, user: User) -> User:
@@ -36,24 +231,237 @@ class PgUserRepository:
         await self.session.flush()
         return user
 
-    async def update_credentials(self, user_id, login: str, password: str):
+    async def get_role_names(self, user_id: UUID) -> List[str]:
+        """Имена ролей активного пользователя одним запросом.
+
+        Только из основной базы: результат кладётся в кеш ролей и principal.
+        """
+        result = await self.session.execute(
+            select(Role.name)
+            .join(UsersRoles, UsersRoles.role_id == Role.id)
+            .join(User, User.id == UsersRoles.user_id)
+            .where(UsersRoles.user_id == user_id, User.is_active.is_(True))
+        )
+        return result.scalars().all()
+
+    async def get_role_names_many(self, user_ids: List[UUID]) -> dict[UUID, List[str]]:
+        """get_role_names для нескольких пользователей одним запросом."""
+        result = await self.session.execute(
+            select(UsersRoles.user_id, Role.name)
+            .join(Role, Role.id == UsersRoles.role_id)
+            .join(User, User.id == UsersRoles.user_id)
+            .where(UsersRoles.user_id.in_(user_ids), User.is_active.is_(True))
+        )
+        roles = {user_id: [] for user_id in user_ids}
+        for user_id, name in result:
+            roles[user_id].append(name)
+        return roles
+
+    @read_only
+    async def get_user_id_by_social(self, provider: str, social_id: str) -> UUID | None:
+        """Поиск по уникальному индексу uq_social_provider."""
+        result = await self.session.execute(
+            select(SocialAccount.user_id).where(
+                SocialAccount.social_id == social_id,
+                SocialAccount.provider == provider,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def create_social_user(
+        self,
+        provider: str,
+        social_id: str,
+        email: str,
+        password_hash: str,
+        first_name: str | None,
+        last_name: str | None,
+        role_name: str,
+    ):
+        """Находит по email или создаёт пользователя и привязывает аккаунт.
+
+        Возвращает строку (id, login, is_active, is_superuser, created, roles).
+        """
+        result = await self.session.execute(
+            CREATE_SOCIAL_USER_SQL,
+            {
+                "user_id": uuid4(),
+                "profile_id": uuid4(),
+                "user_role_id": uuid4(),
+                "now": datetime.utcnow(),
+                "email": email,
+                "password": password_hash,
+                "first_name": first_name,
+                "last_name": last_name,
+                "role_name": role_name,
+                "social_id": social_id,
+                "provider": provider,
+            },
+        )
+        return result.one()
+
+    async def set_active(self, user_id: UUID, is_active: bool) -> bool:
         result = await self.session.execute(
             update(User)
             .where(User.id == user_id)
-            .values(login=login, password=generate_password_hash(password))
-            .returning(User)
+            .values(is_active=is_active)
+            .returning(User.id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def update_credentials(
+        self, user_id, login: str | None, password_hash: str | None
+    ):
+        # Пароль приходит уже захешированным: KDF считается в PasswordHasher.
+        values = {}
+        if login:
+            values['login'] = login
+        if password_hash:
+            values['password'] = password_hash
+        result = await self.session.execute(
+            update(User).where(User.id == user_id).values(**values).returning(User)
         )
         return result.scalar_one_or_none()
 
+    async def update_password_hash(self, user_id: UUID, password_hash: str) -> None:
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(password=password_hash)
+        )
+
+    @read_only
     async def get_login_history_paginated(
         self, user_id: UUID, page: int, size: int
     ) -> List[UserAuthHistory]:
         offset = (page - 1) * size
         result = await self.session.execute(
             select(UserAuthHistory)
-            .where(UserAuthHistory.user_id == user_id)
+            .where(
+                UserAuthHistory.user_id == user_id,
+                # Условие на ключ партиционирования: планировщик читает
+                # только партиции из окна хранения.
+                UserAuthHistory.auth_date
+                >= datetime.combine(retention_start(), time.min),
+            )
             .order_by(UserAuthHistory.auth_date.desc())
             .limit(size)
             .offset(offset)
         )
         return result.scalars().all()
+
+    @read_only
+    async def get_login_history_by_cursor(
+        self, user_id: UUID, cursor: str | None, size: int
+    ) -> Tuple[list, str | None]:
+        """Страница истории входов по ключу (auth_date, id) без OFFSET.
+
+        Читаются только колонки из индекса
+        ix_users_auth_history_user_id_auth_date_id, поэтому запрос обходится
+        index-only scan. Возвращает строки и курсор следующей страницы.
+        """
+        query = (
+            select(
+                UserAuthHistory.id,
+                UserAuthHistory.auth_date,
+                UserAuthHistory.user_agent,
+            )
+            .where(
+                UserAuthHistory.user_id == user_id,
+                UserAuthHistory.auth_date
+                >= datetime.combine(retention_start(), time.min),
+            )
+            .order_by(UserAuthHistory.auth_date.desc(), UserAuthHistory.id.desc())
+            .limit(size + 1)
+        )
+        if cursor:
+            auth_date, history_id = decode_history_cursor(cursor)
+            query = query.where(
+                # Сравнение кортежей партиции не отсекает, поэтому верхняя
+                # граница по auth_date задаётся отдельно.
+                UserAuthHistory.auth_date <= auth_date,
+                tuple_(UserAuthHistory.auth_date, UserAuthHistory.id)
+                < tuple_(auth_date, history_id),
+            )
+
+        rows = (await self.session.execute(query)).all()
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = encode_history_cursor(rows[-1].auth_date, rows[-1].id)
+        return rows, next_cursor
+
+    async def add_login_history(self, events: List[dict]) -> None:
+        """Пишет пачку входов одним INSERT ... VALUES (...), (...).
+
+        id события генерируется у источника, поэтому повторная доставка
+        той же пачки ничего не дублирует. В той же транзакции пополняются
+        суточные агрегаты - только по действительно вставленным строкам.
+        """
+        if not events:
+            return
+        result = await self.session.execute(
+            insert(UserAuthHistory.__table__)
+            .values(events)
+            .on_conflict_do_nothing()
+            .returning(
+                UserAuthHistory.user_id,
+                UserAuthHistory.auth_date,
+                UserAuthHistory.user_agent,
+            )
+        )
+        per_user, per_agent = login_rollups(result.all())
+        for table, counters in (
+            (UserLoginDaily.__table__, per_user),
+            (UserAgentLoginDaily.__table__, per_agent),
+        ):
+            if not counters:
+                continue
+            stmt = insert(table).values(counters)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[column.name for column in table.primary_key],
+                    set_={"logins": table.c.logins + stmt.excluded.logins},
+                )
+            )
+
+    @read_only
+    async def get_daily_logins(
+        self, date_from: date, date_to: date, user_id: UUID | None = None
+    ) -> list:
+        """Входы по дням: одного пользователя или всех вместе.
+
+        Общий счётчик складывается из user_agent_login_daily - в ней
+        несколько строк на день, а не по строке на каждого пользователя.
+        """
+        if user_id is not None:
+            query = (
+                select(UserLoginDaily.day, UserLoginDaily.logins)
+                .where(
+                    UserLoginDaily.user_id == user_id,
+                    UserLoginDaily.day.between(date_from, date_to),
+                )
+                .order_by(UserLoginDaily.day)
+            )
+        else:
+            query = (
+                select(
+                    UserAgentLoginDaily.day,
+                    func.sum(UserAgentLoginDaily.logins).label("logins"),
+                )
+                .where(UserAgentLoginDaily.day.between(date_from, date_to))
+                .group_by(UserAgentLoginDaily.day)
+                .order_by(UserAgentLoginDaily.day)
+            )
+        return (await self.session.execute(query)).all()
+
+    @read_only
+    async def get_user_agent_logins(self, date_from: date, date_to: date) -> list:
+        result = await self.session.execute(
+            select(
+                UserAgentLoginDaily.day,
+                UserAgentLoginDaily.agent_family,
+                UserAgentLoginDaily.logins,
+            )
+            .where(UserAgentLoginDaily.day.between(date_from, date_to))
+            .order_by(UserAgentLoginDaily.day, UserAgentLoginDaily.agent_family)
+        )
+        return result.all()
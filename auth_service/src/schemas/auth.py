@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from pydantic import BaseModel
 
 
@@ -8,3 +10,13 @@ class RefreshTokenSchema(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
+
+
+class Principal(BaseModel):
+    """Аутентифицированный пользователь в том виде, в каком он кешируется."""
+
+    id: UUID
+    login: str
+    is_active: bool
+    is_superuser: bool
+    roles: list[str] = []
@@ -1,5 +1,5 @@
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class RoleName(BaseModel):
@@ -14,3 +14,12 @@ class RoleSchema(BaseModel):
 class RoleUserSchema(BaseModel):
     user_id: UUID
     role_name: str
+
+
+class RoleUserBulkSchema(BaseModel):
+    items: list[RoleUserSchema] = Field(max_length=1000)
+
+
+class RoleBulkResult(BaseModel):
+    # Сколько пар (пользователь, роль) реально добавлено или удалено.
+    affected: int
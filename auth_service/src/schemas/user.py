@@ -1,3 +1,5 @@
+from datetime import date
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -12,6 +14,14 @@ class UserRegister(BaseModel):
     city: str | None
 
 
+class SocialUserInfo(BaseModel):
+    provider: str
+    social_id: str
+    email: EmailStr | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+
+
 class UserLogin(BaseModel):
     login: str
     password: str
@@ -20,3 +30,14 @@ class UserLogin(BaseModel):
 class UserUpdateCredentials(BaseModel):
     login: str
     password: str
+
+
+class DailyLogins(BaseModel):
+    day: date
+    logins: int
+
+
+class UserAgentLogins(BaseModel):
+    day: date
+    agent_family: str
+    logins: int
@@ -1,45 +1,82 @@
 from datetime import datetime, timedelta, timezone
 from typing import Any
-from functools import lru_cache
+from uuid import UUID, uuid4
 
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from redis.asyncio import Redis
 
 from src.core.config import settings
+from src.core.metrics import (
+    ACCESS_TOKENS_ISSUED,
+    REFRESH_TOKENS_ISSUED,
+    REFRESHES_OK,
+    REFRESHES_REJECTED,
+)
 from src.db.redis import get_redis
-from src.models.entity import User
+from src.repositories.auth_repository import AuthRepository, RedisAuthRepository
+from src.schemas.auth import Principal
+from src.services.principal_cache import PrincipalCache
+from src.services.revocation import RevocationList, get_revocation_list
 from src.services.user import UserService, get_user_service
 
 
 class AuthService:
-    def __init__(self, redis: Redis):
-        self.redis = redis
+    def __init__(self, auth_repo: AuthRepository, revocation: RevocationList):
+        self.auth_repo = auth_repo
+        self.revocation = revocation
 
-    async def create_access_token(self, user: User) -> str:
-        expire = datetime.now(timezone.utc) + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-        to_encode = {"sub": str(user.id), "exp": expire}
-        encoded_jwt = jwt.encode(
-            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    @staticmethod
+    def _encode(claims: dict[str, Any], expires_in: timedelta) -> str:
+        to_encode = {**claims, "exp": datetime.now(timezone.utc) + expires_in}
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+    @staticmethod
+    def _access_claims(user_id, login: str, roles: str, session_id: str) -> dict:
+        # user_id, login и roles (через запятую) читает content API.
+        return {
+            "sub": str(user_id),
+            "user_id": str(user_id),
+            "login": login,
+            "roles": roles,
+            "sid": session_id,
+            "jti": str(uuid4()),
+            # С долями секунды: вход сразу после выхода на всех устройствах
+            # не должен попасть под отзыв.
+            "iat": datetime.now(timezone.utc).timestamp(),
+            "type": "access",
+        }
+
+    @staticmethod
+    def _refresh_claims(user_id, session_id: str, jti: str) -> dict:
+        return {"sub": str(user_id), "sid": session_id, "jti": jti, "type": "refresh"}
+
+    async def create_access_token(self, user: Principal, session_id: str) -> str:
+        ACCESS_TOKENS_ISSUED.inc()
+        return self._encode(
+            self._access_claims(user.id, user.login, ",".join(user.roles), session_id),
+            timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
-        return encoded_jwt
 
-    async def create_refresh_token(self, user: User) -> str:
-        expire = datetime.now(timezone.utc) + timedelta(
-            days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+    async def create_refresh_token(self, user: Principal, session_id: str) -> str:
+        """Открывает сессию устройства и выдаёт её первый refresh-токен."""
+        jti = str(uuid4())
+        await self.auth_repo.create_session(
+            user_id=user.id,
+            session_id=session_id,
+            jti=jti,
+            login=user.login,
+            roles=",".join(user.roles),
         )
-        to_encode = {"sub": str(user.id), "exp": expire}
-        encoded_jwt = jwt.encode(
-            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        REFRESH_TOKENS_ISSUED.inc()
+        return self._encode(
+            self._refresh_claims(user.id, session_id, jti),
+            timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
         )
-        await self.redis.set(f"refresh_token:{user.id}", encoded_jwt, ex=expire - datetime.now(timezone.utc))
-        return encoded_jwt
 
     async def get_user_from_token(
         self, token: str, user_service: UserService
-    ) -> User:
+    ) -> Principal:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -49,26 +86,103 @@ class AuthService:
             payload = jwt.decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
             )
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                raise credentials_exception
-        except JWTError:
+            user_id = UUID(payload.get("sub"))
+        except (JWTError, TypeError, ValueError):
+            raise credentials_exception
+        if payload.get("type") == "refresh":
+            raise credentials_exception
+        if await self.revocation.is_revoked(
+            payload.get("jti"), user_id=str(user_id), issued_at=payload.get("iat")
+        ):
             raise credentials_exception
 
-        user = await user_service.get_user_by_id(user_id)
-        if user is None:
+        principal = await user_service.get_principal(user_id)
+        if principal is None or not principal.is_active:
+            raise credentials_exception
+        return principal
+
+    async def logout(self, user: Principal, access_token: str):
+        """Завершает сессию устройства и отзывает сам access-токен."""
+        claims = jwt.get_unverified_claims(access_token)
+        if claims.get("sid"):
+            await self.auth_repo.delete_session(user.id, claims["sid"])
+        if claims.get("jti"):
+            await self.revocation.revoke(claims["jti"], claims["exp"])
+
+    async def logout_all(self, user_id: UUID):
+        """Завершает сессии пользователя на всех устройствах.
+
+        Выданные access-токены отзываются все сразу, по времени выпуска.
+        """
+        await self.auth_repo.delete_all_sessions(user_id)
+        await self.revocation.revoke_user(
+            str(user_id), keep_for=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+
+    async def refresh(self, refresh_token: str, user_service: UserService):
+        """Обменивает refresh-токен на новую пару.
+
+        Обычно база не нужна: login, роли и активность берутся из кеша
+        principal. При промахе principal читается из базы, а обмен
+        повторяется с ним. Повторное предъявление уже обменянного токена
+        означает его утечку: сессия этого устройства закрывается целиком.
+        """
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        try:
+            payload = jwt.decode(
+                refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            user_id = UUID(payload["sub"])
+            session_id, jti = payload["sid"], payload["jti"]
+        except (JWTError, KeyError, TypeError, ValueError):
+            REFRESHES_REJECTED.inc()
+            raise credentials_exception
+        if payload.get("type") != "refresh":
+            REFRESHES_REJECTED.inc()
             raise credentials_exception
-        return user
 
-    async def logout(self, user: User, access_token: str):
-        # Просто для примера, можно добавить токен в черный список
-        await self.redis.delete(f"refresh_token:{user.id}")
+        new_jti = str(uuid4())
+        rotate = dict(
+            user_id=user_id,
+            session_id=session_id,
+            jti=jti,
+            new_jti=new_jti,
+            principal_key=PrincipalCache.key(user_id),
+        )
+        result, login, roles = await self.auth_repo.rotate_session(**rotate)
+        if result == "uncached":
+            principal = await user_service.get_principal(user_id)
+            if principal is None:
+                await self.auth_repo.delete_session(user_id, session_id)
+                REFRESHES_REJECTED.inc()
+                raise credentials_exception
+            result, login, roles = await self.auth_repo.rotate_session(
+                **rotate, principal=principal.model_dump_json()
+            )
+        if result != "ok":
+            REFRESHES_REJECTED.inc()
+            raise credentials_exception
+        REFRESHES_OK.inc()
+        ACCESS_TOKENS_ISSUED.inc()
+        REFRESH_TOKENS_ISSUED.inc()
 
-    async def refresh(self, refresh_token: str):
-        # В реальном приложении здесь будет более сложная логика
-        return {"access_token": "new_access", "refresh_token": "new_refresh"}
+        access_token = self._encode(
+            self._access_claims(user_id, login, roles, session_id),
+            timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
+        refresh_token = self._encode(
+            self._refresh_claims(user_id, session_id, new_jti),
+            timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        return {"access_token": access_token, "refresh_token": refresh_token}
 
 
-@lru_cache()
 def get_auth_service(redis: Redis = Depends(get_redis)) -> AuthService:
-    return AuthService(redis)
\ No newline at end of file
+    auth_repo = RedisAuthRepository(
+        redis, ttl=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    )
+    return AuthService(auth_repo=auth_repo, revocation=get_revocation_list())
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+from uuid import UUID
+
+from redis.exceptions import RedisError, ResponseError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.user_agent import clip_user_agent
+from src.db import postgres as postgres_db
+from src.db import redis as redis_db
+from src.repositories.user_repository import PgUserRepository
+
+LOGIN_HISTORY_STREAM = "auth:login_history"
+LOGIN_HISTORY_GROUP = "login-history-writers"
+LOGIN_HISTORY_DEAD_LETTER_STREAM = "auth:login_history:dead"
+
+
+def make_event(user_id: UUID, user_agent: str | None) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": str(user_id),
+        "user_agent": clip_user_agent(user_agent),
+        # Колонка auth_date хранит UTC без часового пояса.
+        "auth_date": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+    }
+
+
+def parse_event(fields: dict) -> dict:
+    return {
+        "id": UUID(fields["id"]),
+        "user_id": UUID(fields["user_id"]),
+        "user_agent": clip_user_agent(fields["user_agent"]),
+        "auth_date": datetime.fromisoformat(fields["auth_date"]),
+    }
+
+
+async def write_events(events: list[dict]) -> None:
+    async with postgres_db.unit_of_work() as session:
+        await PgUserRepository(session).add_login_history(events)
+
+
+def is_transient(error: Exception) -> bool:
+    """Ошибка доступа к базе, а не самих данных: повтор по одному не поможет."""
+    if isinstance(error, (OSError, TimeoutError, PoolTimeoutError)):
+        return True
+    return getattr(error, "connection_invalidated", False) or isinstance(
+        getattr(error, "orig", None), OSError
+    )
+
+
+class LoginHistoryWriteError(Exception):
+    pass
+
+
+class LoginHistoryWriter:
+    """Отложенная запись истории входов.
+
+    /login только кладёт событие в Redis Stream, а фоновый потребитель
+    из группы забирает события пачками и пишет их в users_auth_history
+    одним INSERT. Если Redis недоступен, событие пишется в базу сразу.
+
+    Если пачка не записалась, события пишутся по одному. То, что не
+    записывается и так, уходит в dead-letter stream: сразу, если соседние
+    события записались, иначе - после max_deliveries доставок. Так одно
+    событие не останавливает поток. При недоступной базе пачка остаётся
+    в обработке и перечитывается с растущей паузой.
+    """
+
+    def __init__(
+        self,
+        stream: str = LOGIN_HISTORY_STREAM,
+        group: str = LOGIN_HISTORY_GROUP,
+        batch_size: int = 500,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 60_000,
+        maxlen: int = 1_000_000,
+        max_deliveries: int = 10,
+        dead_letter_stream: str = LOGIN_HISTORY_DEAD_LETTER_STREAM,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.stream = stream
+        self.group = group
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.maxlen = maxlen
+        self.max_deliveries = max_deliveries
+        self.dead_letter_stream = dead_letter_stream
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: asyncio.Task | None = None
+
+    async def record(self, user_id: UUID, user_agent: str | None) -> None:
+        event = make_event(user_id, user_agent)
+        redis = redis_db.redis
+        if self.enabled and redis is not None:
+            try:
+                await redis.xadd(
+                    self.stream, event, maxlen=self.maxlen, approximate=True
+                )
+                return
+            except RedisError as e:
+                app_logger.warning(f"Login history stream unavailable: {e}")
+        await write_events([parse_event(event)])
+
+    async def _ensure_group(self) -> None:
+        try:
+            await redis_db.redis.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _flush(self, messages: list) -> None:
+        if not messages:
+            return
+        events = {}
+        for message_id, fields in messages:
+            try:
+                events[message_id] = parse_event(fields)
+            except (KeyError, ValueError):
+                app_logger.error(f"Dropping malformed login event {message_id}")
+        try:
+            await write_events(list(events.values()))
+        except Exception as e:
+            if is_transient(e):
+                raise
+            app_logger.warning(f"Login history batch failed, writing one by one: {e}")
+            errors = await self._write_one_by_one(events)
+            retry = set()
+            if len(errors) == len(events):
+                # Не записалось ни одно событие - причина может быть не в них.
+                retry = await self._undelivered(errors)
+            await self._dead_letter(
+                {message_id: error for message_id, error in errors.items() if message_id not in retry},
+                messages,
+            )
+            if retry:
+                await self._ack([message_id for message_id, _ in messages if message_id not in retry])
+                raise LoginHistoryWriteError(f"{len(retry)} login events are not written")
+        await self._ack([message_id for message_id, _ in messages])
+
+    async def _ack(self, ids: list) -> None:
+        if ids:
+            await redis_db.redis.xack(self.stream, self.group, *ids)
+            await redis_db.redis.xdel(self.stream, *ids)
+
+    async def _write_one_by_one(self, events: dict) -> dict:
+        """Возвращает ошибки событий, не записавшихся и по отдельности."""
+        errors = {}
+        for message_id, event in events.items():
+            try:
+                await write_events([event])
+            except Exception as e:
+                if is_transient(e):
+                    raise
+                errors[message_id] = e
+        return errors
+
+    async def _undelivered(self, errors: dict) -> set:
+        """Сообщения, доставленные меньше max_deliveries раз."""
+        pipe = redis_db.redis.pipeline(transaction=False)
+        for message_id in errors:
+            pipe.xpending_range(self.stream, self.group, message_id, message_id, 1)
+        pending = await pipe.execute()
+        return {
+            message_id
+            for message_id, entries in zip(errors, pending)
+            if entries and entries[0]["times_delivered"] < self.max_deliveries
+        }
+
+    async def _dead_letter(self, failed: dict, messages: list) -> None:
+        if not failed:
+            return
+        fields_by_id = dict(messages)
+        pipe = redis_db.redis.pipeline(transaction=False)
+        for message_id, error in failed.items():
+            app_logger.error(f"Moving login event {message_id} to dead letters: {error}")
+            pipe.xadd(
+                self.dead_letter_stream,
+                {**fields_by_id[message_id], "source_id": message_id, "error": str(error)[:500]},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        await pipe.execute()
+
+    async def _claim_stale(self) -> None:
+        # Подбираем события, которые взял и не подтвердил упавший воркер.
+        _, messages, *_ = await redis_db.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            count=self.batch_size,
+        )
+        await self._flush(messages)
+
+    async def run(self) -> None:
+        # Сначала дописываем то, что этот потребитель получил, но не успел
+        # подтвердить, затем читаем новые события.
+        last_id = "0"
+        failures = 0
+        while True:
+            try:
+                if last_id == "0":
+                    await self._ensure_group()
+                response = await redis_db.redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    {self.stream: last_id},
+                    count=self.batch_size,
+                    block=self.block_ms,
+                )
+                messages = response[0][1] if response else []
+                await self._flush(messages)
+                if not messages:
+                    last_id = ">"
+                    await self._claim_stale()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Login history consumer failed: {e}", exc_info=True)
+                # Неподтверждённые события перечитаются с начала; пока база
+                # недоступна, повторы становятся реже.
+                last_id = "0"
+                failures += 1
+                await asyncio.sleep(min(2 ** (failures - 1), 60))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+            app_logger.info("Login history consumer started.")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            app_logger.info("Login history consumer stopped.")
+
+
+@lru_cache()
+def get_login_history_writer() -> LoginHistoryWriter:
+    return LoginHistoryWriter(
+        batch_size=settings.LOGIN_HISTORY_BATCH_SIZE,
+        block_ms=settings.LOGIN_HISTORY_BLOCK_MS,
+        claim_idle_ms=settings.LOGIN_HISTORY_CLAIM_IDLE_MS,
+        maxlen=settings.LOGIN_HISTORY_STREAM_MAXLEN,
+        max_deliveries=settings.LOGIN_HISTORY_MAX_DELIVERIES,
+        enabled=settings.LOGIN_HISTORY_WRITE_BEHIND,
+    )
@@ -0,0 +1,135 @@
+import secrets
+from functools import lru_cache
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import Request
+from fastapi.responses import RedirectResponse
+
+from src.core.config import settings
+from src.schemas.user import SocialUserInfo
+
+YANDEX_AUTHORIZE_URL = "https://oauth.yandex.ru/authorize"
+YANDEX_TOKEN_URL = "https://oauth.yandex.ru/token"
+YANDEX_USERINFO_URL = "https://login.yandex.ru/info"
+
+# state из редиректа на Яндекс живёт в cookie браузера, который начал вход:
+# callback без совпадающего state отклоняется (защита от login CSRF).
+STATE_COOKIE = "sso_state"
+STATE_MAX_AGE = 600
+
+
+class OAuthError(Exception):
+    pass
+
+
+class YandexOAuth:
+    """OAuth-клиент Яндекса с одним httpx.AsyncClient на воркер.
+
+    Соединения с oauth.yandex.ru и login.yandex.ru переиспользуются между
+    callback'ами, а не открываются заново, как в fastapi_sso, на каждый
+    вход. Клиент создаётся при первом обращении и закрывается в lifespan.
+    """
+
+    provider = "yandex"
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        redirect_uri: str,
+        timeout: float = 5,
+        max_connections: int = 20,
+    ) -> None:
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_login_url(self, state: str) -> str:
+        params = {
+            "response_type": "code",
+            "client_id": self.client_id,
+            "redirect_uri": self.redirect_uri,
+            "state": state,
+        }
+        return f"{YANDEX_AUTHORIZE_URL}?{urlencode(params)}"
+
+    async def get_login_redirect(self) -> RedirectResponse:
+        state = secrets.token_urlsafe(32)
+        response = RedirectResponse(self.get_login_url(state))
+        response.set_cookie(
+            STATE_COOKIE,
+            state,
+            max_age=STATE_MAX_AGE,
+            httponly=True,
+            secure=self.redirect_uri.startswith("https://"),
+            samesite="lax",
+        )
+        return response
+
+    async def verify_and_process(self, request: Request) -> SocialUserInfo:
+        """Проверяет state, меняет code из callback на токен и читает профиль."""
+        state = request.query_params.get("state")
+        expected = request.cookies.get(STATE_COOKIE)
+        if not state or not expected or not secrets.compare_digest(state, expected):
+            raise OAuthError("'state' parameter does not match")
+
+        code = request.query_params.get("code")
+        if not code:
+            raise OAuthError("'code' parameter was not found in callback request")
+
+        response = await self.client.post(
+            YANDEX_TOKEN_URL,
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+        )
+        if response.is_error:
+            raise OAuthError(f"Token request failed: {response.status_code}")
+        access_token = response.json()["access_token"]
+
+        response = await self.client.get(
+            YANDEX_USERINFO_URL,
+            params={"format": "json"},
+            headers={"Authorization": f"OAuth {access_token}"},
+        )
+        if response.is_error:
+            raise OAuthError(f"User info request failed: {response.status_code}")
+        info = response.json()
+        return SocialUserInfo(
+            provider=self.provider,
+            social_id=str(info["id"]),
+            email=info.get("default_email"),
+            first_name=info.get("first_name"),
+            last_name=info.get("last_name"),
+        )
+
+
+@lru_cache()
+def get_yandex_oauth() -> YandexOAuth:
+    return YandexOAuth(
+        client_id=settings.YANDEX_CLIENT_ID,
+        client_secret=settings.YANDEX_CLIENT_SECRET,
+        redirect_uri=settings.YANDEX_REDIRECT_URI,
+        timeout=settings.OAUTH_TIMEOUT,
+    )
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.metrics import PASSWORD_HASH, PASSWORD_HASHER_BUSY, PASSWORD_VERIFY
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь на хеширование переполнена, запрос нужно повторить позже."""
+
+
+def normalize_method(method: str) -> str:
+    """Метод в том виде, в каком werkzeug пишет его в начало хеша.
+
+    "scrypt" и "scrypt:32768:8:1" дают одинаковый хеш, поэтому параметры
+    по умолчанию подставляются явно.
+    """
+    name, *args = method.split(":")
+    if name == "scrypt":
+        n, r, p = args or (2**15, 8, 1)
+        return f"scrypt:{int(n)}:{int(r)}:{int(p)}"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{int(iterations)}"
+    return method
+
+
+class PasswordHasher:
+    """Хеширование и проверка паролей вне event loop.
+
+    KDF намеренно медленный, поэтому выполняется в отдельном пуле. Число
+    одновременно ожидающих задач ограничено: при переполнении сразу
+    поднимается PasswordHasherBusy вместо того, чтобы копить очередь.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        workers: int,
+        max_pending: int,
+        use_processes: bool = False,
+    ) -> None:
+        self.method = method
+        self._normalized_method = normalize_method(method)
+        self.max_pending = max_pending
+        self._pending = 0
+        self._use_processes = use_processes
+        self._workers = workers
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        # Пул создаётся лениво, чтобы процессы не форкались при импорте.
+        if self._executor is None:
+            if self._use_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+    async def _run(self, histogram, func, *args):
+        if self._pending >= self.max_pending:
+            PASSWORD_HASHER_BUSY.inc()
+            raise PasswordHasherBusy
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+            histogram.observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(PASSWORD_HASH, generate_password_hash, password, self.method)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        if not password_hash:
+            return False
+        return await self._run(PASSWORD_VERIFY, check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Хеш посчитан другим алгоритмом или с другой стоимостью."""
+        try:
+            method = normalize_method(password_hash.split("$", 1)[0])
+        except ValueError:
+            return True
+        return method != self._normalized_method
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            app_logger.info("Password hasher pool stopped.")
+
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    return PasswordHasher(
+        method=settings.PASSWORD_HASH_METHOD,
+        workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+    )
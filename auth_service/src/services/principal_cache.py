@@ -0,0 +1,106 @@
+from functools import lru_cache
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from src.core.cache import GenerationGuard, LocalTTLCache
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+from src.schemas.auth import Principal
+
+PrincipalLoader = Callable[[], Awaitable[Principal | None]]
+
+
+class PrincipalCache:
+    """Principal пользователя для проверки токенов без запросов в базу.
+
+    Redis хранит его в JSON, поверх лежит короткий кеш в памяти воркера.
+    После изменения логина, ролей или активности пользователь
+    инвалидируется явно.
+    """
+
+    def __init__(self, ttl: int, local_ttl: float, local_size: int) -> None:
+        self.ttl = ttl
+        self.local = LocalTTLCache(maxsize=local_size, ttl=local_ttl)
+        self.guard = GenerationGuard("Principal cache", ttl)
+
+    @staticmethod
+    def key(user_id: UUID) -> str:
+        return f"principal:{user_id}"
+
+    @staticmethod
+    def generation_key(user_id: UUID) -> str:
+        return f"principal_gen:{user_id}"
+
+    async def get(self, user_id: UUID, loader: PrincipalLoader) -> Principal | None:
+        principal = self.local.get(user_id)
+        if principal is not None:
+            return principal
+
+        redis = redis_db.redis
+        generation = None
+        if redis is not None:
+            try:
+                cached, generation = await redis.mget(
+                    self.key(user_id), self.generation_key(user_id)
+                )
+                if cached:
+                    principal = Principal.model_validate_json(cached)
+                    self.local.set(user_id, principal)
+                    return principal
+            except RedisError as e:
+                app_logger.warning(f"Principal cache unavailable: {e}")
+                redis = None
+
+        principal = await loader()
+        if principal is None:
+            return None
+        self.local.set(user_id, principal)
+        if redis is not None:
+            await self._store(principal, generation or "0")
+        return principal
+
+    async def put(self, principal: Principal) -> None:
+        """Кладёт свежий principal, например сразу после логина."""
+        self.local.set(principal.id, principal)
+        redis = redis_db.redis
+        if redis is None:
+            return
+        try:
+            generation = await redis.get(self.generation_key(principal.id))
+        except RedisError as e:
+            app_logger.warning(f"Principal cache unavailable: {e}")
+            return
+        await self._store(principal, generation or "0")
+
+    async def _store(self, principal: Principal, generation: str) -> None:
+        await self.guard.store(
+            redis_db.redis,
+            self.key(principal.id),
+            self.generation_key(principal.id),
+            generation,
+            [principal.model_dump_json()],
+        )
+
+    async def invalidate(self, *user_ids: UUID) -> None:
+        for user_id in user_ids:
+            self.local.pop(user_id)
+
+        redis = redis_db.redis
+        if redis is None or not user_ids:
+            return
+        await self.guard.invalidate(
+            redis,
+            [(self.key(user_id), self.generation_key(user_id)) for user_id in user_ids],
+        )
+
+
+@lru_cache()
+def get_principal_cache() -> PrincipalCache:
+    return PrincipalCache(
+        ttl=settings.PRINCIPAL_CACHE_TTL,
+        local_ttl=settings.PRINCIPAL_CACHE_LOCAL_TTL,
+        local_size=settings.PRINCIPAL_CACHE_LOCAL_SIZE,
+    )
@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+from shared.revocation import RevocationList
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+
+
+@lru_cache()
+def get_revocation_list() -> RevocationList:
+    return RevocationList(
+        redis=lambda: redis_db.redis,
+        logger=app_logger,
+        capacity=settings.REVOCATION_BLOOM_CAPACITY,
+        error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+        rebuild_interval=settings.REVOCATION_REBUILD_SECONDS,
+    )
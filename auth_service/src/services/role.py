@@ -1,15 +1,19 @@
-from functools import lru_cache
 from uuid import UUID
-import asyncpg
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.repositories.user_repository import PgUserRepository, UserRepository
-from src.db.postgres import get_session
+from src.repositories.user_repository import (
+    PgUserRepository,
+    UserLoadProfile,
+    UserRepository,
+)
+from src.db.postgres import after_commit, get_session
 from src.models.entity import Role
 from src.repositories.role_repository import PgRoleRepository, RoleRepository
 from http import HTTPStatus
 from sqlalchemy.exc import SQLAlchemyError
-from src.schemas.role import RoleUserSchema
+from src.schemas.role import RoleBulkResult, RoleUserSchema
+from src.services.principal_cache import PrincipalCache, get_principal_cache
+from src.services.role_cache import RoleCache, get_role_cache
 
 
 class RoleService:
@@ -19,10 +23,27 @@ class RoleService:
         session: AsyncSession,
         roles_repo: RoleRepository,
         user_repo: UserRepository,
+        role_cache: RoleCache,
+        principal_cache: PrincipalCache,
     ) -> None:
         self.session = session
         self.roles_repo = roles_repo
         self.user_repo = user_repo
+        self.role_cache = role_cache
+        self.principal_cache = principal_cache
+
+    def _invalidate(self, *user_ids: UUID) -> None:
+        """Сбрасывает кеши пользователей после коммита запроса.
+
+        Транзакцией владеет get_session: сервис только пишет в сессию.
+        """
+
+        async def invalidate() -> None:
+            # Роли лежат и в кеше ролей, и в principal.
+            await self.role_cache.invalidate(*user_ids)
+            await self.principal_cache.invalidate(*user_ids)
+
+        after_commit(self.session, invalidate)
 
     async def get_all(self):
         try:
@@ -47,15 +68,26 @@ class RoleService:
         return await self.roles_repo.create(new_role)
 
     async def update(self, role_id: UUID, name: str):
+        # Кеш хранит имена ролей, поэтому переименование сбрасывает его
+        # у всех владельцев роли.
+        user_ids = await self.roles_repo.get_user_ids(role_id)
         updated_role = await self.roles_repo.update(role_id, Role(name=name))
+        if updated_role:
+            self._invalidate(*user_ids)
         return updated_role
 
     async def delete(self, role_id: UUID):
-        return await self.roles_repo.delete(role_id)
+        user_ids = await self.roles_repo.get_user_ids(role_id)
+        deleted = await self.roles_repo.delete(role_id)
+        if deleted:
+            self._invalidate(*user_ids)
+        return deleted
 
     async def set_role(self, role_user: RoleUserSchema) -> bool:
         role = await self.roles_repo.get_by_name(role_user.role_name)
-        user = await self.user_repo.get(user_id=role_user.user_id)
+        user = await self.user_repo.get(
+            user_id=role_user.user_id, profile=UserLoadProfile.WITH_ROLES
+        )
 
         if not role or not user:
             return False  # Указываем на неудачу, обработка будет в API
@@ -65,33 +97,72 @@ class RoleService:
             return True
 
         user.roles.append(role)
-        await self.session.commit()
+        self._invalidate(user.id)
         return True
 
     async def revoke_role(self, role_user: RoleUserSchema) -> bool:
         role = await self.roles_repo.get_by_name(role_user.role_name)
-        user = await self.user_repo.get(user_id=role_user.user_id)
+        user = await self.user_repo.get(
+            user_id=role_user.user_id, profile=UserLoadProfile.WITH_ROLES
+        )
 
         if not role or not user or role not in user.roles:
             return False  # Нечего отзывать
 
         user.roles.remove(role)
+        self._invalidate(user.id)
         return True
 
     async def check_role(self, role_user: RoleUserSchema) -> bool:
-        role = await self.roles_repo.get_by_name(role_user.role_name)
-        user = await self.user_repo.get(user_id=role_user.user_id)
-
-        if not role or not user:
-            return False
-
-        return role in user.roles
+        # Несуществующий пользователь или роль дают пустой набор
+        # и так же кешируются.
+        return await self.role_cache.has_role(
+            role_user.user_id,
+            role_user.role_name,
+            loader=lambda: self.user_repo.get_role_names(role_user.user_id),
+        )
+
+    async def check_roles(self, items: list[RoleUserSchema]) -> list[bool]:
+        """Ответ для каждой пары в порядке запроса.
+
+        Из кеша ролей; в базу одним запросом идут только пользователи,
+        которых в кеше нет.
+        """
+        if not items:
+            return []
+        assigned = await self.role_cache.assigned(
+            [(item.user_id, item.role_name) for item in items],
+            loader=self.user_repo.get_role_names_many,
+        )
+        return [(item.user_id, item.role_name) in assigned for item in items]
+
+    async def set_roles(self, items: list[RoleUserSchema]) -> RoleBulkResult:
+        pairs = list({(item.user_id, item.role_name) for item in items})
+        if not pairs:
+            return RoleBulkResult(affected=0)
+        user_ids = await self.roles_repo.assign(pairs)
+        self._invalidate(*set(user_ids))
+        return RoleBulkResult(affected=len(user_ids))
+
+    async def revoke_roles(self, items: list[RoleUserSchema]) -> RoleBulkResult:
+        pairs = list({(item.user_id, item.role_name) for item in items})
+        if not pairs:
+            return RoleBulkResult(affected=0)
+        user_ids = await self.roles_repo.unassign(pairs)
+        self._invalidate(*set(user_ids))
+        return RoleBulkResult(affected=len(user_ids))
 
 
-@lru_cache()
 def get_role_service(
-    session: AsyncSession = Depends(get_session),
+    # scope="function": транзакция завершается до отправки ответа.
+    session: AsyncSession = Depends(get_session, scope="function"),
 ) -> RoleService:
     roles_repo = PgRoleRepository(session=session)
     user_repo = PgUserRepository(session=session)
-    return RoleService(session=session, roles_repo=roles_repo, user_repo=user_repo)
+    return RoleService(
+        session=session,
+        roles_repo=roles_repo,
+        user_repo=user_repo,
+        role_cache=get_role_cache(),
+        principal_cache=get_principal_cache(),
+    )
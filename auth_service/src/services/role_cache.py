@@ -0,0 +1,169 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Awaitable, Callable, Iterable, Mapping
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from src.core.cache import GenerationGuard, LocalTTLCache
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+
+# Служебный элемент множества: отличает закешированный пустой набор ролей
+# от отсутствующего ключа, поэтому проверка обходится одним SMISMEMBER.
+LOADED_MARKER = "__loaded__"
+
+RolesLoader = Callable[[], Awaitable[Iterable[str]]]
+BulkRolesLoader = Callable[[list[UUID]], Awaitable[Mapping[UUID, Iterable[str]]]]
+
+
+class RoleCache:
+    """Наборы ролей пользователей: Redis SET на пользователя и LRU в процессе.
+
+    Запись идёт в базу, а кеш после коммита инвалидируется; от записи
+    устаревшего набора защищает GenerationGuard.
+    """
+
+    def __init__(self, ttl: int, local_ttl: float, local_size: int) -> None:
+        self.ttl = ttl
+        self.local = LocalTTLCache(maxsize=local_size, ttl=local_ttl)
+        self.guard = GenerationGuard("Role cache", ttl)
+
+    @staticmethod
+    def key(user_id: UUID) -> str:
+        return f"user_roles:{user_id}"
+
+    @staticmethod
+    def generation_key(user_id: UUID) -> str:
+        return f"user_roles_gen:{user_id}"
+
+    async def has_role(
+        self, user_id: UUID, role_name: str, loader: RolesLoader
+    ) -> bool:
+        roles = self.local.get(user_id)
+        if roles is not None:
+            return role_name in roles
+
+        redis = redis_db.redis
+        if redis is None:
+            return role_name in await self._load(user_id, loader)
+
+        try:
+            loaded, has_role = await redis.smismember(
+                self.key(user_id), [LOADED_MARKER, role_name]
+            )
+            if loaded:
+                return bool(has_role)
+            generation = await redis.get(self.generation_key(user_id)) or "0"
+        except RedisError as e:
+            app_logger.warning(f"Role cache unavailable: {e}")
+            return role_name in await self._load(user_id, loader)
+
+        roles = await self._load(user_id, loader)
+        await self.guard.store(
+            redis,
+            self.key(user_id),
+            self.generation_key(user_id),
+            generation,
+            [LOADED_MARKER, *roles],
+            as_set=True,
+        )
+        return role_name in roles
+
+    async def assigned(
+        self, pairs: Iterable[tuple[UUID, str]], loader: BulkRolesLoader
+    ) -> set[tuple[UUID, str]]:
+        """Какие из пар (пользователь, роль) назначены.
+
+        Все пользователи проверяются одним pipeline из SMISMEMBER; тех, кого
+        нет ни в одном кеше, loader загружает одним запросом.
+        """
+        requested = defaultdict(list)
+        for user_id, role_name in dict.fromkeys(pairs):
+            requested[user_id].append(role_name)
+
+        assigned = set()
+        missing = []
+        for user_id, role_names in requested.items():
+            roles = self.local.get(user_id)
+            if roles is None:
+                missing.append(user_id)
+            else:
+                assigned.update((user_id, name) for name in role_names if name in roles)
+        if not missing:
+            return assigned
+
+        redis = redis_db.redis
+        generations = {}
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for user_id in missing:
+                        pipe.smismember(
+                            self.key(user_id), [LOADED_MARKER, *requested[user_id]]
+                        )
+                        pipe.get(self.generation_key(user_id))
+                    replies = await pipe.execute()
+            except RedisError as e:
+                app_logger.warning(f"Role cache unavailable: {e}")
+                redis = None
+            else:
+                not_cached = []
+                for number, user_id in enumerate(missing):
+                    (loaded, *flags), generation = replies[2 * number : 2 * number + 2]
+                    if loaded:
+                        assigned.update(
+                            (user_id, name)
+                            for name, flag in zip(requested[user_id], flags)
+                            if flag
+                        )
+                    else:
+                        not_cached.append(user_id)
+                        generations[user_id] = generation
+                missing = not_cached
+        if not missing:
+            return assigned
+
+        loaded_roles = await loader(missing)
+        for user_id in missing:
+            roles = frozenset(loaded_roles.get(user_id, ()))
+            self.local.set(user_id, roles)
+            assigned.update((user_id, name) for name in requested[user_id] if name in roles)
+            if redis is not None:
+                await self.guard.store(
+                    redis,
+                    self.key(user_id),
+                    self.generation_key(user_id),
+                    generations[user_id],
+                    [LOADED_MARKER, *roles],
+                    as_set=True,
+                )
+        return assigned
+
+    async def _load(self, user_id: UUID, loader: RolesLoader) -> frozenset[str]:
+        roles = frozenset(await loader())
+        self.local.set(user_id, roles)
+        return roles
+
+    async def invalidate(self, *user_ids: UUID) -> None:
+        for user_id in user_ids:
+            self.local.pop(user_id)
+
+        redis = redis_db.redis
+        if redis is None or not user_ids:
+            return
+        # Если Redis недоступен, устаревший набор доживёт до истечения ttl.
+        await self.guard.invalidate(
+            redis,
+            [(self.key(user_id), self.generation_key(user_id)) for user_id in user_ids],
+        )
+
+
+@lru_cache()
+def get_role_cache() -> RoleCache:
+    return RoleCache(
+        ttl=settings.ROLE_CACHE_TTL,
+        local_ttl=settings.ROLE_CACHE_LOCAL_TTL,
+        local_size=settings.ROLE_CACHE_LOCAL_SIZE,
+    )
@@ -0,0 +1,58 @@
+from functools import lru_cache
+from uuid import UUID
+
+from redis.exceptions import RedisError
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+
+
+class SocialAccountCache:
+    """Id пользователя по (провайдер, id в соцсети) для OAuth callback.
+
+    Соответствие не меняется, пока жив пользователь, поэтому явной
+    инвалидации нет: устаревшая запись о удалённом пользователе
+    обнаруживается при загрузке principal и перезаписывается.
+    """
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+
+    @staticmethod
+    def key(provider: str, social_id: str) -> str:
+        return f"social_account:{provider}:{social_id}"
+
+    async def get(self, provider: str, social_id: str) -> UUID | None:
+        redis = redis_db.redis
+        if redis is None:
+            return None
+        try:
+            user_id = await redis.get(self.key(provider, social_id))
+        except RedisError as e:
+            app_logger.warning(f"Social account cache unavailable: {e}")
+            return None
+        return UUID(user_id) if user_id else None
+
+    async def put(self, provider: str, social_id: str, user_id: UUID) -> None:
+        redis = redis_db.redis
+        if redis is None:
+            return
+        try:
+            await redis.set(self.key(provider, social_id), str(user_id), ex=self.ttl)
+        except RedisError as e:
+            app_logger.warning(f"Social account cache unavailable: {e}")
+
+    async def invalidate(self, provider: str, social_id: str) -> None:
+        redis = redis_db.redis
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.key(provider, social_id))
+        except RedisError as e:
+            app_logger.error(f"Failed to invalidate social account cache: {e}")
+
+
+@lru_cache()
+def get_social_account_cache() -> SocialAccountCache:
+    return SocialAccountCache(ttl=settings.SOCIAL_ACCOUNT_CACHE_TTL)
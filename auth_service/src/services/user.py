@@ -1,28 +1,71 @@
-from functools import lru_cache
+import secrets
+from datetime import date
 from http import HTTPStatus
 from opentelemetry import trace
 from uuid import UUID
 from fastapi import Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.tracing import traced
 from src.models.entity import Role, User, UserAuthHistory, UserProfile
-from src.schemas.user import UserRegister, UserUpdateCredentials
-from src.repositories.user_repository import PgUserRepository, UserRepository
-from src.db.postgres import get_session
+from src.schemas.user import (
+    DailyLogins,
+    SocialUserInfo,
+    UserAgentLogins,
+    UserRegister,
+    UserUpdateCredentials,
+)
+from src.repositories.user_repository import (
+    InvalidCursor,
+    PgUserRepository,
+    UserLoadProfile,
+    UserRepository,
+)
+from src.db.postgres import after_commit, get_session
+from src.services.login_history import (
+    LoginHistoryWriter,
+    get_login_history_writer,
+)
+from src.services.password import PasswordHasher, get_password_hasher
+from src.schemas.auth import Principal
+from src.services.principal_cache import PrincipalCache, get_principal_cache
+from src.services.role_cache import RoleCache, get_role_cache
+from src.services.social_account_cache import (
+    SocialAccountCache,
+    get_social_account_cache,
+)
+
+# Роль, которая выдаётся пользователю, созданному через соцсеть.
+SOCIAL_USER_ROLE = "user"
 
 
 class UserService:
-    def __init__(self, session: AsyncSession, user_repo: UserRepository) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_repo: UserRepository,
+        password_hasher: PasswordHasher,
+        history_writer: LoginHistoryWriter,
+        role_cache: RoleCache,
+        principal_cache: PrincipalCache,
+        social_account_cache: SocialAccountCache,
+    ) -> None:
         self.session = session
         self.user_repo = user_repo
+        self.password_hasher = password_hasher
+        self.history_writer = history_writer
+        self.role_cache = role_cache
+        self.principal_cache = principal_cache
+        self.social_account_cache = social_account_cache
 
     @traced("service_create_user")
     async def create_user(self, user_data: UserRegister, role: Role):
+        password_hash = await self.password_hasher.hash(user_data.password)
         try:
             user = User(
                 login=user_data.login,
                 email=user_data.email,
-                password=user_data.password,
+                password=password_hash,
             )
             user_profile = UserProfile(
                 first_name=user_data.first_name,
@@ -33,20 +76,24 @@ class UserService:
             )
             user.user_profile = user_profile
             user.roles.append(role)
-            user = await self.user_repo.create(user=user)
-            await self.session.commit()
-            return user
+            return await self.user_repo.create(user=user)
         except Exception as e:
-            await self.session.rollback()
             raise HTTPException(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Internal server error while create user",
             )
 
-    @traced("service_get_user_by_login")
-    async def get_user_by_login(self, login: str):
+    @traced("service_get_user_by_login", capture=("login",))
+    async def get_user_by_login(
+        self,
+        login: str,
+        profile: UserLoadProfile = UserLoadProfile.CREDENTIALS,
+        primary: bool = False,
+    ):
         try:
-            user = await self.user_repo.get_user_by_login(login=login)
+            user = await self.user_repo.get_user_by_login(
+                login=login, profile=profile, primary=primary
+            )
             return user
         except Exception as e:
             raise HTTPException(
@@ -54,10 +101,12 @@ class UserService:
                 detail="Internal server error while get user",
             )
 
-    @traced("service_get_user")
-    async def get_user(self, user_id: UUID):
+    @traced("service_get_user", capture=("user_id", "profile"))
+    async def get_user(
+        self, user_id: UUID, profile: UserLoadProfile = UserLoadProfile.PRINCIPAL
+    ):
         try:
-            user = await self.user_repo.get(user_id=user_id)
+            user = await self.user_repo.get(user_id=user_id, profile=profile)
             return user
         except Exception as e:
             raise HTTPException(
@@ -65,13 +114,16 @@ class UserService:
                 detail="Internal server error while get user",
             )
 
-    @traced("service_update_user_credentials")
+    @traced("service_update_user_credentials", capture=("user_id",))
     async def update_user_credentials(
         self, user_id: UUID, update_data: UserUpdateCredentials
     ):
+        password_hash = None
+        if update_data.password:
+            password_hash = await self.password_hasher.hash(update_data.password)
         try:
             updated_user = await self.user_repo.update_credentials(
-                user_id=user_id, login=update_data.login, password=update_data.password
+                user_id=user_id, login=update_data.login, password_hash=password_hash
             )
 
             if not updated_user:
@@ -79,7 +131,7 @@ class UserService:
                     status_code=HTTPStatus.NOT_FOUND, detail="Role not found"
                 )
 
-            await self.session.commit()
+            after_commit(self.session, lambda: self.principal_cache.invalidate(user_id))
             return updated_user
         except Exception as e:
             raise HTTPException(
@@ -87,24 +139,187 @@ class UserService:
                 detail="Internal server error while get user",
             )
 
-    @traced("service_login")
-    async def login(self, user_id: UUID, user_agent: str):
+    @traced("service_set_user_active", capture=("user_id", "is_active"))
+    async def set_active(self, user_id: UUID, is_active: bool) -> bool:
         try:
-            user = await self.user_repo.get(user_id=user_id)
-            if user:
-                user_auth = UserAuthHistory(user_agent=user_agent, user_id=user_id)
-                user.auth_histories.append(user_auth)
+            updated = await self.user_repo.set_active(user_id, is_active)
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while update user",
+            )
+        if not updated:
+            return False
 
-                await self.session.commit()
-            return user
+        async def invalidate() -> None:
+            # У неактивного пользователя нет ролей.
+            await self.role_cache.invalidate(user_id)
+            await self.principal_cache.invalidate(user_id)
+
+        after_commit(self.session, invalidate)
+        return True
+
+    async def _load_principal(self, user_id: UUID) -> Principal | None:
+        user = await self.user_repo.get(user_id=user_id, primary=True)
+        if user is None:
+            return None
+        return Principal(
+            id=user.id,
+            login=user.login,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            roles=await self.user_repo.get_role_names(user_id),
+        )
+
+    @traced("service_get_principal", capture=("user_id",))
+    async def get_principal(self, user_id: UUID) -> Principal | None:
+        """Principal из кеша; база читается только при промахе."""
+        try:
+            return await self.principal_cache.get(
+                user_id, loader=lambda: self._load_principal(user_id)
+            )
         except Exception as e:
-            await self.session.rollback()
             raise HTTPException(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Internal server error while get user",
             )
 
-    @traced("service_get_login_history_paginated")
+    @traced("service_cache_principal")
+    async def cache_principal(self, user: User) -> Principal:
+        """Заполняет кеш при логине, чтобы первый запрос с токеном не шёл в базу."""
+        principal = Principal(
+            id=user.id,
+            login=user.login,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            roles=await self.user_repo.get_role_names(user.id),
+        )
+        await self.principal_cache.put(principal)
+        return principal
+
+    @traced("service_resolve_social_user")
+    async def resolve_social_user(self, user_info: SocialUserInfo) -> Principal:
+        """Principal пользователя, вошедшего через соцсеть.
+
+        Обычно это кеш (провайдер, id) -> id пользователя и кеш principal,
+        без запросов в базу. При промахе - поиск по uq_social_provider,
+        а для нового аккаунта - один запрос, который находит пользователя
+        по email или создаёт его с профилем и ролью.
+        """
+        provider, social_id = user_info.provider, user_info.social_id
+
+        user_id = await self.social_account_cache.get(provider, social_id)
+        cached = user_id is not None
+        if not cached:
+            try:
+                user_id = await self.user_repo.get_user_id_by_social(provider, social_id)
+            except Exception as e:
+                raise HTTPException(
+                    status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                    detail="Internal server error while get user",
+                )
+        if user_id is not None:
+            principal = await self.get_principal(user_id)
+            if principal is not None:
+                if not cached:
+                    await self.social_account_cache.put(provider, social_id, user_id)
+                return principal
+            # Пользователь удалён, а соответствие осталось в кеше.
+            if cached:
+                await self.social_account_cache.invalidate(provider, social_id)
+
+        if not user_info.email:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Social account has no email",
+            )
+        # Пароль не известен никому: войти можно только через соцсеть.
+        password_hash = await self.password_hasher.hash(secrets.token_urlsafe(32))
+        try:
+            # Точка сохранения: после конфликта транзакция запроса остаётся
+            # живой и в ней можно искать аккаунт, созданный параллельно.
+            async with self.session.begin_nested():
+                row = await self.user_repo.create_social_user(
+                    provider=provider,
+                    social_id=social_id,
+                    email=user_info.email,
+                    password_hash=password_hash,
+                    first_name=user_info.first_name,
+                    last_name=user_info.last_name,
+                    role_name=SOCIAL_USER_ROLE,
+                )
+        except IntegrityError:
+            # Логин занят другим пользователем или тот же аккаунт параллельно
+            # создал другой запрос.
+            user_id = await self.user_repo.get_user_id_by_social(provider, social_id)
+            principal = await self.get_principal(user_id) if user_id else None
+            if principal is None:
+                raise HTTPException(
+                    status_code=HTTPStatus.CONFLICT, detail="User already created"
+                )
+            await self.social_account_cache.put(provider, social_id, user_id)
+            return principal
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while create user",
+            )
+
+        principal = Principal(
+            id=row.id,
+            login=row.login,
+            is_active=row.is_active,
+            is_superuser=row.is_superuser,
+            roles=list(row.roles) if row.is_active else [],
+        )
+
+        async def cache() -> None:
+            # Только после коммита: иначе при откате в кеше остался бы
+            # пользователь, которого нет в базе.
+            await self.principal_cache.put(principal)
+            await self.social_account_cache.put(provider, social_id, principal.id)
+
+        after_commit(self.session, cache)
+        return principal
+
+    @traced("service_authenticate", capture=("login",))
+    async def authenticate(self, login: str, password: str) -> User | None:
+        """Пользователь с таким логином и паролем или None.
+
+        Если хеш посчитан с устаревшими параметрами, пароль перехешируется
+        текущим методом, пока он известен в открытом виде.
+        """
+        user = await self.get_user_by_login(login)
+        if user is None:
+            # Пользователь мог только что зарегистрироваться, а реплика
+            # ещё не получила запись.
+            user = await self.get_user_by_login(login, primary=True)
+        if not user or not await self.password_hasher.verify(user.password, password):
+            return None
+
+        if self.password_hasher.needs_rehash(user.password):
+            user.password = await self.password_hasher.hash(password)
+            try:
+                async with self.session.begin_nested():
+                    await self.user_repo.update_password_hash(user.id, user.password)
+            except Exception:
+                # Вход не должен падать из-за того, что не удалось обновить хеш.
+                pass
+        return user
+
+    @traced("service_login", capture=("user_id",))
+    async def login(self, user_id: UUID, user_agent: str):
+        try:
+            # Запись в users_auth_history делает фоновый потребитель пачками,
+            # запрос только ставит событие в очередь.
+            await self.history_writer.record(user_id=user_id, user_agent=user_agent)
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while get user",
+            )
+
+    @traced("service_get_login_history_paginated", capture=("user_id", "page", "size"))
     async def get_login_history_paginated(
         self, user_id: UUID, page: int, size: int
     ) -> list[UserAuthHistory]:
@@ -120,16 +335,74 @@ class UserService:
                 user_id=user_id, page=page, size=size
             )
         except Exception as e:
-            await self.session.rollback()
             raise HTTPException(
                 status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Internal server error while get user",
             )
 
+    @traced("service_get_login_history_by_cursor", capture=("user_id", "size"))
+    async def get_login_history_by_cursor(
+        self, user_id: UUID, cursor: str | None, size: int
+    ):
+        try:
+            return await self.user_repo.get_login_history_by_cursor(
+                user_id=user_id, cursor=cursor, size=size
+            )
+        except InvalidCursor:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while get user",
+            )
+
+    @traced("service_get_login_stats", capture=("user_id",))
+    async def get_login_stats(
+        self, date_from: date, date_to: date, user_id: UUID | None = None
+    ) -> list[DailyLogins]:
+        try:
+            rows = await self.user_repo.get_daily_logins(
+                date_from=date_from, date_to=date_to, user_id=user_id
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while get login stats",
+            )
+        return [DailyLogins(day=row.day, logins=row.logins) for row in rows]
+
+    @traced("service_get_user_agent_stats")
+    async def get_user_agent_stats(
+        self, date_from: date, date_to: date
+    ) -> list[UserAgentLogins]:
+        try:
+            rows = await self.user_repo.get_user_agent_logins(
+                date_from=date_from, date_to=date_to
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Internal server error while get login stats",
+            )
+        return [
+            UserAgentLogins(day=row.day, agent_family=row.agent_family, logins=row.logins)
+            for row in rows
+        ]
+
 
-@lru_cache()
 def get_user_service(
-    session: AsyncSession = Depends(get_session),
+    # scope="function": транзакция завершается до отправки ответа.
+    session: AsyncSession = Depends(get_session, scope="function"),
 ) -> UserService:
     user_repo = PgUserRepository(session=session)
-    return UserService(session=session, user_repo=user_repo)
+    return UserService(
+        session=session,
+        user_repo=user_repo,
+        password_hasher=get_password_hasher(),
+        history_writer=get_login_history_writer(),
+        role_cache=get_role_cache(),
+        principal_cache=get_principal_cache(),
+        social_account_cache=get_social_account_cache(),
+    )
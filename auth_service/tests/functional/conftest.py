@@ -15,6 +15,7 @@ from src.core.config import settings
 settings.TRACING_ENABLED = False
 # --- End Pre-import Configuration ---
 
+from src.db.partitions import create_partitions
 from src.db.postgres import Base, get_session
 from src.main import app
 from src.models import entity, social_account  # Import all models
@@ -46,6 +47,7 @@ async def test_engine():
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.drop_all)
                 await conn.run_sync(Base.metadata.create_all)
+                await create_partitions(conn, ahead=1)
             yield engine
             await engine.dispose()
             return
@@ -103,10 +105,7 @@ def fake_role_service():
 
 
 @pytest_asyncio.fixture(autouse=True)
-async def clear_cached_services():
-    get_user_service.cache_clear()
-    get_auth_service.cache_clear()
-    get_role_service.cache_clear()
+async def clear_dependency_overrides():
     yield
     app.dependency_overrides = {}
 
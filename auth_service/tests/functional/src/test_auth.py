@@ -15,8 +15,7 @@ async def test_login(client: AsyncClient, fake_auth_service: AsyncMock, fake_use
 
     # Настраиваем моки
     mock_user = User(login="user3", password="pass3", email="user3@example.com")
-    mock_user.check_password = lambda x: True  # Мокаем проверку пароля
-    fake_user_service.get_user_by_login.return_value = mock_user
+    fake_user_service.authenticate.return_value = mock_user
     fake_auth_service.create_access_token.return_value = "access123"
     fake_auth_service.create_refresh_token.return_value = "refresh123"
 
@@ -27,6 +26,18 @@ async def test_login(client: AsyncClient, fake_auth_service: AsyncMock, fake_use
 
     assert data["access_token"] == "access123"
     assert data["refresh_token"] == "refresh123"
+    fake_user_service.authenticate.assert_awaited_once_with("user3", "pass3")
+
+
+@pytest.mark.asyncio
+async def test_login_wrong_credentials(client: AsyncClient, fake_user_service: AsyncMock):
+    fake_user_service.authenticate.return_value = None
+
+    response = await client.post(
+        "/auth/api/v1/auth/login", json={"login": "user3", "password": "wrong"}
+    )
+
+    assert response.status_code == 401
 
 
 @pytest.mark.asyncio
@@ -51,6 +62,19 @@ async def test_logout_success(client: AsyncClient, fake_auth_service: AsyncMock,
     fake_auth_service.logout.assert_awaited_once()
 
 
+@pytest.mark.asyncio
+async def test_logout_all(client: AsyncClient, fake_auth_service: AsyncMock):
+    user = User(id=uuid.uuid4(), login="user", password="pw", email="e@e.com")
+    fake_auth_service.get_user_from_token.return_value = user
+
+    response = await client.post(
+        "/auth/api/v1/auth/logout/all", headers={"Authorization": "Bearer access123"}
+    )
+
+    assert response.status_code == 204
+    fake_auth_service.logout_all.assert_awaited_once_with(user_id=user.id)
+
+
 # ==========================================================
 # TEST: POST /refresh
 # ==========================================================
@@ -0,0 +1,119 @@
+import io
+import uuid
+from uuid import UUID
+
+import pytest
+from typer.testing import CliRunner
+
+from src.db.bulk_users import (
+    COLUMNS,
+    ImportStats,
+    InvalidRecord,
+    batches,
+    detect_format,
+    import_batch,
+    parse_record,
+    read_records,
+)
+from src.db.pg_users_cli import app
+
+HASH = "pbkdf2:sha256:600000$salt$hash"
+
+
+def test_parse_record_fills_all_columns():
+    record = parse_record(
+        {
+            "id": "7b0c2f3e-54d7-4b83-9d6a-1f6c4a8b2e10",
+            "login": " alice ",
+            "email": "alice@example.com",
+            "password": HASH,
+            "is_active": "false",
+            "created_at": "2024-01-02T03:04:05+00:00",
+            "city": "",
+            "roles": "editor, admin,editor",
+        }
+    )
+
+    data = dict(zip(COLUMNS, record))
+    assert len(record) == len(COLUMNS)
+    assert data["id"] == UUID("7b0c2f3e-54d7-4b83-9d6a-1f6c4a8b2e10")
+    assert data["login"] == "alice"
+    assert data["is_active"] is False
+    assert data["is_superuser"] is None
+    assert data["created_at"].tzinfo is None
+    assert data["city"] is None
+    assert data["roles"] == ["admin", "editor"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"login": "bob", "email": "bob@example.com"},
+        {"login": "bob", "email": "bob@example.com", "password": "plain-text"},
+        {"login": "bob", "email": "bob@example.com", "password": HASH, "is_active": "maybe"},
+        {"login": "bob", "email": "bob@example.com", "password": HASH, "id": "not-a-uuid"},
+    ],
+)
+def test_parse_record_rejects_invalid(data):
+    with pytest.raises(InvalidRecord):
+        parse_record(data)
+
+
+def test_batches_split_and_count_invalid():
+    records = [
+        {"login": f"user{i}", "email": f"user{i}@example.com", "password": HASH}
+        for i in range(5)
+    ]
+    records.insert(2, {"login": "broken"})
+    stats = ImportStats()
+
+    result = list(batches(records, 2, stats))
+
+    assert [len(batch) for batch in result] == [2, 2, 1]
+    assert stats.read == 6
+    assert stats.invalid == 1
+    assert stats.errors == ["record 3: login, email and password are required"]
+
+
+def test_read_records_formats():
+    csv_data = io.StringIO("login,email,password,roles\nalice,a@example.com,x,\"a,b\"\n")
+    ndjson_data = io.StringIO('{"login": "bob", "roles": ["a"]}\n\n')
+
+    assert list(read_records(csv_data, "csv"))[0]["roles"] == "a,b"
+    assert list(read_records(ndjson_data, "ndjson")) == [{"login": "bob", "roles": ["a"]}]
+    assert detect_format("users.jsonl") == "ndjson"
+    assert detect_format("-") == "csv"
+
+
+@pytest.mark.asyncio
+async def test_reimport_keeps_flags_missing_in_file(test_engine):
+    """Пустые is_active/is_superuser при повторном импорте не меняют пользователя."""
+    login = f"bulk_{uuid.uuid4().hex[:8]}"
+    first = {"login": login, "email": f"{login}@example.com", "password": HASH}
+    stats = ImportStats()
+
+    async with test_engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        await import_batch(
+            raw,
+            [parse_record({**first, "is_active": "false", "is_superuser": "true"})],
+            create_roles=False,
+            stats=stats,
+        )
+        updated = await import_batch(raw, [parse_record(first)], False, stats)
+        row = await raw.fetchrow(
+            "SELECT id, is_active, is_superuser FROM users WHERE login = $1", login
+        )
+        await raw.execute("DELETE FROM users WHERE login = $1", login)
+
+    assert (stats.inserted, stats.updated) == (1, 1)
+    assert updated == [row["id"]]
+    assert row["is_active"] is False
+    assert row["is_superuser"] is True
+
+
+def test_cli_lists_commands():
+    result = CliRunner().invoke(app, ["--help"])
+
+    assert result.exit_code == 0
+    assert "import" in result.output and "export" in result.output
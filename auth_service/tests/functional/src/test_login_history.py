@@ -0,0 +1,200 @@
+import uuid
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.core.user_agent import USER_AGENT_MAX_LENGTH, user_agent_family
+from src.db import redis as redis_db
+from src.repositories.user_repository import login_rollups
+from src.services import login_history
+from src.services.login_history import (
+    LoginHistoryWriteError,
+    LoginHistoryWriter,
+    make_event,
+    parse_event,
+)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = AsyncMock()
+    monkeypatch.setattr(redis_db, "redis", redis)
+    return redis
+
+
+@pytest.fixture
+def fake_pipeline(fake_redis):
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    fake_redis.pipeline = MagicMock(return_value=pipe)
+    return pipe
+
+
+@pytest.fixture
+def fake_write_events(monkeypatch):
+    write_events = AsyncMock()
+    monkeypatch.setattr(login_history, "write_events", write_events)
+    return write_events
+
+
+@pytest.mark.asyncio
+async def test_record_pushes_event_to_stream(fake_redis, fake_write_events):
+    user_id = uuid.uuid4()
+
+    await LoginHistoryWriter().record(user_id=user_id, user_agent="pytest")
+
+    fake_redis.xadd.assert_awaited_once()
+    event = fake_redis.xadd.await_args.args[1]
+    assert event["user_id"] == str(user_id)
+    assert event["user_agent"] == "pytest"
+    fake_write_events.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_record_falls_back_to_database(fake_redis, fake_write_events):
+    fake_redis.xadd.side_effect = RedisConnectionError
+
+    await LoginHistoryWriter().record(user_id=uuid.uuid4(), user_agent="pytest")
+
+    fake_write_events.assert_awaited_once()
+    assert len(fake_write_events.await_args.args[0]) == 1
+
+
+def test_long_user_agent_is_clipped():
+    long_agent = "Mozilla/5.0 " + "x" * 10_000
+
+    event = make_event(uuid.uuid4(), long_agent)
+
+    assert len(event["user_agent"]) == USER_AGENT_MAX_LENGTH
+    # События, попавшие в stream до ограничения, обрезаются при чтении.
+    stale = {**event, "user_agent": long_agent}
+    assert len(parse_event(stale)["user_agent"]) == USER_AGENT_MAX_LENGTH
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_batch_and_acks(fake_redis, fake_write_events):
+    messages = [
+        ("1-0", make_event(uuid.uuid4(), "a")),
+        ("2-0", make_event(uuid.uuid4(), "b")),
+        ("3-0", {"broken": "event"}),
+    ]
+    writer = LoginHistoryWriter()
+
+    await writer._flush(messages)
+
+    # Битое событие отбрасывается, но подтверждается вместе с остальными.
+    assert len(fake_write_events.await_args.args[0]) == 2
+    fake_redis.xack.assert_awaited_once_with(
+        writer.stream, writer.group, "1-0", "2-0", "3-0"
+    )
+
+
+def fail_on(*agents):
+    async def write_events(events):
+        if any(event["user_agent"] in agents for event in events):
+            raise ValueError("bad row")
+
+    return write_events
+
+
+@pytest.mark.asyncio
+async def test_flush_moves_failing_event_to_dead_letters(
+    fake_redis, fake_pipeline, fake_write_events
+):
+    fake_write_events.side_effect = fail_on("bad")
+    messages = [
+        ("1-0", make_event(uuid.uuid4(), "a")),
+        ("2-0", make_event(uuid.uuid4(), "bad")),
+        ("3-0", make_event(uuid.uuid4(), "b")),
+    ]
+    writer = LoginHistoryWriter()
+
+    await writer._flush(messages)
+
+    # Пачка, затем три события по одному.
+    assert fake_write_events.await_count == 4
+    fake_pipeline.xadd.assert_called_once()
+    stream, fields = fake_pipeline.xadd.call_args.args
+    assert stream == writer.dead_letter_stream
+    assert fields["source_id"] == "2-0"
+    assert fields["error"] == "bad row"
+    fake_redis.xack.assert_awaited_once_with(
+        writer.stream, writer.group, "1-0", "2-0", "3-0"
+    )
+
+
+@pytest.mark.asyncio
+async def test_flush_keeps_batch_pending_until_max_deliveries(
+    fake_redis, fake_pipeline, fake_write_events
+):
+    fake_write_events.side_effect = fail_on("bad")
+    messages = [("1-0", make_event(uuid.uuid4(), "bad"))]
+    writer = LoginHistoryWriter(max_deliveries=3)
+
+    fake_pipeline.execute.return_value = [[{"message_id": "1-0", "times_delivered": 2}]]
+    with pytest.raises(LoginHistoryWriteError):
+        await writer._flush(messages)
+    fake_pipeline.xadd.assert_not_called()
+    fake_redis.xack.assert_not_awaited()
+
+    fake_pipeline.execute.return_value = [[{"message_id": "1-0", "times_delivered": 3}]]
+    await writer._flush(messages)
+    fake_pipeline.xadd.assert_called_once()
+    fake_redis.xack.assert_awaited_once_with(writer.stream, writer.group, "1-0")
+
+
+@pytest.mark.asyncio
+async def test_flush_does_not_split_batch_when_database_is_down(
+    fake_redis, fake_pipeline, fake_write_events
+):
+    fake_write_events.side_effect = ConnectionRefusedError
+    messages = [
+        ("1-0", make_event(uuid.uuid4(), "a")),
+        ("2-0", make_event(uuid.uuid4(), "b")),
+    ]
+
+    with pytest.raises(ConnectionRefusedError):
+        await LoginHistoryWriter()._flush(messages)
+
+    fake_write_events.assert_awaited_once()
+    fake_redis.xack.assert_not_awaited()
+
+
+def test_login_rollups_count_per_day_and_agent_family():
+    alice, bob = sorted([uuid.uuid4(), uuid.uuid4()])
+    chrome = "Mozilla/5.0 AppleWebKit/537.36 Chrome/129.0 Safari/537.36"
+    rows = [
+        SimpleNamespace(user_id=alice, auth_date=datetime(2026, 10, 1, 9), user_agent=chrome),
+        SimpleNamespace(user_id=alice, auth_date=datetime(2026, 10, 1, 23), user_agent=""),
+        SimpleNamespace(user_id=bob, auth_date=datetime(2026, 10, 2, 0), user_agent="curl/8.0"),
+    ]
+
+    per_user, per_agent = login_rollups(rows)
+
+    assert per_user == [
+        {"user_id": alice, "day": date(2026, 10, 1), "logins": 2},
+        {"user_id": bob, "day": date(2026, 10, 2), "logins": 1},
+    ]
+    assert per_agent == [
+        {"day": date(2026, 10, 1), "agent_family": "Chrome", "logins": 1},
+        {"day": date(2026, 10, 1), "agent_family": "Unknown", "logins": 1},
+        {"day": date(2026, 10, 2), "agent_family": "curl", "logins": 1},
+    ]
+
+
+@pytest.mark.parametrize(
+    "user_agent, family",
+    [
+        ("Mozilla/5.0 Chrome/129.0 Safari/537.36 Edg/129.0", "Edge"),
+        ("Mozilla/5.0 Gecko/20100101 Firefox/131.0", "Firefox"),
+        ("Mozilla/5.0 Version/17.0 Mobile/15E148 Safari/604.1", "Safari"),
+        ("python-httpx/0.27", "Python"),
+        ("something else", "Other"),
+        (None, "Unknown"),
+    ],
+)
+def test_user_agent_family(user_agent, family):
+    assert user_agent_family(user_agent) == family
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from src.core.limiter import Rate, RateLimiter, RateLimitExceeded
+from src.core.metrics import MetricsMiddleware, flush_counters
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    router = APIRouter()
+
+    @router.get("/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.include_router(router, prefix="/api/v1/items")
+    app.add_middleware(MetricsMiddleware)
+    name = "auth_http_request_duration_seconds_count"
+    route = {"method": "GET", "route": "/api/v1/items/{item_id}", "status": "200"}
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    before, before_unmatched = sample(name, **route), sample(name, **unmatched)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/api/v1/items/1")
+        await client.get("/api/v1/items/2")
+        await client.get("/no/such/path")
+
+    assert sample(name, **route) - before == 2
+    assert sample(name, **unmatched) - before_unmatched == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_rejection_is_counted(monkeypatch):
+    limiter = RateLimiter()
+
+    async def hit(key, rate, consume=True):
+        return 1.5
+
+    monkeypatch.setattr(limiter, "hit", hit)
+    name = "auth_rate_limit_rejections_total"
+    before = sample(name, limit="login:user")
+
+    with pytest.raises(RateLimitExceeded):
+        await limiter.check("login:user:alice", Rate.parse("5/minute"), "login:user")
+
+    # Счётчик буферизован и до сброса в Prometheus не виден.
+    assert sample(name, limit="login:user") == before
+    flush_counters()
+    assert sample(name, limit="login:user") - before == 1
+
+
+def test_metrics_are_collected_across_processes(tmp_path):
+    """Счётчики двух процессов складываются в одном ответе /metrics."""
+    env = {
+        **os.environ,
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path),
+        "PYTHONPATH": f"{ROOT}{os.pathsep}{ROOT / 'src'}",
+    }
+    worker = (
+        "from src.core.metrics import ACCESS_TOKENS_ISSUED, flush_counters; "
+        "ACCESS_TOKENS_ISSUED.inc(); flush_counters()"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from src.core.metrics import render_metrics; "
+            "print(render_metrics()[0].decode())",
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert 'auth_tokens_issued_total{type="access"} 2.0' in output
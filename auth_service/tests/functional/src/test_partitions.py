@@ -0,0 +1,38 @@
+from datetime import date
+
+from typer.testing import CliRunner
+
+from src.core.config import settings
+from src.db.partitions import (
+    add_months,
+    create_partition_sql,
+    partition_name,
+    retention_start,
+)
+from src.db.pg_partitions_cli import app
+
+
+def test_add_months_crosses_year_boundary():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_create_partition_sql_covers_one_month():
+    sql = create_partition_sql(date(2026, 12, 15))
+
+    assert partition_name(date(2026, 12, 1)) == "users_auth_history_p2026_12"
+    assert "users_auth_history_p2026_12" in sql
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in sql
+
+
+def test_retention_start_keeps_current_month(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_HISTORY_RETENTION_MONTHS", 3)
+
+    assert retention_start(date(2026, 10, 19)) == date(2026, 8, 1)
+
+
+def test_cli_lists_commands():
+    result = CliRunner().invoke(app, ["--help"])
+
+    assert result.exit_code == 0
+    assert "maintain" in result.output
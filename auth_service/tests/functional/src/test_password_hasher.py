@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from src.services.password import PasswordHasher, PasswordHasherBusy, normalize_method
+
+# Дешёвые параметры, чтобы тесты не тратили время на KDF.
+FAST_METHOD = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(method=FAST_METHOD, workers=2, max_pending=2)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(hasher: PasswordHasher):
+    password_hash = await hasher.hash("secret")
+
+    assert password_hash.startswith(FAST_METHOD + "$")
+    assert await hasher.verify(password_hash, "secret")
+    assert not await hasher.verify(password_hash, "wrong")
+
+
+def test_needs_rehash(hasher: PasswordHasher):
+    assert not hasher.needs_rehash(generate_password_hash("secret", FAST_METHOD))
+    assert hasher.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:2000"))
+    assert hasher.needs_rehash(generate_password_hash("secret"))
+
+
+def test_needs_rehash_normalizes_default_parameters():
+    hasher = PasswordHasher(method="scrypt", workers=1, max_pending=1)
+
+    assert not hasher.needs_rehash("scrypt:32768:8:1$salt$hash")
+    assert hasher.needs_rehash("scrypt:16384:8:1$salt$hash")
+    assert normalize_method("pbkdf2:sha256") == normalize_method("pbkdf2")
+    assert hasher.needs_rehash("plain-text")
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(method="scrypt:32768:8:1", workers=1, max_pending=1)
+    try:
+        first = asyncio.ensure_future(hasher.hash("secret"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.hash("secret")
+
+        await first
+        # После освобождения очереди запросы снова принимаются.
+        assert await hasher.hash("secret")
+    finally:
+        hasher.shutdown()
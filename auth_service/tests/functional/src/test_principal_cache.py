@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from src.core.config import settings
+from src.db import redis as redis_db
+from src.schemas.auth import Principal
+from src.services.auth import AuthService
+from src.services.principal_cache import PrincipalCache
+
+
+def make_principal(**kwargs) -> Principal:
+    data = {
+        "id": uuid.uuid4(),
+        "login": "user",
+        "is_active": True,
+        "is_superuser": False,
+        "roles": ["user"],
+    }
+    data.update(kwargs)
+    return Principal(**data)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = AsyncMock()
+    redis.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+    monkeypatch.setattr(redis_db, "redis", redis)
+    return redis
+
+
+@pytest.fixture
+def principal_cache():
+    return PrincipalCache(ttl=60, local_ttl=60, local_size=100)
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_skips_database(fake_redis, principal_cache: PrincipalCache):
+    principal = make_principal()
+    fake_redis.mget.return_value = [principal.model_dump_json(), None]
+    loader = AsyncMock()
+
+    assert await principal_cache.get(principal.id, loader) == principal
+    loader.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_miss_loads_and_stores(fake_redis, principal_cache: PrincipalCache):
+    principal = make_principal()
+    fake_redis.mget.return_value = [None, "3"]
+    loader = AsyncMock(return_value=principal)
+
+    assert await principal_cache.get(principal.id, loader) == principal
+    assert await principal_cache.get(principal.id, loader) == principal
+
+    loader.assert_awaited_once()
+    store = fake_redis.register_script.return_value.await_args.kwargs
+    assert store["keys"] == [
+        principal_cache.key(principal.id),
+        principal_cache.generation_key(principal.id),
+    ]
+    assert store["args"][0] == "3"
+
+
+@pytest.mark.asyncio
+async def test_inactive_principal_is_rejected():
+    principal = make_principal(is_active=False)
+    token = jwt.encode(
+        {"sub": str(principal.id), "exp": datetime.now(timezone.utc) + timedelta(minutes=1)},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    user_service = AsyncMock()
+    user_service.get_principal.return_value = principal
+
+    revocation = AsyncMock()
+    revocation.is_revoked.return_value = False
+
+    with pytest.raises(HTTPException) as error:
+        await AuthService(
+            auth_repo=AsyncMock(), revocation=revocation
+        ).get_user_from_token(token, user_service)
+
+    assert error.value.status_code == 401
+    user_service.get_principal.assert_awaited_once_with(principal.id)
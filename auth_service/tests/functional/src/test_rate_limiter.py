@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+from starlette.requests import Request
+
+from src.core import limiter as limiter_module
+from src.core.limiter import Rate, RateLimiter, RateLimitExceeded, client_ip
+from src.db import redis as redis_db
+
+
+@pytest.fixture
+def fake_script(monkeypatch):
+    script = AsyncMock(return_value=0)
+    redis = MagicMock()
+    redis.register_script.return_value = script
+    monkeypatch.setattr(redis_db, "redis", redis)
+    return script
+
+
+def test_rate_parse():
+    rate = Rate.parse("10/minute")
+
+    assert rate == Rate(count=10, period=60)
+    assert rate.interval_ms == 6000
+
+
+@pytest.mark.asyncio
+async def test_allowed_request_is_one_script_call(fake_script):
+    await RateLimiter().check("login:ip:127.0.0.1", Rate.parse("10/minute"))
+
+    fake_script.assert_awaited_once_with(
+        keys=["rate_limit:login:ip:127.0.0.1"], args=[6000, 10]
+    )
+
+
+@pytest.mark.asyncio
+async def test_check_without_consume_only_peeks(fake_script):
+    await RateLimiter().check("key", Rate.parse("10/minute"), consume=False)
+
+    fake_script.assert_awaited_once_with(keys=["rate_limit:key"], args=[6000, 10, 1])
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_reports_retry_after(fake_script):
+    fake_script.return_value = 1500
+
+    with pytest.raises(RateLimitExceeded) as error:
+        await RateLimiter().check("key", Rate.parse("10/minute"))
+
+    assert error.value.retry_after == 1.5
+
+
+@pytest.mark.asyncio
+async def test_fails_open_without_redis(fake_script):
+    fake_script.side_effect = RedisConnectionError
+
+    assert await RateLimiter().hit("key", Rate.parse("1/minute")) == 0
+
+
+@pytest.mark.asyncio
+async def test_login_returns_429_with_retry_after(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(limiter_module.limiter, "hit", AsyncMock(return_value=2.2))
+
+    response = await client.post(
+        "/auth/api/v1/auth/login", json={"login": "user", "password": "pw"}
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+
+def make_request(peer: str, **headers) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "client": (peer, 40000),
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "peer, headers, expected",
+    [
+        # Заголовкам от клиента напрямую не верим.
+        ("203.0.113.7", {"x_real_ip": "1.2.3.4"}, "203.0.113.7"),
+        ("172.18.0.5", {"x_real_ip": "198.51.100.1"}, "198.51.100.1"),
+        ("172.18.0.5", {"x_forwarded_for": "1.2.3.4, 198.51.100.1, 10.0.0.2"}, "198.51.100.1"),
+        ("172.18.0.5", {}, "172.18.0.5"),
+    ],
+)
+def test_client_ip(peer, headers, expected):
+    assert client_ip(make_request(peer, **headers)) == expected
@@ -0,0 +1,153 @@
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from redis.exceptions import RedisError
+from sqlalchemy import insert, select
+
+from src.db import postgres
+from src.db import redis as redis_db
+from src.models.entity import Role
+from src.services.user import UserService
+
+PRIMARY, REPLICA = object(), object()
+
+
+class FakeRoutingSession(postgres.RoutingSession):
+    primary = PRIMARY
+    replicas = [REPLICA]
+
+
+async def bind_in_read_only(session, clause, **kwargs):
+    @postgres.read_only
+    async def read():
+        return session.get_bind(clause=clause)
+
+    return await read(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_read_only_select_goes_to_replica():
+    session = FakeRoutingSession()
+
+    assert await bind_in_read_only(session, select(Role)) is REPLICA
+    assert session.get_bind(clause=select(Role)) is PRIMARY
+
+
+@pytest.mark.asyncio
+async def test_read_only_method_can_be_called_on_primary():
+    session = FakeRoutingSession()
+
+    assert await bind_in_read_only(session, select(Role), primary=True) is PRIMARY
+
+
+@pytest.mark.asyncio
+async def test_writes_go_to_primary_and_make_session_sticky():
+    session = FakeRoutingSession()
+
+    assert await bind_in_read_only(session, insert(Role)) is PRIMARY
+    assert await bind_in_read_only(session, select(Role)) is PRIMARY
+
+
+@pytest.mark.asyncio
+async def test_without_replicas_everything_goes_to_primary():
+    class PrimaryOnlySession(postgres.RoutingSession):
+        primary = PRIMARY
+        replicas = []
+
+    assert await bind_in_read_only(PrimaryOnlySession(), select(Role)) is PRIMARY
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (value, ex)
+
+
+@pytest.fixture
+def recent_writes(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_db, "redis", redis)
+    monkeypatch.setattr(postgres, "replica_engines", [REPLICA])
+    monkeypatch.setattr(postgres.settings, "POSTGRES_READ_YOUR_WRITES_SECONDS", 5)
+    return redis
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    session = AsyncMock(info={})
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+    monkeypatch.setattr(postgres, "async_session", session_factory)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_reads_after_own_write_go_to_primary(recent_writes, fake_session):
+    """Следующий запрос того же пользователя не читает отстающую реплику."""
+    author, other = uuid.uuid4(), uuid.uuid4()
+
+    async with postgres.unit_of_work() as session:
+        await postgres.bind_actor(session, author)
+        session.info["wrote"] = True
+
+    fake_session.commit.assert_awaited_once()
+    assert recent_writes.data[postgres.RECENT_WRITE_KEY.format(author)] == (1, 5)
+
+    session = FakeRoutingSession()
+    await postgres.bind_actor(session, author)
+    assert await bind_in_read_only(session, select(Role)) is PRIMARY
+
+    session = FakeRoutingSession()
+    await postgres.bind_actor(session, other)
+    assert await bind_in_read_only(session, select(Role)) is REPLICA
+
+
+@pytest.mark.asyncio
+async def test_reads_without_writes_stay_on_replica(recent_writes, fake_session):
+    async with postgres.unit_of_work() as session:
+        await postgres.bind_actor(session, uuid.uuid4())
+
+    assert recent_writes.data == {}
+
+
+@pytest.mark.asyncio
+async def test_unknown_recent_writes_read_from_primary(recent_writes):
+    """Redis недоступен: неизвестно, писал ли пользователь, читаем основную базу."""
+    recent_writes.exists = AsyncMock(side_effect=RedisError("down"))
+    session = FakeRoutingSession()
+
+    await postgres.bind_actor(session, uuid.uuid4())
+
+    assert await bind_in_read_only(session, select(Role)) is PRIMARY
+
+
+@pytest.mark.asyncio
+async def test_login_rereads_missing_user_from_primary():
+    """Только что зарегистрированного пользователя реплика может ещё не знать."""
+    user = SimpleNamespace(id=uuid.uuid4(), password="hash")
+    user_repo = AsyncMock()
+    user_repo.get_user_by_login.side_effect = [None, user]
+    password_hasher = MagicMock(verify=AsyncMock(return_value=True))
+    password_hasher.needs_rehash.return_value = False
+    service = UserService(
+        session=AsyncMock(),
+        user_repo=user_repo,
+        password_hasher=password_hasher,
+        history_writer=AsyncMock(),
+        role_cache=AsyncMock(),
+        principal_cache=AsyncMock(),
+        social_account_cache=AsyncMock(),
+    )
+
+    assert await service.authenticate("new_user", "secret") is user
+    assert [call.kwargs["primary"] for call in user_repo.get_user_by_login.await_args_list] == [
+        False,
+        True,
+    ]
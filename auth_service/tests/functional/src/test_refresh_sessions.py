@@ -0,0 +1,200 @@
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from src.core.config import settings
+from src.repositories.auth_repository import (
+    CREATE_SCRIPT,
+    ROTATE_SCRIPT,
+    RedisAuthRepository,
+)
+from src.schemas.auth import Principal
+from src.services.auth import AuthService
+from src.services.principal_cache import PrincipalCache
+
+
+def make_principal() -> Principal:
+    return Principal(
+        id=uuid.uuid4(),
+        login="user",
+        is_active=True,
+        is_superuser=False,
+        roles=["user", "subscriber"],
+    )
+
+
+def decode(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+@pytest.fixture
+def fake_redis():
+    redis = AsyncMock()
+    redis.scripts = {}
+    redis.register_script = MagicMock(
+        side_effect=lambda text: redis.scripts.setdefault(text, AsyncMock(return_value=1))
+    )
+    return redis
+
+
+@pytest.fixture
+def auth_service(fake_redis):
+    revocation = AsyncMock()
+    revocation.is_revoked.return_value = False
+    return AuthService(
+        auth_repo=RedisAuthRepository(fake_redis, ttl=3600), revocation=revocation
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_opens_session(auth_service, fake_redis):
+    principal = make_principal()
+
+    token = await auth_service.create_refresh_token(principal, "device-1")
+
+    claims = decode(token)
+    assert claims["type"] == "refresh"
+    assert claims["sid"] == "device-1"
+    call = fake_redis.scripts[CREATE_SCRIPT].await_args.kwargs
+    assert call["keys"] == [f"refresh_sessions:{principal.id}"]
+    assert call["args"][0] == "device-1"
+    assert claims["jti"] in call["args"][1]
+    fake_redis.eval.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_without_database(auth_service, fake_redis):
+    principal = make_principal()
+    token = await auth_service.create_refresh_token(principal, "device-1")
+    rotate = fake_redis.scripts[ROTATE_SCRIPT]
+    rotate.return_value = ["ok", "renamed", "user,admin"]
+
+    user_service = AsyncMock()
+
+    tokens = await auth_service.refresh(token, user_service)
+
+    user_service.get_principal.assert_not_awaited()
+    call = rotate.await_args.kwargs
+    assert call["keys"][1] == PrincipalCache.key(principal.id)
+    args = call["args"]
+    assert args[1] == decode(token)["jti"]
+    access = decode(tokens["access_token"])
+    refresh = decode(tokens["refresh_token"])
+    assert access["login"] == "renamed"
+    assert access["roles"] == "user,admin"
+    assert access["sid"] == refresh["sid"] == "device-1"
+    assert refresh["jti"] == args[2]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("result", ["missing", "reused", "expired", "inactive"])
+async def test_refresh_rejected(auth_service, fake_redis, result):
+    token = await auth_service.create_refresh_token(make_principal(), "device-1")
+    fake_redis.scripts[ROTATE_SCRIPT].return_value = [result]
+
+    with pytest.raises(HTTPException) as error:
+        await auth_service.refresh(token, AsyncMock())
+
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_loads_principal_on_cache_miss(auth_service, fake_redis):
+    principal = make_principal()
+    token = await auth_service.create_refresh_token(principal, "device-1")
+    rotate = fake_redis.scripts[ROTATE_SCRIPT]
+    rotate.side_effect = [["uncached"], ["ok", "user", "user,subscriber"]]
+    user_service = AsyncMock()
+    user_service.get_principal.return_value = principal
+
+    tokens = await auth_service.refresh(token, user_service)
+
+    user_service.get_principal.assert_awaited_once_with(principal.id)
+    first, second = rotate.await_args_list
+    assert first.kwargs["args"][4] == ""
+    assert second.kwargs["args"][4] == principal.model_dump_json()
+    assert second.kwargs["args"][:4] == first.kwargs["args"][:4]
+    assert decode(tokens["access_token"])["login"] == "user"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("result", [["inactive"], ["uncached"]])
+async def test_refresh_fails_closed_on_cache_miss(auth_service, fake_redis, result):
+    principal = make_principal().model_copy(update={"is_active": False})
+    token = await auth_service.create_refresh_token(principal, "device-1")
+    fake_redis.scripts[ROTATE_SCRIPT].side_effect = [["uncached"], result]
+    user_service = AsyncMock()
+    user_service.get_principal.return_value = principal
+
+    with pytest.raises(HTTPException) as error:
+        await auth_service.refresh(token, user_service)
+
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_of_deleted_user_closes_session(auth_service, fake_redis):
+    principal = make_principal()
+    token = await auth_service.create_refresh_token(principal, "device-1")
+    fake_redis.scripts[ROTATE_SCRIPT].return_value = ["uncached"]
+    user_service = AsyncMock()
+    user_service.get_principal.return_value = None
+
+    with pytest.raises(HTTPException):
+        await auth_service.refresh(token, user_service)
+
+    fake_redis.hdel.assert_awaited_once_with(
+        f"refresh_sessions:{principal.id}", "device-1"
+    )
+
+
+@pytest.mark.asyncio
+async def test_access_token_is_not_refresh_token(auth_service, fake_redis):
+    access = await auth_service.create_access_token(make_principal(), "device-1")
+
+    with pytest.raises(HTTPException):
+        await auth_service.refresh(access, AsyncMock())
+
+    fake_redis.scripts[ROTATE_SCRIPT].assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_access_token(auth_service):
+    token = await auth_service.create_refresh_token(make_principal(), "device-1")
+
+    with pytest.raises(HTTPException):
+        await auth_service.get_user_from_token(token, AsyncMock())
+
+
+@pytest.mark.asyncio
+async def test_logout_closes_only_its_session(auth_service, fake_redis):
+    principal = make_principal()
+    access = await auth_service.create_access_token(principal, "device-1")
+
+    await auth_service.logout(principal, access)
+
+    fake_redis.hdel.assert_awaited_once_with(
+        f"refresh_sessions:{principal.id}", "device-1"
+    )
+    claims = decode(access)
+    auth_service.revocation.revoke.assert_awaited_once_with(
+        claims["jti"], claims["exp"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_logout_all_revokes_issued_access_tokens(auth_service, fake_redis):
+    principal = make_principal()
+    access = await auth_service.create_access_token(principal, "device-1")
+
+    await auth_service.logout_all(principal.id)
+
+    fake_redis.delete.assert_awaited_once_with(f"refresh_sessions:{principal.id}")
+    auth_service.revocation.revoke_user.assert_awaited_once_with(
+        str(principal.id), keep_for=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
+    assert decode(access)["iat"] <= time.time()
@@ -0,0 +1,79 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.core.request_id import RequestIdMiddleware, request_id_var
+
+
+def make_app(required: bool = True) -> tuple[FastAPI, list]:
+    calls = []
+    app = FastAPI(root_path="/auth")
+    app.add_middleware(RequestIdMiddleware, required=required)
+
+    @app.get("/ping")
+    async def ping():
+        calls.append(request_id_var.get())
+        return {"request_id": request_id_var.get()}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {}
+
+    return app, calls
+
+
+async def get(app: FastAPI, path: str, headers: dict | None = None):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_missing_request_id_is_rejected_before_handler():
+    app, calls = make_app()
+
+    response = await get(app, "/ping")
+
+    assert response.status_code == 400
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_propagated():
+    app, calls = make_app()
+
+    response = await get(app, "/ping", {"X-Request-Id": "abc-123"})
+
+    assert response.status_code == 200
+    assert response.json() == {"request_id": "abc-123"}
+    assert response.headers["X-Request-Id"] == "abc-123"
+    assert request_id_var.get() is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_request_id_is_rejected():
+    app, calls = make_app()
+
+    response = await get(app, "/ping", {"X-Request-Id": "a" * 200})
+
+    assert response.status_code == 400
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_when_optional():
+    app, calls = make_app(required=False)
+
+    response = await get(app, "/ping")
+
+    assert response.status_code == 200
+    assert calls == [response.headers["X-Request-Id"]]
+
+
+@pytest.mark.asyncio
+async def test_metrics_do_not_require_request_id():
+    app, _ = make_app()
+
+    response = await get(app, "/metrics")
+
+    assert response.status_code == 200
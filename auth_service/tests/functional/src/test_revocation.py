@@ -0,0 +1,149 @@
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from shared.bloom import BloomFilter
+from shared.revocation import (
+    REVOKED_JTI_CHANNEL,
+    REVOKED_JTI_KEY,
+    REVOKED_USERS_CHANNEL,
+    REVOKED_USERS_KEY,
+    RevocationList,
+)
+from src.core.logger import app_logger
+from src.db import redis as redis_db
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = MagicMock()
+    redis.zscore = AsyncMock(return_value=time.time() + 100)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+    redis.pipe = pipe
+    monkeypatch.setattr(redis_db, "redis", redis)
+    return redis
+
+
+@pytest.fixture
+def revocation():
+    return RevocationList(
+        redis=lambda: redis_db.redis,
+        logger=app_logger,
+        capacity=1000,
+        error_rate=0.001,
+        rebuild_interval=60,
+    )
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_revoke_stores_jti_until_token_expires(fake_redis, revocation):
+    expires_at = int(time.time()) + 100
+
+    await revocation.revoke("jti-1", expires_at)
+
+    fake_redis.pipe.zadd.assert_called_once_with(REVOKED_JTI_KEY, {"jti-1": expires_at})
+    fake_redis.pipe.zremrangebyscore.assert_called_once()
+    fake_redis.pipe.publish.assert_called_once_with(REVOKED_JTI_CHANNEL, "jti-1")
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_not_stored(fake_redis, revocation):
+    await revocation.revoke("jti-1", int(time.time()) - 1)
+
+    fake_redis.pipeline.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_synced_filter_skips_redis(fake_redis, revocation):
+    revocation.synced = True
+
+    assert await revocation.is_revoked("jti-valid") is False
+    fake_redis.zscore.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_filter_hit_is_confirmed_in_redis(fake_redis, revocation):
+    revocation.synced = True
+    await revocation.revoke("jti-1", int(time.time()) + 100)
+
+    assert await revocation.is_revoked("jti-1") is True
+    fake_redis.zscore.assert_awaited_once_with(REVOKED_JTI_KEY, "jti-1")
+
+
+@pytest.mark.asyncio
+async def test_unsynced_filter_checks_redis(fake_redis, revocation):
+    assert await revocation.is_revoked("jti-valid") is True
+    fake_redis.zscore.assert_awaited_once_with(REVOKED_JTI_KEY, "jti-valid")
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_not_revoked(fake_redis, revocation):
+    fake_redis.zscore.return_value = time.time() - 1
+
+    assert await revocation.is_revoked("jti-old") is False
+
+
+@pytest.mark.asyncio
+async def test_rebuild_reads_only_live_entries(fake_redis, revocation):
+    async def zscan_iter(key, count):
+        if key == REVOKED_USERS_KEY:
+            yield b"user-1", 123.5
+            return
+        assert key == REVOKED_JTI_KEY
+        yield b"jti-live", time.time() + 100
+        yield b"jti-expired", time.time() - 100
+
+    fake_redis.zscan_iter = zscan_iter
+
+    await revocation._rebuild()
+    revocation.synced = True
+
+    assert "jti-live" in revocation._bloom
+    assert revocation._bloom.count == 1
+    assert revocation._revoked_users == {"user-1": 123.5}
+    fake_redis.scan_iter.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_revoke_user_revokes_earlier_tokens(fake_redis, revocation):
+    issued_at = time.time()
+
+    await revocation.revoke_user("user-1", keep_for=1800)
+
+    fake_redis.pipe.zadd.assert_called_once()
+    assert fake_redis.pipe.zadd.call_args.args[0] == REVOKED_USERS_KEY
+    assert fake_redis.pipe.publish.call_args.args[0] == REVOKED_USERS_CHANNEL
+    revocation.synced = True
+    assert await revocation.is_revoked("jti-1", "user-1", issued_at) is True
+    assert await revocation.is_revoked("jti-1", "user-1", time.time() + 1) is False
+    assert await revocation.is_revoked("jti-1", "user-2", issued_at) is False
+
+
+@pytest.mark.asyncio
+async def test_unsynced_user_revocation_checks_redis(fake_redis, revocation):
+    fake_redis.zscore.return_value = time.time()
+
+    assert await revocation.is_revoked(None, "user-1", time.time() - 10) is True
+    fake_redis.zscore.assert_awaited_once_with(REVOKED_USERS_KEY, "user-1")
+
+
+def test_user_revocation_message_updates_memory(revocation):
+    revocation._on_message({"channel": b"auth:revoked_users", "data": b"user-1 100.5"})
+    revocation._on_message({"channel": b"auth:revoked_users", "data": b"user-1 50"})
+
+    assert revocation._revoked_users == {"user-1": 100.5}
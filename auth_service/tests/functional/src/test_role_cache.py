@@ -0,0 +1,107 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.db import redis as redis_db
+from src.services.role_cache import LOADED_MARKER, RoleCache
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = AsyncMock()
+    redis.get.return_value = None
+    redis.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+    monkeypatch.setattr(redis_db, "redis", redis)
+    return redis
+
+
+@pytest.fixture
+def role_cache():
+    return RoleCache(ttl=60, local_ttl=60, local_size=100)
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_skips_database(fake_redis, role_cache: RoleCache):
+    fake_redis.smismember.return_value = [1, 1]
+    loader = AsyncMock()
+
+    assert await role_cache.has_role(uuid.uuid4(), "admin", loader)
+    loader.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_miss_loads_roles_and_stores_them(fake_redis, role_cache: RoleCache):
+    fake_redis.smismember.return_value = [0, 0]
+    loader = AsyncMock(return_value=["user", "admin"])
+    user_id = uuid.uuid4()
+
+    assert await role_cache.has_role(user_id, "admin", loader)
+    loader.assert_awaited_once()
+    store = fake_redis.register_script.return_value.await_args.kwargs
+    assert store["keys"] == [role_cache.key(user_id), role_cache.generation_key(user_id)]
+    assert LOADED_MARKER in store["args"] and "admin" in store["args"]
+
+    # Повторная проверка обслуживается локальным кешем.
+    assert not await role_cache.has_role(user_id, "moderator", loader)
+    fake_redis.smismember.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_works_without_redis(monkeypatch, role_cache: RoleCache):
+    monkeypatch.setattr(redis_db, "redis", None)
+    loader = AsyncMock(return_value=["user"])
+
+    assert await role_cache.has_role(uuid.uuid4(), "user", loader)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_local_and_redis_entries(role_cache: RoleCache, monkeypatch):
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis = MagicMock()
+    redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=None)
+    monkeypatch.setattr(redis_db, "redis", redis)
+    user_id = uuid.uuid4()
+    role_cache.local.set(user_id, frozenset({"admin"}))
+
+    await role_cache.invalidate(user_id)
+
+    assert role_cache.local.get(user_id) is None
+    pipe.incr.assert_called_once_with(role_cache.generation_key(user_id))
+    pipe.delete.assert_called_once_with(role_cache.key(user_id))
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_assigned_loads_only_users_missing_from_cache(
+    fake_redis, role_cache: RoleCache
+):
+    local_user, redis_user, new_user = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    role_cache.local.set(local_user, frozenset({"admin"}))
+    pipe = MagicMock()
+    # SMISMEMBER и GET поколения на каждого пользователя не из локального кеша.
+    pipe.execute = AsyncMock(return_value=[[1, 0, 1], None, [0, 0], "2"])
+    fake_redis.pipeline = MagicMock()
+    fake_redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    fake_redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=None)
+    loader = AsyncMock(return_value={new_user: ["user"]})
+
+    assigned = await role_cache.assigned(
+        [
+            (local_user, "admin"),
+            (local_user, "user"),
+            (redis_user, "admin"),
+            (redis_user, "user"),
+            (new_user, "user"),
+        ],
+        loader,
+    )
+
+    assert assigned == {(local_user, "admin"), (redis_user, "user"), (new_user, "user")}
+    loader.assert_awaited_once_with([new_user])
+    store = fake_redis.register_script.return_value.await_args.kwargs
+    assert store["keys"][0] == role_cache.key(new_user)
+    assert store["args"][0] == "2"
+    assert role_cache.local.get(new_user) == frozenset({"user"})
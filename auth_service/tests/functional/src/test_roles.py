@@ -112,3 +112,42 @@ async def test_revoke_role(client: AsyncClient, auth_data: dict, fake_role_servi
         headers=auth_data["headers"],
     )
     assert resp2.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_check_roles_bulk(client: AsyncClient, auth_data: dict, fake_role_service: MagicMock):
+    user_id = str(uuid.uuid4())
+    fake_role_service.check_roles.return_value = [True, False]
+
+    resp = await client.post(
+        "/auth/api/v1/roles/check/bulk",
+        json={"items": [
+            {"user_id": user_id, "role_name": "user"},
+            {"user_id": user_id, "role_name": "admin"},
+        ]},
+        headers=auth_data["headers"],
+    )
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == [True, False]
+    items = fake_role_service.check_roles.await_args.args[0]
+    assert [item.role_name for item in items] == ["user", "admin"]
+
+
+@pytest.mark.asyncio
+async def test_set_roles_bulk(client: AsyncClient, auth_data: dict, fake_role_service: MagicMock):
+    from src.schemas.role import RoleBulkResult
+
+    fake_role_service.set_roles.return_value = RoleBulkResult(affected=2)
+
+    resp = await client.post(
+        "/auth/api/v1/roles/set/bulk",
+        json={"items": [
+            {"user_id": str(uuid.uuid4()), "role_name": "user"},
+            {"user_id": str(uuid.uuid4()), "role_name": "user"},
+        ]},
+        headers=auth_data["headers"],
+    )
+
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == {"affected": 2}
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core.config import settings
+from src.db import postgres
+
+POOL_SIZE, MAX_OVERFLOW = 5, 2
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_returns_connections_under_load(test_engine, monkeypatch):
+    """300 конкурентных запросов, каждый третий падает: пул не течёт."""
+    engine = create_async_engine(
+        str(settings.POSTGRES_DSN),
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=30,
+    )
+    in_use = peak = 0
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(*args):
+        nonlocal in_use, peak
+        in_use += 1
+        peak = max(peak, in_use)
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(*args):
+        nonlocal in_use
+        in_use -= 1
+
+    monkeypatch.setattr(
+        postgres, "async_session", async_sessionmaker(engine, expire_on_commit=False)
+    )
+
+    async def request(number: int):
+        dependency = postgres.get_session()
+        session = await anext(dependency)
+        await session.execute(text("SELECT pg_sleep(0.01)"))
+        if number % 3 == 0:
+            with pytest.raises(RuntimeError):
+                await dependency.athrow(RuntimeError("handler failed"))
+        else:
+            with pytest.raises(StopAsyncIteration):
+                await anext(dependency)
+        assert not session.in_transaction()
+
+    try:
+        await asyncio.gather(*(request(number) for number in range(300)))
+
+        assert peak <= POOL_SIZE + MAX_OVERFLOW
+        assert in_use == 0
+        assert engine.pool.checkedout() == 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    session = AsyncMock(info={})
+    session.add = MagicMock()
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+    monkeypatch.setattr(postgres, "async_session", session_factory)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_rolls_back_its_writes(fake_session):
+    """Обработчик упал после записи: изменения откатываются, кеш не трогается."""
+    invalidate = AsyncMock()
+    dependency = postgres.get_session()
+    session = await anext(dependency)
+    session.add(object())
+    postgres.after_commit(session, invalidate)
+
+    with pytest.raises(RuntimeError):
+        await dependency.athrow(RuntimeError("handler failed"))
+
+    fake_session.rollback.assert_awaited_once()
+    fake_session.commit.assert_not_awaited()
+    invalidate.assert_not_awaited()
+    assert "after_commit" not in fake_session.info
+
+
+@pytest.mark.asyncio
+async def test_successful_handler_commits_before_callbacks(fake_session):
+    """Коммит делает зависимость, а колбэки выполняются уже после него."""
+    calls = []
+    fake_session.commit.side_effect = lambda: calls.append("commit")
+
+    async def invalidate():
+        calls.append("invalidate")
+
+    dependency = postgres.get_session()
+    session = await anext(dependency)
+    postgres.after_commit(session, invalidate)
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(dependency)
+
+    assert calls == ["commit", "invalidate"]
+    fake_session.rollback.assert_not_awaited()
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -5,18 +6,26 @@ from fastapi import status
 from starlette.responses import RedirectResponse
 from httpx import AsyncClient
 import uuid
+from urllib.parse import parse_qs, urlsplit
 
-from src.models.entity import User
+import httpx
+
+from src.schemas.auth import Principal
+from src.schemas.user import SocialUserInfo
+from src.services.oauth import STATE_COOKIE, OAuthError, YandexOAuth
+from src.services.user import UserService
 
 
 @pytest.fixture
 def mock_user_info():
     """Фикстура, имитирующая информацию о пользователе от SSO провайдера."""
-    user_info = MagicMock()
-    user_info.email = "yandex_user@example.com"
-    user_info.first_name = "Yandex"
-    user_info.last_name = "User"
-    return user_info
+    return SocialUserInfo(
+        provider="yandex",
+        social_id="1000",
+        email="yandex_user@example.com",
+        first_name="Yandex",
+        last_name="User",
+    )
 
 
 @pytest.mark.asyncio
@@ -38,53 +47,20 @@ async def test_yandex_login_redirect(mock_sso, client: AsyncClient):
 
 @pytest.mark.asyncio
 @patch("src.api.v1.social_auth.yandex_sso", new_callable=AsyncMock)
-async def test_yandex_callback_new_user(
+async def test_yandex_callback_issues_tokens(
     mock_sso,
     client: AsyncClient,
     fake_user_service: AsyncMock,
     fake_auth_service: AsyncMock,
-    mock_user_info: MagicMock,
+    mock_user_info: SocialUserInfo,
 ):
-    """Тест: callback создает нового пользователя, если он не найден по email."""
+    """Тест: callback выдаёт токены пользователю, найденному по аккаунту Яндекса."""
     # Arrange
     mock_sso.verify_and_process.return_value = mock_user_info
-    fake_user_service.get_user_by_email.return_value = None  # Пользователя нет
-    new_user = User(id=uuid.uuid4(), login=mock_user_info.email, email=mock_user_info.email, password="social_user_pw")
-    fake_user_service.create_social_user.return_value = new_user
-    fake_auth_service.create_access_token.return_value = "new_access_token"
-    fake_auth_service.create_refresh_token.return_value = "new_refresh_token"
-
-    # Act
-    response = await client.get("/auth/api/v1/oauth/yandex/callback?code=some_code")
-
-    # Assert
-    assert response.status_code == status.HTTP_200_OK
-    assert response.json() == {
-        "access_token": "new_access_token",
-        "refresh_token": "new_refresh_token",
-    }
-    fake_user_service.get_user_by_email.assert_awaited_once_with(
-        email=mock_user_info.email
+    principal = Principal(
+        id=uuid.uuid4(), login=mock_user_info.email, is_active=True, is_superuser=False
     )
-    fake_user_service.create_social_user.assert_awaited_once()
-    # The login method is called on the user service, not the auth service
-    fake_user_service.login.assert_awaited_once()
-
-
-@pytest.mark.asyncio
-@patch("src.api.v1.social_auth.yandex_sso", new_callable=AsyncMock)
-async def test_yandex_callback_existing_user(
-    mock_sso,
-    client: AsyncClient,
-    fake_user_service: AsyncMock,
-    fake_auth_service: AsyncMock,
-    mock_user_info: MagicMock,
-):
-    """Тест: callback аутентифицирует существующего пользователя."""
-    # Arrange
-    mock_sso.verify_and_process.return_value = mock_user_info
-    existing_user = User(id=uuid.uuid4(), login=mock_user_info.email, email=mock_user_info.email, password="social_user_pw")
-    fake_user_service.get_user_by_email.return_value = existing_user
+    fake_user_service.resolve_social_user.return_value = principal
     fake_auth_service.create_access_token.return_value = "access_token"
     fake_auth_service.create_refresh_token.return_value = "refresh_token"
 
@@ -97,12 +73,9 @@ async def test_yandex_callback_existing_user(
         "access_token": "access_token",
         "refresh_token": "refresh_token",
     }
-    fake_user_service.get_user_by_email.assert_awaited_once_with(
-        email=mock_user_info.email
-    )
-    fake_user_service.create_social_user.assert_not_awaited()  # Не должен вызываться
-    # The login method is called on the user service, not the auth service
+    fake_user_service.resolve_social_user.assert_awaited_once_with(mock_user_info)
     fake_user_service.login.assert_awaited_once()
+    assert fake_user_service.login.await_args.kwargs["user_id"] == principal.id
 
 
 @pytest.mark.asyncio
@@ -118,4 +91,145 @@ async def test_yandex_callback_verification_error(mock_sso, client: AsyncClient)
 
     # Assert
     assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert error_message in response.json()["detail"]
\ No newline at end of file
+    assert error_message in response.json()["detail"]
+
+
+@pytest.fixture
+def social_user_service():
+    principal_cache = AsyncMock()
+    principal_cache.get.side_effect = lambda user_id, loader: loader()
+    user_repo = AsyncMock()
+    password_hasher = AsyncMock()
+    password_hasher.hash.return_value = "pbkdf2:sha256:1$salt$hash"
+    session = AsyncMock(info={})
+    session.begin_nested = MagicMock()
+    return UserService(
+        session=session,
+        user_repo=user_repo,
+        password_hasher=password_hasher,
+        history_writer=AsyncMock(),
+        role_cache=AsyncMock(),
+        principal_cache=principal_cache,
+        social_account_cache=AsyncMock(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_resolve_social_user_from_cache(social_user_service, mock_user_info):
+    """Тест: при попадании в кеш соцаккаунтов пользователь не ищется в базе."""
+    user_id = uuid.uuid4()
+    service = social_user_service
+    service.social_account_cache.get.return_value = user_id
+    principal = Principal(id=user_id, login="yandex", is_active=True, is_superuser=False)
+    service.principal_cache.get.side_effect = None
+    service.principal_cache.get.return_value = principal
+
+    assert await service.resolve_social_user(mock_user_info) == principal
+
+    service.social_account_cache.get.assert_awaited_once_with("yandex", "1000")
+    service.user_repo.get_user_id_by_social.assert_not_awaited()
+    service.user_repo.create_social_user.assert_not_awaited()
+    service.social_account_cache.put.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_resolve_social_user_creates_user(social_user_service, mock_user_info):
+    """Тест: новый аккаунт создаётся одним запросом и после коммита попадает в оба кеша."""
+    user_id = uuid.uuid4()
+    service = social_user_service
+    service.social_account_cache.get.return_value = None
+    service.user_repo.get_user_id_by_social.return_value = None
+    service.user_repo.create_social_user.return_value = SimpleNamespace(
+        id=user_id,
+        login=mock_user_info.email,
+        is_active=True,
+        is_superuser=False,
+        created=True,
+        roles=["user"],
+    )
+
+    principal = await service.resolve_social_user(mock_user_info)
+
+    assert principal.id == user_id
+    assert principal.roles == ["user"]
+    service.user_repo.create_social_user.assert_awaited_once()
+    assert service.user_repo.create_social_user.await_args.kwargs["email"] == mock_user_info.email
+    service.session.begin_nested.assert_called_once_with()
+    service.principal_cache.put.assert_not_awaited()
+
+    # Кеши заполняются только после коммита запроса.
+    for callback in service.session.info["after_commit"]:
+        await callback()
+
+    service.principal_cache.put.assert_awaited_once_with(principal)
+    service.social_account_cache.put.assert_awaited_once_with("yandex", "1000", user_id)
+
+
+@pytest.mark.asyncio
+async def test_yandex_oauth_reuses_http_client():
+    """Тест: код меняется на токен и профиль через один и тот же httpx-клиент."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.host == "oauth.yandex.ru":
+            return httpx.Response(200, json={"access_token": "token"})
+        assert request.headers["Authorization"] == "OAuth token"
+        return httpx.Response(
+            200, json={"id": "1000", "default_email": "yandex_user@example.com"}
+        )
+
+    oauth = YandexOAuth(client_id="id", client_secret="secret", redirect_uri="http://test")
+    oauth._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = oauth.client
+    callback = MagicMock(
+        query_params={"code": "some_code", "state": "state"},
+        cookies={STATE_COOKIE: "state"},
+    )
+
+    first = await oauth.verify_and_process(callback)
+    await oauth.verify_and_process(callback)
+
+    assert first == SocialUserInfo(
+        provider="yandex", social_id="1000", email="yandex_user@example.com"
+    )
+    assert len(requests) == 4
+    assert oauth.client is client
+    await oauth.close()
+
+
+@pytest.mark.asyncio
+async def test_yandex_login_redirect_sets_state_cookie():
+    """Тест: state из ссылки на Яндекс совпадает с cookie браузера."""
+    oauth = YandexOAuth(client_id="id", client_secret="secret", redirect_uri="https://test")
+
+    response = await oauth.get_login_redirect()
+
+    query = parse_qs(urlsplit(response.headers["location"]).query)
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{STATE_COOKIE}={query['state'][0]};")
+    assert "HttpOnly" in cookie and "Secure" in cookie
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "query, cookies",
+    [
+        ({"code": "some_code"}, {STATE_COOKIE: "state"}),
+        ({"code": "some_code", "state": "state"}, {}),
+        ({"code": "some_code", "state": "other"}, {STATE_COOKIE: "state"}),
+    ],
+)
+async def test_yandex_callback_rejects_missing_or_wrong_state(query, cookies):
+    """Тест: без совпадающего state code не обменивается на токен."""
+    requests = []
+    oauth = YandexOAuth(client_id="id", client_secret="secret", redirect_uri="http://test")
+    oauth._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: requests.append(request))
+    )
+
+    with pytest.raises(OAuthError):
+        await oauth.verify_and_process(MagicMock(query_params=query, cookies=cookies))
+
+    assert requests == []
+    await oauth.close()
@@ -0,0 +1,129 @@
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF
+from opentelemetry.trace import StatusCode
+
+from src.core import tracing
+from src.core.config import settings
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer(__name__))
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    return exporter
+
+
+@pytest.mark.asyncio
+async def test_only_allowed_arguments_are_captured(exporter):
+    @tracing.traced("service_call", capture=("user_id", "login"))
+    async def call(session, user_id, login, password):
+        return "ok"
+
+    user_id = uuid.uuid4()
+    assert await call(object(), user_id, login="user", password="secret") == "ok"
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "service_call"
+    assert span.attributes["function.arg.user_id"] == str(user_id)
+    assert span.attributes["function.arg.login"] == "user"
+    assert "secret" not in str(dict(span.attributes))
+
+
+@pytest.mark.asyncio
+async def test_error_span_records_exception(exporter):
+    @tracing.traced("failing_call")
+    async def failing_call():
+        raise RuntimeError("boom")
+
+    @tracing.traced_sync("failing_sync_call")
+    def failing_sync_call():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await failing_call()
+    with pytest.raises(RuntimeError):
+        failing_sync_call()
+
+    for span in exporter.get_finished_spans():
+        assert span.status.status_code is StatusCode.ERROR
+        (event,) = span.events
+        assert event.name == "exception"
+        assert event.attributes["exception.type"] == "RuntimeError"
+        assert "Traceback" in event.attributes["exception.stacktrace"]
+
+
+def test_sensitive_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        @tracing.traced(capture=("password",))
+        async def call(password):
+            pass
+
+
+def test_objects_are_not_stringified(monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ATTRIBUTE_MAX_LENGTH", 12)
+
+    assert tracing.format_attribute(MagicMock()) == "<MagicMock>"
+    assert tracing.format_attribute("a" * 20) == "a" * 12 + "..."
+
+
+def test_disabled_tracing_returns_function(monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", False)
+
+    async def call():
+        pass
+
+    assert tracing.traced()(call) is call
+
+
+@pytest.mark.asyncio
+async def test_unsampled_span_skips_attributes(monkeypatch):
+    provider = TracerProvider(sampler=ALWAYS_OFF)
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer(__name__))
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    format_attribute = MagicMock()
+    monkeypatch.setattr(tracing, "format_attribute", format_attribute)
+
+    @tracing.traced(capture=("user_id",))
+    async def call(user_id):
+        return user_id
+
+    assert await call(1) == 1
+    format_attribute.assert_not_called()
+
+
+def make_trace(provider, fail=False):
+    tracer = provider.get_tracer(__name__)
+    with tracer.start_as_current_span("root"):
+        with tracer.start_as_current_span("child") as child:
+            if fail:
+                child.set_status(tracing.trace.Status(tracing.trace.StatusCode.ERROR))
+
+
+@pytest.mark.parametrize("fail, keep_ratio, exported", [
+    (False, 0.0, 0),
+    (True, 0.0, 2),
+    (False, 1.0, 2),
+])
+def test_tail_sampling_keeps_whole_traces(fail, keep_ratio, exported):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        tracing.TailSamplingProcessor(
+            SimpleSpanProcessor(exporter), slow_ms=10_000, keep_ratio=keep_ratio
+        )
+    )
+
+    make_trace(provider, fail=fail)
+
+    assert len(exporter.get_finished_spans()) == exported
@@ -0,0 +1,129 @@
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from src.models.entity import Role, User, UserAuthHistory
+from src.repositories.user_repository import (
+    InvalidCursor,
+    PgUserRepository,
+    UserLoadProfile,
+    decode_history_cursor,
+    encode_history_cursor,
+)
+
+
+@contextmanager
+def count_statements(engine):
+    """Считает SQL-запросы, которые движок отправил в базу внутри блока."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(
+            engine.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+
+
+@pytest_asyncio.fixture
+async def user(session: AsyncSession) -> User:
+    suffix = uuid.uuid4().hex[:8]
+    user = User(
+        login=f"profile_{suffix}",
+        password=generate_password_hash("password", "pbkdf2:sha256:1000"),
+        email=f"profile_{suffix}@example.com",
+    )
+    user.roles.append(Role(name=f"role_{suffix}"))
+    session.add(user)
+    await session.commit()
+    # Чистим identity map, чтобы каждый замер честно ходил в базу.
+    session.expunge_all()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_loaded_with_single_statement(
+    session: AsyncSession, test_engine, user: User
+):
+    """get_current_user: одна выборка колонок, без ролей и истории входов."""
+    repo = PgUserRepository(session)
+
+    with count_statements(test_engine) as statements:
+        loaded = await repo.get(user.id, profile=UserLoadProfile.PRINCIPAL)
+
+    assert loaded.id == user.id
+    assert loaded.is_superuser is False
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_login_loads_credentials_with_single_statement(
+    session: AsyncSession, test_engine, user: User
+):
+    """/auth/login: пользователь и хеш пароля одним запросом."""
+    repo = PgUserRepository(session)
+
+    with count_statements(test_engine) as statements:
+        loaded = await repo.get_user_by_login(
+            user.login, profile=UserLoadProfile.CREDENTIALS
+        )
+
+    assert check_password_hash(loaded.password, "password")
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_role_endpoints_load_roles_without_history(
+    session: AsyncSession, test_engine, user: User
+):
+    """/roles/set, /revoke, /check: пользователь и его роли, история не грузится."""
+    repo = PgUserRepository(session)
+
+    with count_statements(test_engine) as statements:
+        loaded = await repo.get(user.id, profile=UserLoadProfile.WITH_ROLES)
+
+    assert [role.name for role in loaded.roles] == [user.roles[0].name]
+    assert len(statements) == 2
+    assert not any("users_auth_history" in statement for statement in statements)
+
+
+def test_history_cursor_round_trip():
+    auth_date, history_id = datetime(2026, 10, 1, 12, 30), uuid.uuid4()
+
+    cursor = encode_history_cursor(auth_date, history_id)
+
+    assert decode_history_cursor(cursor) == (auth_date, history_id)
+    with pytest.raises(InvalidCursor):
+        decode_history_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_login_history_cursor_pages(session: AsyncSession, user: User):
+    now = datetime.utcnow()
+    for minutes in range(5):
+        history = UserAuthHistory(user_agent=f"agent {minutes}", user_id=user.id)
+        history.auth_date = now - timedelta(minutes=minutes)
+        session.add(history)
+    await session.commit()
+    repo = PgUserRepository(session)
+
+    agents, cursor = [], None
+    while True:
+        rows, cursor = await repo.get_login_history_by_cursor(
+            user_id=user.id, cursor=cursor, size=2
+        )
+        agents.extend(row.user_agent for row in rows)
+        if not cursor:
+            break
+
+    assert agents == [f"agent {minutes}" for minutes in range(5)]
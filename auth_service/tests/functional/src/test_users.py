@@ -1,9 +1,12 @@
+import uuid
+from datetime import date
+
 import pytest
 from httpx import AsyncClient
 from fastapi import status
 from unittest.mock import AsyncMock, MagicMock
 
-from src.schemas.user import UserRegister, UserUpdateCredentials
+from src.schemas.user import DailyLogins, UserRegister, UserUpdateCredentials
 
 
 @pytest.mark.asyncio
@@ -90,3 +93,93 @@ async def test_login_history_success(
         {"user_agent": "Chrome", "login_at": "2024-01-01T00:00:00"},
         {"user_agent": "Safari", "login_at": "2024-01-02T00:00:00"},
     ]
+
+
+@pytest.mark.asyncio
+async def test_login_history_cursor(
+    client: AsyncClient,
+    fake_user_service: AsyncMock,
+    auth_data: dict,
+):
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    fake_user_service.get_login_history_by_cursor.return_value = (
+        [SimpleNamespace(user_agent="Chrome", auth_date=datetime(2024, 1, 2))],
+        "next-cursor",
+    )
+
+    response = await client.get(
+        "/auth/api/v1/users/me/login-history",
+        params={"cursor": "", "size": 1},
+        headers=auth_data["headers"],
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == "next-cursor"
+    assert response.json() == [{"user_agent": "Chrome", "login_at": "2024-01-02T00:00:00"}]
+    fake_user_service.get_login_history_by_cursor.assert_awaited_once_with(
+        user_id=auth_data["user"].id, cursor="", size=1
+    )
+    fake_user_service.get_login_history_paginated.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_deactivate_user(
+    client: AsyncClient,
+    fake_user_service: AsyncMock,
+    fake_auth_service: AsyncMock,
+    auth_data: dict,
+):
+    user_id = uuid.uuid4()
+    fake_user_service.set_active.return_value = True
+
+    response = await client.post(
+        f"/auth/api/v1/users/{user_id}/deactivate", headers=auth_data["headers"]
+    )
+
+    assert response.status_code == 200
+    fake_user_service.set_active.assert_awaited_once_with(
+        user_id=user_id, is_active=False
+    )
+    fake_auth_service.logout_all.assert_awaited_once_with(user_id=user_id)
+
+
+@pytest.mark.asyncio
+async def test_user_login_stats(
+    client: AsyncClient,
+    fake_user_service: AsyncMock,
+    auth_data: dict,
+):
+    user_id = uuid.uuid4()
+    fake_user_service.get_login_stats.return_value = [
+        DailyLogins(day=date(2026, 10, 1), logins=3)
+    ]
+
+    response = await client.get(
+        f"/auth/api/v1/users/{user_id}/stats/logins",
+        params={"date_from": "2026-10-01", "date_to": "2026-10-07"},
+        headers=auth_data["headers"],
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [{"day": "2026-10-01", "logins": 3}]
+    fake_user_service.get_login_stats.assert_awaited_once_with(
+        date_from=date(2026, 10, 1), date_to=date(2026, 10, 7), user_id=user_id
+    )
+
+
+@pytest.mark.asyncio
+async def test_login_stats_rejects_long_period(
+    client: AsyncClient,
+    fake_user_service: AsyncMock,
+    auth_data: dict,
+):
+    response = await client.get(
+        "/auth/api/v1/users/stats/user-agents",
+        params={"date_from": "2020-01-01", "date_to": "2026-01-01"},
+        headers=auth_data["headers"],
+    )
+
+    assert response.status_code == 400
+    fake_user_service.get_user_agent_stats.assert_not_awaited()
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Разрешает реплике из docker-compose.auth-tests.yml подключаться к основной базе.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
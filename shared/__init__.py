@@ -0,0 +1 @@
+"""Код, общий для сервиса авторизации и content API."""
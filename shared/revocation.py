@@ -0,0 +1,207 @@
+import asyncio
+import time
+from typing import Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from shared.bloom import BloomFilter
+
+# Список ведёт сервис авторизации, content API его только читает.
+# Отозванные jti лежат в одном ZSET с временем истечения токена в score:
+# пересборка фильтра читает только его, а не сканирует весь Redis.
+REVOKED_JTI_KEY = "revoked_jti"
+REVOKED_JTI_CHANNEL = "auth:revoked_jti"
+# Выход на всех устройствах: user_id с временем отзыва в score. Токены,
+# выпущенные (iat) не позже этого момента, недействительны.
+REVOKED_USERS_KEY = "revoked_users"
+REVOKED_USERS_CHANNEL = "auth:revoked_users"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RevocationList:
+    """Отозванные access-токены: jti в Redis до истечения токена.
+
+    Каждый воркер держит снимок списка в фильтре Блума и дополняет его
+    по pub/sub, поэтому токен, которого в фильтре нет, проверяется без
+    обращения к Redis. Пока подписка не установлена или оборвалась,
+    каждая проверка идёт в Redis.
+
+    Отзывов всех токенов пользователя мало, поэтому они целиком хранятся
+    в памяти воркера и синхронизируются так же.
+
+    redis - функция, возвращающая текущий клиент сервиса (или None).
+    """
+
+    def __init__(
+        self,
+        redis: Callable[[], Redis | None],
+        logger,
+        capacity: int,
+        error_rate: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.redis = redis
+        self.logger = logger
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.synced = False
+        self._bloom = self._new_filter()
+        self._revoked_users: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def _new_filter(self) -> BloomFilter:
+        return BloomFilter(self.capacity, self.error_rate)
+
+    async def revoke(self, jti: str, expires_at: int) -> None:
+        """Отзывает токен до момента expires_at (unix-время из claim exp)."""
+        now = time.time()
+        if expires_at <= now:
+            return
+        self._bloom.add(jti)
+        redis = self.redis()
+        if redis is None:
+            self.logger.error(f"Redis unavailable, token {jti} is not revoked")
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(REVOKED_JTI_KEY, {jti: expires_at})
+            # Истёкшие отзывы вычищает тот, кто пишет.
+            pipe.zremrangebyscore(REVOKED_JTI_KEY, "-inf", now)
+            pipe.publish(REVOKED_JTI_CHANNEL, jti)
+            await pipe.execute()
+
+    async def revoke_user(self, user_id: str, keep_for: int) -> None:
+        """Отзывает все access-токены пользователя, выпущенные до сих пор.
+
+        keep_for - время жизни access-токена: дольше запись не нужна.
+        """
+        now = time.time()
+        self._revoked_users[user_id] = now
+        redis = self.redis()
+        if redis is None:
+            self.logger.error(f"Redis unavailable, tokens of {user_id} are not revoked")
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(REVOKED_USERS_KEY, {user_id: now})
+            pipe.zremrangebyscore(REVOKED_USERS_KEY, "-inf", now - keep_for)
+            pipe.publish(REVOKED_USERS_CHANNEL, f"{user_id} {now}")
+            await pipe.execute()
+
+    async def is_revoked(
+        self,
+        jti: str | None,
+        user_id: str | None = None,
+        issued_at: float | None = None,
+    ) -> bool:
+        """issued_at - claim iat; токен без него считается выпущенным давно."""
+        if user_id and await self._user_revoked_at(user_id) >= (issued_at or 0):
+            return True
+        if not jti:
+            return False
+        if self.synced and jti not in self._bloom:
+            return False
+        redis = self.redis()
+        if redis is None:
+            return False
+        try:
+            expires_at = await redis.zscore(REVOKED_JTI_KEY, jti)
+        except RedisError as e:
+            self.logger.warning(f"Revocation list unavailable: {e}")
+            return False
+        return expires_at is not None and expires_at > time.time()
+
+    async def _user_revoked_at(self, user_id: str) -> float:
+        if self.synced:
+            return self._revoked_users.get(user_id, -1)
+        redis = self.redis()
+        if redis is None:
+            return self._revoked_users.get(user_id, -1)
+        try:
+            revoked_at = await redis.zscore(REVOKED_USERS_KEY, user_id)
+        except RedisError as e:
+            self.logger.warning(f"Revocation list unavailable: {e}")
+            return -1
+        return -1 if revoked_at is None else revoked_at
+
+    async def _rebuild(self) -> None:
+        # Истёкшие jti из фильтра не удалить, поэтому он собирается заново
+        # из живых записей. Сообщения, пришедшие во время чтения, ждут
+        # в подписке и попадут уже в новый фильтр.
+        bloom = self._new_filter()
+        now = time.time()
+        # В content API decode_responses выключен: jti приходят байтами,
+        # фильтр хеширует их так же, как строки.
+        async for jti, expires_at in self.redis().zscan_iter(REVOKED_JTI_KEY, count=1000):
+            if expires_at > now:
+                bloom.add(jti)
+        if bloom.count > self.capacity:
+            self.logger.warning(
+                f"Revocation filter over capacity: {bloom.count} > {self.capacity}"
+            )
+        revoked_users = {
+            _text(user_id): revoked_at
+            async for user_id, revoked_at in self.redis().zscan_iter(
+                REVOKED_USERS_KEY, count=1000
+            )
+        }
+        self._bloom = bloom
+        self._revoked_users = revoked_users
+
+    def _on_message(self, message: dict) -> None:
+        if _text(message["channel"]) == REVOKED_USERS_CHANNEL:
+            user_id, revoked_at = _text(message["data"]).split()
+            self._revoked_users[user_id] = max(
+                float(revoked_at), self._revoked_users.get(user_id, -1)
+            )
+        else:
+            self._bloom.add(message["data"])
+
+    async def run(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = self.redis()
+                if redis is None:
+                    await asyncio.sleep(1)
+                    continue
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                # Подписка раньше чтения списка: так ни один отзыв не потеряется.
+                await pubsub.subscribe(REVOKED_JTI_CHANNEL, REVOKED_USERS_CHANNEL)
+                await self._rebuild()
+                self.synced = True
+                rebuilt_at = time.monotonic()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._on_message(message)
+                    if time.monotonic() - rebuilt_at > self.rebuild_interval:
+                        await self._rebuild()
+                        rebuilt_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Revocation list sync failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                self.synced = False
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+            self.logger.info("Revocation list sync started.")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.logger.info("Revocation list sync stopped.")